@@ -1,8 +1,8 @@
 import streamlit as st
-from ui.home import render_home
-from ui.segmentation_view import render_segmentation
-from ui.prediction_view import render_prediction
-from ui.export_view import render_export
+from ui.pages import PAGES, render_page
+from ui.cache_panel import render_cache_stats
+from ui.trace_panel import start_traced_run, render_trace_panel
+from utils.tracing import span
 
 # Configuration de la page
 st.set_page_config(page_title="Analyse Churn Tunisie Telecom", layout="wide")
@@ -11,25 +11,16 @@ st.title("Analyse Prédictive de Churn")
 # Menu principal
 def main():
     # Menu principal
-    page = st.sidebar.selectbox("Menu", [
-        "Aperçu",
-        "Segmentation",
-        "Prédiction",
-        "Évaluation des Modèles",
-        "Export Firebase"
-    ])
+    page = st.sidebar.selectbox("Menu", list(PAGES))
+    show_trace = start_traced_run()
 
-    # Routing based on selected page
-    if page == "Aperçu":
-        render_home()
-    elif page == "Segmentation":
-        render_segmentation()
-    elif page == "Prédiction":
-        render_prediction()
-    elif page == "Évaluation des Modèles":
-        render_prediction(evaluation_only=True)
-    elif page == "Export Firebase":
-        render_export()
+    # Routing based on selected page (import paresseux du module de la page)
+    with span(f"page:{page}"):
+        render_page(page)
+
+    if show_trace:
+        render_trace_panel()
+    render_cache_stats()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
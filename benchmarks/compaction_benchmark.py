@@ -0,0 +1,69 @@
+"""
+Benchmark de la compaction des modèles entraînés.
+
+Entraîne chaque modèle sur des données synthétiques puis compare le pipeline
+d'origine et sa forme compacte : taille sérialisée, temps de chargement,
+temps de prédiction, AUC et accuracy sur le jeu de test.
+
+Usage:
+    python -m benchmarks.compaction_benchmark --size 100000
+    python -m benchmarks.compaction_benchmark --size 100000 --tolerance 0.002 --output compaction.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.pipeline_benchmark import MODEL_TYPES
+from data.data_loader import normalize_data
+from data.synthetic import generate_synthetic_data
+from prediction.model_compaction import compact_pipeline, compaction_report
+from prediction.model_training import model_family, split_data, train_model
+from preprocessing.data_cleaning import prepare_data
+
+
+def predict_time(pipeline, X):
+    start = time.perf_counter()
+    pipeline.predict_proba(X)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=100_000, help="Nombre de clients synthétiques")
+    parser.add_argument('--models', default=','.join(MODEL_TYPES), help="Modèles à entraîner")
+    parser.add_argument('--tolerance', type=float, default=0.005, help="Perte d'AUC tolérée par l'élagage")
+    parser.add_argument('--max-leaves', type=int, help="Nombre maximal de feuilles par arbre")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Fichier de sortie JSON")
+    args = parser.parse_args()
+
+    df = normalize_data(generate_synthetic_data(args.size, seed=args.seed))
+    results = {}
+    for model_type in [model for model in args.models.split(',') if model]:
+        X, y, preprocessor, _, _ = prepare_data(df, model_family(model_type))
+        pipeline, _ = train_model(X, y, preprocessor, model_type)
+        _, X_test, _, y_test = split_data(X, y)
+
+        compact = compact_pipeline(pipeline, X_test, y_test, max_leaves=args.max_leaves,
+                                   auc_tolerance=args.tolerance)
+        report = compaction_report(pipeline, compact, X_test, y_test)
+        report['before']['predict_s'] = predict_time(pipeline, X_test)
+        report['after']['predict_s'] = predict_time(compact, X_test)
+        results[model_type] = report
+
+        print(f"\n{model_type} (profondeur {report['after']['max_depth']}, {report['after']['nodes']} nœuds)")
+        for metric in ('size_mb', 'load_s', 'predict_s', 'AUCROC', 'Accuracy'):
+            before, after = report['before'][metric], report['after'][metric]
+            print(f"  {metric:<10} {before:>12.4f} -> {after:>12.4f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
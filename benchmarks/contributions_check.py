@@ -0,0 +1,110 @@
+"""
+Vérification des contributions des variables (prediction.contributions).
+
+Entraîne un petit gradient boosting sur des données synthétiques et compare
+compute_contributions à une décomposition de référence calculée client par
+client le long des chemins de décision de scikit-learn, où la valeur de chaque
+nœud est la moyenne des valeurs des feuilles (ajustées par la fonction de perte)
+atteintes par les lignes d'entraînement qui le traversent. Vérifie aussi que
+biais + contributions redonne le score (log-odds) du modèle.
+Le code de sortie est non nul en cas d'écart.
+
+Usage:
+    python -m benchmarks.contributions_check
+    python -m benchmarks.contributions_check --size 20000 --rows 500 --trees 50
+"""
+import argparse
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.data_loader import normalize_data
+from data.synthetic import generate_synthetic_data
+from prediction.contributions import compute_contributions, feature_groups
+from prediction.model_training import model_family, split_data, train_model
+from preprocessing.data_cleaning import prepare_data, to_float32
+
+# Écart absolu toléré (les nœuds compacts sont stockés en float32)
+TOLERANCE = 1e-4
+MODEL_TYPE = 'GradientBoosting'
+
+
+def reference_contributions(pipeline, X_train, X):
+    """
+    Décomposition de référence d'un gradient boosting, client par client
+    (sans sous-échantillonnage : toutes les lignes d'entraînement pèsent 1)
+
+    Returns:
+        (biais, tableau des contributions par variable d'origine, scores du modèle)
+    """
+    preprocessor, classifier = pipeline[:-1], pipeline[-1]
+    train = to_float32(preprocessor.transform(X_train))
+    encoded = to_float32(preprocessor.transform(X))
+    groups = feature_groups(preprocessor)
+    features = list(dict.fromkeys(groups))
+    group_index = [features.index(group) for group in groups]
+
+    trees = [regressor.tree_ for regressor in classifier.estimators_[:, 0]]
+    leaf_values = [tree.value[:, 0, 0] for tree in trees]
+    scale = classifier.learning_rate
+    contributions = np.zeros((len(X), len(features)))
+    root_total = 0.0
+    for tree, values in zip(trees, leaf_values):
+        # Valeur d'un nœud : moyenne des feuilles atteintes par les lignes qui le traversent
+        train_paths = tree.decision_path(train)
+        reached = values[tree.apply(train)]
+        node_values = np.asarray(train_paths.T @ reached).ravel() / np.asarray(train_paths.sum(axis=0)).ravel()
+        root_total += node_values[0]
+
+        paths = tree.decision_path(encoded)
+        for row in range(len(X)):
+            nodes = paths.indices[paths.indptr[row]:paths.indptr[row + 1]]
+            for parent, child in zip(nodes[:-1], nodes[1:]):
+                contributions[row, group_index[tree.feature[parent]]] += scale * (node_values[child]
+                                                                                  - node_values[parent])
+
+    # Score initial : score du modèle moins la somme des feuilles atteintes
+    scores = classifier.decision_function(encoded)
+    leaf_total = sum(values[tree.apply(encoded)] for tree, values in zip(trees, leaf_values))
+    bias = scores[0] - scale * leaf_total[0] + scale * root_total
+    return bias, contributions, scores
+
+
+def check(df, n_rows, n_trees, max_depth):
+    X, y, preprocessor, _, _ = prepare_data(df, model_family(MODEL_TYPE))
+    pipeline, _ = train_model(X, y, preprocessor, MODEL_TYPE,
+                              params={'n_estimators': n_trees, 'max_depth': max_depth})
+    X_train, X_test, _, _ = split_data(X, y)
+    X_check = X_test.head(n_rows)
+
+    bias, contributions = compute_contributions(pipeline, X_check)
+    ref_bias, ref_contributions, scores = reference_contributions(pipeline, X_train, X_check)
+
+    errors = {
+        'biais': abs(bias - ref_bias),
+        'contributions': float(np.abs(contributions.to_numpy() - ref_contributions).max()),
+        'additivité': float(np.abs(bias + contributions.to_numpy().sum(axis=1) - scores).max()),
+    }
+    ok = all(error <= TOLERANCE for error in errors.values())
+    details = "  ".join(f"{name} {error:.2e}" for name, error in errors.items())
+    print(f"{MODEL_TYPE} ({n_trees} arbres, profondeur {max_depth})  {details}  {'OK' if ok else 'ÉCART'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=5_000, help="Nombre de clients synthétiques")
+    parser.add_argument('--rows', type=int, default=200, help="Nombre de clients vérifiés")
+    parser.add_argument('--trees', type=int, default=30, help="Nombre d'arbres du modèle")
+    parser.add_argument('--depth', type=int, default=3, help="Profondeur des arbres")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    df = normalize_data(generate_synthetic_data(args.size, seed=args.seed))
+    sys.exit(0 if check(df, args.rows, args.trees, args.depth) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark des familles de préprocessing ('linear' : StandardScaler + one-hot,
+'tree' : variables numériques inchangées + codes ordinaux float32).
+
+Pour chaque modèle et chaque famille, mesure le temps d'entraînement et de
+prédiction du pipeline complet ainsi que la largeur et la taille de la matrice
+encodée. L'option --locations remplace Location par N modalités synthétiques
+pour mesurer l'effet de la cardinalité sur le one-hot.
+
+Usage:
+    python -m benchmarks.encoding_benchmark --sizes 10000,100000
+    python -m benchmarks.encoding_benchmark --sizes 100000 --locations 24,500 --output encoding.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+
+from benchmarks.pipeline_benchmark import MODEL_TYPES, measure
+from data.data_loader import normalize_data
+from data.synthetic import generate_synthetic_data
+from prediction.model_training import build_classifier
+from preprocessing.data_cleaning import MODEL_FAMILIES, prepare_data
+
+
+def with_locations(df, n_locations, seed):
+    """Remplace Location par n_locations modalités tirées uniformément"""
+    if not n_locations:
+        return df
+    rng = np.random.default_rng(seed)
+    locations = np.array([f"Zone_{i:04d}" for i in range(n_locations)], dtype=object)
+    return df.assign(Location=locations[rng.integers(0, n_locations, len(df))])
+
+
+def run_case(df, size, n_locations, model_type, family):
+    records = []
+    label = f"[{model_type}|{family}|loc={n_locations or 'orig'}]"
+    X, y, preprocessor, _, _ = prepare_data(df, family)
+
+    encoded, record = measure(f"encode{label}", size, lambda: clone(preprocessor).fit_transform(X))
+    record['width'] = encoded.shape[1]
+    record['matrix_mb'] = round(
+        (encoded.data.nbytes if hasattr(encoded, 'toarray') else encoded.nbytes) / 1024 ** 2, 2
+    )
+    records.append(record)
+
+    pipeline = Pipeline([('preprocessor', clone(preprocessor)), ('classifier', build_classifier(model_type))])
+    _, record = measure(f"fit{label}", size, lambda: pipeline.fit(X, y))
+    records.append(record)
+    _, record = measure(f"predict_proba{label}", size, lambda: pipeline.predict_proba(X))
+    records.append(record)
+
+    for record in records:
+        record.update({'model_type': model_type, 'family': family, 'locations': n_locations})
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000', help="Tailles de dataset séparées par des virgules")
+    parser.add_argument('--models', default=','.join(MODEL_TYPES), help="Modèles à entraîner")
+    parser.add_argument('--families', default=','.join(MODEL_FAMILIES), help="Familles de préprocessing")
+    parser.add_argument('--locations', default='0',
+                        help="Nombres de modalités de Location à simuler (0 : modalités d'origine)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Fichier de sortie JSON")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    models = [model for model in args.models.split(',') if model]
+    families = [family for family in args.families.split(',') if family]
+    location_counts = [int(count) for count in args.locations.split(',')]
+
+    results = []
+    for size in sizes:
+        df = normalize_data(generate_synthetic_data(size, seed=args.seed))
+        for n_locations in location_counts:
+            case_df = with_locations(df, n_locations, args.seed)
+            for model_type in models:
+                for family in families:
+                    results.extend(run_case(case_df, size, n_locations, model_type, family))
+
+    if args.output:
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'seed': args.seed,
+            },
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Mesure le coût d'import de chaque page et de ses dépendances lourdes.
+
+Chaque module est importé dans un interpréteur neuf avec ``-X importtime``
+afin que les caches de sys.modules ne faussent pas la mesure.
+
+Usage:
+    python -m benchmarks.import_time [--repeat 3] [--json resultats.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dépendances lourdes mesurées isolément
+DEPENDENCIES = [
+    "streamlit",
+    "pandas",
+    "plotly.express",
+    "plotly.figure_factory",
+    "sklearn.ensemble",
+    "sklearn.cluster",
+    "firebase_admin",
+]
+
+
+def page_modules():
+    """Retourne les modules de page déclarés dans ui.pages.PAGES, dans l'ordre du menu"""
+    sys.path.insert(0, PROJECT_ROOT)
+    from ui.pages import PAGES
+    return list(dict.fromkeys(["ui.pages"] + [module for module, _, _ in PAGES.values()]))
+
+
+def _importtime_entries(code):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None
+
+    # Format: "import time: self [us] | cumulative | imported package"
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure_import(module, startup_modules=frozenset()):
+    """
+    Importe un module dans un sous-processus et lit le rapport -X importtime
+
+    Args:
+        module: Nom du module à importer
+        startup_modules: Modules déjà importés au démarrage de l'interpréteur, ignorés
+
+    Returns:
+        dict avec le temps cumulé (ms) et les 5 sous-modules les plus coûteux,
+        ou None si l'import échoue
+    """
+    entries = _importtime_entries(f"import {module}")
+    if entries is None:
+        return None
+    entries = [entry for entry in entries if entry[0] not in startup_modules]
+
+    total_us = sum(self_us for _, self_us, _ in entries)
+    top_level = {}
+    for name, _, cumulative_us in entries:
+        root = name.split(".")[0]
+        top_level[root] = max(top_level.get(root, 0), cumulative_us)
+    heaviest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:5]
+
+    return {
+        "total_ms": total_us / 1000,
+        "heaviest": [{"package": name, "cumulative_ms": us / 1000} for name, us in heaviest],
+    }
+
+
+def run(modules, repeat):
+    startup_modules = frozenset(name for name, _, _ in _importtime_entries("pass") or [])
+    results = {}
+    for module in modules:
+        runs = [measure_import(module, startup_modules) for _ in range(repeat)]
+        if any(r is None for r in runs):
+            results[module] = {"error": "import impossible"}
+            continue
+        results[module] = {
+            "median_ms": statistics.median(r["total_ms"] for r in runs),
+            "heaviest": runs[-1]["heaviest"],
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="Nombre de mesures par module")
+    parser.add_argument("--json", help="Fichier de sortie JSON")
+    args = parser.parse_args()
+
+    results = run(page_modules() + DEPENDENCIES, args.repeat)
+
+    for module, result in results.items():
+        if "error" in result:
+            print(f"{module:<28} {result['error']}")
+            continue
+        heaviest = ", ".join(f"{h['package']} {h['cumulative_ms']:.0f}ms" for h in result["heaviest"][:3])
+        print(f"{module:<28} {result['median_ms']:>9.1f} ms   ({heaviest})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
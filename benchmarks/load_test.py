@@ -0,0 +1,342 @@
+"""
+Test de charge de l'application avec des sessions simultanées.
+
+Chaque session simulée (streamlit.testing AppTest) parcourt les pages Aperçu,
+Segmentation, Prédiction et Évaluation des Modèles avec des interactions
+scriptées, sur des données synthétiques et avec Firestore remplacé par
+FakeFirestore.
+
+Chaque processus de test enchaîne une session de préchauffage (imports,
+chargement du dataset) puis, à chaque vague, ouvre plusieurs sessions qui
+restent vivantes jusqu'à la fin du processus et partagent ses caches, son
+pool de tâches et son GIL. AppTest modifie un état global de Streamlit
+pendant chaque rerun : les sessions d'un même processus exécutent donc leurs
+reruns à tour de rôle (page par page), tandis que leurs tâches d'arrière-plan
+tournent en même temps. Les reruns ne sont réellement simultanés qu'entre
+processus, qui ne partagent pas leurs caches. Les vagues démarrent
+simultanément dans tous les processus.
+
+Le rapport donne les percentiles de latence des reruns par page (hors
+préchauffage), la croissance de la mémoire résidente (RSS) par session
+vivante, mesurée vague par vague après le préchauffage, et le débit.
+
+Usage:
+    python -m benchmarks.load_test --processes 4 --sessions-per-process 4 --size 50000
+    python -m benchmarks.load_test --processes 8 --rounds 2 --pages Aperçu,Segmentation --output charge.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+APP_PATH = os.path.join(PROJECT_ROOT, "app.py")
+PAGE_ORDER = ["Aperçu", "Segmentation", "Prédiction", "Évaluation des Modèles"]
+PERCENTILES = (50, 90, 95, 99)
+# Intervalle entre deux reruns pendant l'attente d'une tâche d'arrière-plan (s)
+POLL_INTERVAL = 0.5
+LIMITATIONS = (
+    "Les reruns des sessions d'un même processus sont exécutés à tour de rôle (AppTest) : "
+    "seules leurs tâches d'arrière-plan s'exécutent en même temps. Les reruns simultanés "
+    "viennent de processus distincts, qui ne partagent ni caches ni pool de tâches."
+)
+
+
+def rss_mb():
+    """Mémoire résidente du processus (Mo)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError):
+        # Hors Linux : pic de mémoire résidente (Ko sous Linux, octets sous macOS)
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def percentiles(values):
+    """Percentiles (ms) d'une liste de durées en secondes"""
+    if len(values) < 2:
+        return {f"p{p}": round(values[0] * 1000, 1) if values else None for p in PERCENTILES}
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {f"p{p}": round(cuts[p - 1] * 1000, 1) for p in PERCENTILES}
+
+
+def _widget(widgets, label):
+    """Retourne le widget portant ce libellé"""
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"Widget introuvable: {label}")
+
+
+class Session:
+    """
+    Session simulée : chaque rerun est chronométré et enregistré par page et par action
+
+    Args:
+        index: Numéro de la session
+        timeout: Durée maximale d'un rerun (s)
+    """
+
+    def __init__(self, index, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.index = index
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.records = []
+        self.errors = []
+
+    def run(self, page, action):
+        start = time.perf_counter()
+        self.app.run()
+        self.records.append({'page': page, 'action': action, 'latency_s': time.perf_counter() - start})
+        for exception in self.app.exception:
+            self.errors.append(f"{page} / {action}: {exception.message}")
+
+    def open_page(self, page):
+        self.app.sidebar.selectbox[0].set_value(page)
+        self.run(page, "ouverture")
+
+    def has_running_jobs(self):
+        """Vrai si une tâche d'arrière-plan affiche sa progression"""
+        return bool(self.app.get("progress"))
+
+    def overview(self):
+        page = "Aperçu"
+        self.open_page(page)
+        region = _widget(self.app.selectbox, "Région")
+        if len(region.options) > 1:
+            region.set_value(region.options[1 + self.index % (len(region.options) - 1)])
+            self.run(page, "filtre région")
+
+    def segmentation(self):
+        page = "Segmentation"
+        self.open_page(page)
+        _widget(self.app.slider, "Nombre de segments").set_value(2 + self.index % 4)
+        _widget(self.app.button, "Exécuter la segmentation").click()
+        self.run(page, "segmentation")
+
+    def prediction(self):
+        page = "Prédiction"
+        self.open_page(page)
+        _widget(self.app.radio, "Type de prédiction").set_value("Prédire pour un groupe de clients")
+        self.run(page, "prédiction de groupe")
+        _widget(self.app.button, "Lancer la prédiction pour le groupe").click()
+        self.run(page, "lancement")
+
+    def evaluation(self):
+        page = "Évaluation des Modèles"
+        self.open_page(page)
+        _widget(self.app.button, "Lancer l'évaluation des modèles").click()
+        self.run(page, "lancement")
+
+    def start(self):
+        """Premier affichage ; retourne False en cas d'échec"""
+        try:
+            self.run("Démarrage", "premier affichage")
+            return True
+        except Exception as exc:
+            self.errors.append(f"Démarrage: {type(exc).__name__}: {exc}")
+            return False
+
+    def step(self, page):
+        """Interactions scriptées d'une page, sans attendre les tâches lancées"""
+        steps = {
+            "Aperçu": self.overview,
+            "Segmentation": self.segmentation,
+            "Prédiction": self.prediction,
+            "Évaluation des Modèles": self.evaluation,
+        }
+        try:
+            steps[page]()
+        except Exception as exc:
+            self.errors.append(f"{page}: {type(exc).__name__}: {exc}")
+
+
+def wait_for_jobs(sessions, page, job_timeout):
+    """Relance à tour de rôle les sessions dont une tâche d'arrière-plan est en cours"""
+    deadline = time.monotonic() + job_timeout
+    pending = [session for session in sessions if session.has_running_jobs()]
+    while pending:
+        if time.monotonic() > deadline:
+            for session in pending:
+                session.errors.append(f"{page}: tâche non terminée après {job_timeout:.0f}s")
+            return
+        time.sleep(POLL_INTERVAL)
+        for session in pending:
+            try:
+                session.run(page, "suivi de tâche")
+            except Exception as exc:
+                session.errors.append(f"{page}: {type(exc).__name__}: {exc}")
+        pending = [session for session in pending if session.has_running_jobs()]
+
+
+def walk_sessions(sessions, pages, job_timeout):
+    """
+    Parcourt les pages avec les sessions à tour de rôle : chaque page est ouverte
+    par toutes les sessions, dont les tâches d'arrière-plan s'exécutent ensemble,
+    avant de passer à la suivante
+    """
+    sessions = [session for session in sessions if session.start()]
+    for page in pages:
+        for session in sessions:
+            session.step(page)
+        wait_for_jobs(sessions, page, job_timeout)
+
+
+def session_worker(index, pages, rounds, per_process, timeout, job_timeout, barrier):
+    """
+    Processus de test : une session de préchauffage puis per_process sessions par
+    vague, gardées vivantes jusqu'à la fin du processus
+
+    Returns:
+        dict avec les reruns et erreurs des vagues, la RSS après le préchauffage et
+        après chaque vague (sessions vivantes), et les instants de début et de fin des vagues
+    """
+    from config.firebase_config import set_firestore_client
+    from export.fake_firestore import FakeFirestore
+    set_firestore_client(FakeFirestore())
+
+    warmup = Session(index, timeout)
+    walk_sessions([warmup], pages, job_timeout)
+    rss = [rss_mb()]
+    errors = [f"préchauffage: {error}" for error in warmup.errors]
+    live = []
+    started_at = finished_at = None
+    for round_index in range(rounds):
+        # Départ simultané des vagues de tous les processus pour mesurer la contention
+        barrier.wait()
+        started_at = started_at or time.time()
+        sessions = [Session(index + (round_index * per_process + k) * 10_000, timeout)
+                    for k in range(per_process)]
+        walk_sessions(sessions, pages, job_timeout)
+        finished_at = time.time()
+        live += sessions
+        rss.append(rss_mb())
+    records = [dict(record, round=round_index)
+               for round_index in range(rounds)
+               for session in live[round_index * per_process:(round_index + 1) * per_process]
+               for record in session.records]
+    errors += [error for session in live for error in session.errors]
+    return {'records': records, 'errors': errors, 'rss': rss, 'live_sessions': len(live),
+            'started_at': started_at, 'finished_at': finished_at}
+
+
+def run_sessions(n_processes, per_process, pages, rounds, timeout, job_timeout):
+    """Lance n_processes processus de test et retourne leurs résultats"""
+    context = multiprocessing.get_context('spawn')
+    with context.Manager() as manager:
+        barrier = manager.Barrier(n_processes)
+        with ProcessPoolExecutor(max_workers=n_processes, mp_context=context) as pool:
+            futures = [pool.submit(session_worker, index, pages, rounds, per_process,
+                                   timeout, job_timeout, barrier)
+                       for index in range(n_processes)]
+            return [future.result() for future in futures]
+
+
+def summarize(workers, rounds, per_process):
+    latencies = defaultdict(list)
+    actions = defaultdict(list)
+    for worker in workers:
+        for record in worker['records']:
+            latencies[record['page']].append(record['latency_s'])
+            actions[f"{record['page']} / {record['action']}"].append(record['latency_s'])
+    n_reruns = sum(len(values) for values in latencies.values())
+    n_sessions = len(workers) * rounds * per_process
+    wall_s = max(w['finished_at'] for w in workers) - min(w['started_at'] for w in workers)
+    # Croissance de la RSS de chaque processus pendant chaque vague, par session ajoutée
+    # (les sessions des vagues précédentes restent vivantes)
+    deltas = [[(w['rss'][k + 1] - w['rss'][k]) / per_process for w in workers] for k in range(rounds)]
+    return {
+        'sessions': n_sessions,
+        'processes': len(workers),
+        'live_sessions_per_process': rounds * per_process,
+        'limitations': LIMITATIONS,
+        'wall_s': round(wall_s, 2),
+        'reruns': n_reruns,
+        'throughput': {
+            'reruns_per_s': round(n_reruns / wall_s, 2),
+            'sessions_per_min': round(n_sessions / wall_s * 60, 2),
+        },
+        'rss_mb': {
+            'after_warmup': round(statistics.mean(w['rss'][0] for w in workers), 1),
+            'end': round(statistics.mean(w['rss'][-1] for w in workers), 1),
+            'growth_per_live_session_by_round': [round(statistics.mean(delta), 2) for delta in deltas],
+            'growth_per_live_session': round(statistics.mean(d for delta in deltas for d in delta), 2),
+        },
+        'pages': {page: {'reruns': len(values), **percentiles(values)} for page, values in latencies.items()},
+        'actions': {action: {'reruns': len(values), **percentiles(values)} for action, values in actions.items()},
+        'errors': [error for worker in workers for error in worker['errors']],
+    }
+
+
+def print_report(report):
+    print(f"\n{report['sessions']} sessions ({report['processes']} processus) en {report['wall_s']:.1f}s — "
+          f"{report['throughput']['reruns_per_s']:.1f} reruns/s, "
+          f"{report['throughput']['sessions_per_min']:.1f} sessions/min")
+    rss = report['rss_mb']
+    by_round = ", ".join(f"{delta:+.1f}" for delta in rss['growth_per_live_session_by_round'])
+    print(f"RSS par processus: {rss['after_warmup']:.0f} Mo après préchauffage -> {rss['end']:.0f} Mo "
+          f"avec {report['live_sessions_per_process']} sessions vivantes "
+          f"({rss['growth_per_live_session']:+.1f} Mo par session vivante ; par vague: {by_round})")
+    print(f"Limite: {report['limitations']}")
+    print(f"\n{'Page':<28}{'reruns':>8}" + "".join(f"{f'p{p} (ms)':>12}" for p in PERCENTILES))
+    for page, stats in report['pages'].items():
+        print(f"{page:<28}{stats['reruns']:>8}"
+              + "".join(f"{stats[f'p{p}']:>12.1f}" for p in PERCENTILES))
+    if report['errors']:
+        print(f"\n{len(report['errors'])} erreurs:")
+        for error in report['errors'][:20]:
+            print(f"  {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4, help="Processus de test simultanés")
+    parser.add_argument('--sessions-per-process', type=int, default=4,
+                        help="Sessions ouvertes par processus à chaque vague, à tour de rôle")
+    parser.add_argument('--rounds', type=int, default=1, help="Nombre de vagues de sessions")
+    parser.add_argument('--size', type=int, default=50_000, help="Nombre de clients synthétiques")
+    parser.add_argument('--pages', default=','.join(PAGE_ORDER), help="Pages parcourues, dans l'ordre")
+    parser.add_argument('--timeout', type=float, default=120.0, help="Durée maximale d'un rerun (s)")
+    parser.add_argument('--job-timeout', type=float, default=600.0,
+                        help="Attente maximale d'une tâche d'arrière-plan (s)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Fichier de sortie JSON")
+    args = parser.parse_args()
+
+    pages = [page for page in args.pages.split(',') if page]
+    unknown = [page for page in pages if page not in PAGE_ORDER]
+    if unknown:
+        parser.error(f"Pages inconnues: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Configuration lue à l'import des modules de l'application, héritée par les processus de test
+        os.environ["CHURN_DATA_PATH"] = os.path.join(directory, "clients.csv")
+        os.environ["CHURN_QUERY_STORE_DIR"] = os.path.join(directory, "cache")
+        os.environ["CHURN_PARTITION_CACHE_DIR"] = os.path.join(directory, "cache", "partitions")
+
+        from data.synthetic import write_synthetic_csv
+        write_synthetic_csv(os.environ["CHURN_DATA_PATH"], args.size, seed=args.seed)
+
+        workers = run_sessions(args.processes, args.sessions_per_process, pages, args.rounds,
+                               args.timeout, args.job_timeout)
+        report = summarize(workers, args.rounds, args.sessions_per_process)
+        report['config'] = {key: value for key, value in vars(args).items() if key != 'output'}
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Benchmark des étapes du pipeline de churn sur des données synthétiques.
+
+Chaque étape est chronométrée (temps réel et CPU) sans instrumentation, puis
+exécutée une seconde fois sous tracemalloc pour mesurer son pic mémoire : le
+coût du traçage des allocations ne fausse pas les temps. Les résultats sont
+écrits en JSON et peuvent être comparés à un run de référence pour détecter
+les régressions.
+
+Usage:
+    python -m benchmarks.pipeline_benchmark --sizes 10000,100000 --output run.json
+    python -m benchmarks.pipeline_benchmark --sizes 10000 --compare run.json
+    python -m benchmarks.pipeline_benchmark --sizes 1000000 --no-memory
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.data_loader import normalize_data
+from data.synthetic import generate_synthetic_data
+from export.fake_firestore import FakeFirestore
+from export.firebase_export import prepare_export_data, run_export
+from prediction.model_prediction import predict_future_churn
+from prediction.model_training import model_family, train_model
+from preprocessing.data_cleaning import clean_customer_ids, prepare_data
+from segmentation.customer_segmentation import perform_segmentation
+
+MODEL_TYPES = ['RandomForest', 'GradientBoosting', 'DecisionTree']
+SEGMENTATION_FEATURES = ['Tenure (Months)', 'Monthly Charges', 'Total Charges']
+# Au-delà de cet écart relatif, une étape est signalée comme régression
+REGRESSION_THRESHOLD = 0.10
+
+
+def measure(stage, size, fn, rows=None, memory=True):
+    """
+    Exécute fn en mesurant temps réel et temps CPU, puis, si memory est vrai, une
+    seconde fois sous tracemalloc pour mesurer le pic mémoire. fn doit donc pouvoir
+    être exécutée deux fois.
+
+    Returns:
+        (résultat de la première exécution de fn, dict de mesures)
+    """
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    result = fn()
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_mb = round(peak / 1024 ** 2, 2)
+
+    record = {
+        'stage': stage,
+        'size': size,
+        'rows': size if rows is None else rows,
+        'wall_s': round(wall, 4),
+        'cpu_s': round(cpu, 4),
+        'peak_mb': peak_mb,
+    }
+    peak_text = "" if peak_mb is None else f"  pic {peak_mb:>9.1f} Mo"
+    print(f"{size:>10} {stage:<34} {wall:>9.3f}s  cpu {cpu:>9.3f}s{peak_text}")
+    return result, record
+
+
+def run_size(size, seed, models, export_limit, export_latency, memory=True):
+    records = []
+    raw = generate_synthetic_data(size, seed=seed)
+
+    _, record = measure('clean_customer_ids', size, lambda: clean_customer_ids(raw.copy()), memory=memory)
+    records.append(record)
+
+    df = normalize_data(raw)
+    del raw
+
+    (X, y, _, _, _), record = measure('prepare_data', size, lambda: prepare_data(df), memory=memory)
+    records.append(record)
+
+    pipelines = {}
+    for model_type in models:
+        preprocessor = prepare_data(df, model_family(model_type))[2]
+        (pipeline, _), record = measure(
+            f'train_model[{model_type}]', size,
+            lambda: train_model(X, y, preprocessor, model_type), memory=memory
+        )
+        pipelines[model_type] = pipeline
+        records.append(record)
+
+    for model_type, pipeline in pipelines.items():
+        _, record = measure(
+            f'predict_future_churn[{model_type}]', size,
+            lambda: predict_future_churn(pipeline, df, months=3), memory=memory
+        )
+        records.append(record)
+
+    _, record = measure(
+        'perform_segmentation', size,
+        lambda: perform_segmentation(df.copy(), SEGMENTATION_FEATURES, n_clusters=3), memory=memory
+    )
+    records.append(record)
+
+    limit = min(size, export_limit)
+    export_data, record = measure('prepare_export_data', size, lambda: prepare_export_data(df, limit=limit),
+                                  rows=limit, memory=memory)
+    records.append(record)
+
+    # Export vers le faux client Firestore en mémoire (latence simulée par commit)
+    _, record = measure(
+        'run_export[fake_firestore]', size,
+        lambda: run_export(FakeFirestore(latency=export_latency), export_data),
+        rows=limit, memory=memory
+    )
+    records.append(record)
+
+    return records
+
+
+def compare(results, baseline_path):
+    """Affiche l'écart de temps réel par étape par rapport à un run de référence"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['stage'], r['size']): r for r in json.load(f)['results']}
+
+    regressions = 0
+    print(f"\nComparaison avec {baseline_path}")
+    for record in results:
+        reference = baseline.get((record['stage'], record['size']))
+        if reference is None or not reference['wall_s']:
+            continue
+        delta = record['wall_s'] / reference['wall_s'] - 1
+        flag = "REGRESSION" if delta > REGRESSION_THRESHOLD else ""
+        regressions += bool(flag)
+        print(f"{record['size']:>10} {record['stage']:<34} {delta:>+8.1%} {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000',
+                        help="Tailles de dataset séparées par des virgules (ex: 10000,1000000,10000000)")
+    parser.add_argument('--models', default=','.join(MODEL_TYPES), help="Modèles à entraîner")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--export-limit', type=int, default=100_000,
+                        help="Nombre maximum de clients exportés vers le faux Firestore")
+    parser.add_argument('--export-latency', type=float, default=0.0,
+                        help="Latence simulée (secondes) par commit Firestore")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="Ne pas mesurer le pic mémoire (chaque étape n'est exécutée qu'une fois)")
+    parser.add_argument('--output', help="Fichier de sortie JSON")
+    parser.add_argument('--compare', help="Run JSON de référence à comparer")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    models = [model for model in args.models.split(',') if model]
+
+    results = []
+    for size in sizes:
+        results.extend(run_size(size, args.seed, models, args.export_limit, args.export_latency,
+                                not args.no_memory))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'export_latency': args.export_latency,
+            'memory': not args.no_memory,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare and compare(results, args.compare):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,124 @@
 import os
-import firebase_admin
-from firebase_admin import credentials, firestore
+import threading
+import time
 import streamlit as st
 
+# Intervalle minimal (secondes) entre deux vérifications de santé du client
+HEALTH_CHECK_INTERVAL = 300
+# Durée maximale (secondes) d'une vérification de santé ; au-delà le client est considéré hors service
+HEALTH_CHECK_TIMEOUT = 5
+
+# Client Firestore partagé par toutes les sessions du processus.
+# firebase_admin n'est importé qu'à la première création du client.
+_client = None
+_client_lock = threading.Lock()
+_last_health_check = 0.0
+
+
+def get_credentials_path():
+    """
+    Retourne le chemin du fichier de credentials Firebase
+    (credentials/firebase_credentials.json à la racine du projet)
+    """
+    base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_path, "credentials", "firebase_credentials.json")
+
+
+def _create_client():
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(get_credentials_path())
+        firebase_admin.initialize_app(cred)
+    return firestore.client()
+
+
+def _is_healthy(client, timeout=HEALTH_CHECK_TIMEOUT):
+    """
+    Vérifie que le client répond. La requête est faite dans un thread séparé :
+    un réseau qui ne répond pas ne bloque pas l'appelant plus de timeout secondes.
+    """
+    result = []
+
+    def check():
+        try:
+            # Requête légère : lecture d'au plus une collection
+            next(iter(client.collections()), None)
+            result.append(True)
+        except Exception:
+            result.append(False)
+
+    thread = threading.Thread(target=check, name="firestore-health-check", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return result == [True]
+
+
+def _close_client():
+    global _client
+    _client = None
+
+    import firebase_admin
+    for app in list(firebase_admin._apps.values()):
+        firebase_admin.delete_app(app)
+
+
+def get_firestore_client():
+    """
+    Retourne le client Firestore partagé, en le créant au premier appel.
+    Le client est vérifié au plus toutes les HEALTH_CHECK_INTERVAL secondes
+    et recréé s'il ne répond plus. La vérification est faite hors du verrou :
+    les autres sessions continuent d'utiliser le client courant pendant ce temps.
+    Les erreurs de création sont propagées.
+
+    Returns:
+        Client Firestore
+    """
+    global _client, _last_health_check
+    with _client_lock:
+        client = _client
+        check = client is not None and time.monotonic() - _last_health_check >= HEALTH_CHECK_INTERVAL
+        if check:
+            # Une seule session effectue la vérification
+            _last_health_check = time.monotonic()
+
+    if check and not _is_healthy(client):
+        with _client_lock:
+            # Le client a pu être remplacé pendant la vérification (set_firestore_client)
+            if _client is client:
+                _close_client()
+
+    with _client_lock:
+        if _client is None:
+            _client = _create_client()
+            _last_health_check = time.monotonic()
+        return _client
+
+
+def set_firestore_client(client):
+    """
+    Remplace le client partagé (ex: FakeFirestore pour les tests et benchmarks)
+
+    Args:
+        client: Client compatible Firestore, ou None pour revenir au client réel
+    """
+    global _client, _last_health_check
+    with _client_lock:
+        _client = client
+        _last_health_check = time.monotonic() if client is not None else 0.0
+
+
+def has_firestore_client():
+    """Indique si un client Firestore est déjà disponible dans le processus"""
+    return _client is not None
+
+
+def mark_firestore_client_suspect():
+    """Force une vérification de santé du client au prochain appel (ex: après une erreur d'export)"""
+    global _last_health_check
+    _last_health_check = 0.0
+
 
 def init_firebase():
     """
@@ -10,10 +126,8 @@ def init_firebase():
     Retourne un client Firestore ou None en cas d'erreur.
     """
     try:
-        if not firebase_admin._apps:
-            # Chemin absolu vers le dossier credentials
-            base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            credentials_path = os.path.join(base_path, "credentials", "firebase_credentials.json")
+        if _client is None:
+            credentials_path = get_credentials_path()
 
             if not os.path.exists(credentials_path):
                 st.error(f"""
@@ -26,9 +140,7 @@ def init_firebase():
                 """)
                 return None
 
-            cred = credentials.Certificate(credentials_path)
-            firebase_admin.initialize_app(cred)
-        return firestore.client()
+        return get_firestore_client()
     except Exception as e:
         st.error(f"""
         Erreur d'initialisation Firebase: {str(e)}
@@ -38,4 +150,4 @@ def init_firebase():
         2. Les permissions sont correctement configurées
         3. Le service Firebase est actif
         """)
-        return None
\ No newline at end of file
+        return None
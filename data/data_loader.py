@@ -1,65 +1,321 @@
+import glob
+import hashlib
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 import streamlit as st
-from preprocessing.data_cleaning import clean_customer_ids
+from data.query_store import QUERY_BACKEND, PandasQueryStore, SqliteQueryStore
+from preprocessing.data_cleaning import check_customer_ids, clean_customer_ids, standardize_customer_ids
+from utils.resource_cache import get_resource_cache, hold
+from utils.tracing import traced
 
 
-@st.cache_data
-def load_data():
+# Source du dataset, configurable via la variable d'environnement CHURN_DATA_PATH :
+# un fichier CSV, un dossier de partitions (*.csv, sous-dossiers compris) ou un motif glob
+DATA_PATH = os.environ.get(
+    "CHURN_DATA_PATH",
+    "C:/Users/issam/Desktop/PFE_master/churn_dataset_tunisie_telecom_project.csv"
+)
+# Motif des partitions recherchées dans un dossier
+PARTITION_PATTERN = "**/*.csv"
+# Nombre de partitions lues simultanément, configurable via CHURN_LOAD_WORKERS
+LOAD_WORKERS = int(os.environ.get("CHURN_LOAD_WORKERS", str(min(8, os.cpu_count() or 1))))
+# Partitions normalisées conservées sur disque entre deux versions du dataset (un
+# sous-dossier par source), configurable via CHURN_PARTITION_CACHE_DIR
+PARTITION_CACHE_DIR = os.environ.get(
+    "CHURN_PARTITION_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "partitions")
+)
+
+EXPECTED_COLUMNS = {
+    'numeric': ['Age', 'Tenure (Months)', 'Monthly Charges', 'Total Charges',
+                'Data Usage (GB)', 'Call Usage (Minutes)', 'Support Calls',
+                'Satisfaction Score', 'Churn'],
+    'categorical': ['Location', 'Contract Type', 'Payment Method']
+}
+
+
+def normalize_data(df, check_ids=True):
+    """
+    Normalise un DataFrame brut : noms de colonnes, types, CLV et CustomerID.
+
+    Args:
+        df: DataFrame brut au format du dataset de churn
+        check_ids: Si False, les CustomerID sont seulement standardisés, et laissés vides
+            s'ils sont absents ; l'attribution, la vérification de validité et d'unicité
+            sont laissées à l'appelant (partitions d'un dataset)
+
+    Returns:
+        DataFrame normalisé
+
+    Raises:
+        ValueError si des colonnes attendues sont absentes
+    """
+    # Nettoyage des noms de colonnes
+    df.columns = [col.strip() for col in df.columns]
+
+    # Vérification et mapping des noms de colonnes
+    col_mapping = {}
+    missing_cols = []
+
+    for col in EXPECTED_COLUMNS['numeric'] + EXPECTED_COLUMNS['categorical']:
+        if col not in df.columns:
+            simplified = col.lower().replace(' ', '').replace('(', '').replace(')', '')
+            found = False
+            for actual_col in df.columns:
+                if actual_col.lower().replace(' ', '').replace('(', '').replace(')', '') == simplified:
+                    col_mapping[actual_col] = col
+                    found = True
+                    break
+            if not found:
+                missing_cols.append(col)
+
+    if missing_cols:
+        raise ValueError(f"Colonnes manquantes: {', '.join(missing_cols)}")
+
+    # Renommage des colonnes
+    df = df.rename(columns=col_mapping)
+
+    # Conversion des types
+    df['Churn'] = df['Churn'].astype(int)
+
+    # Calcul CLV
+    df['CLV'] = df['Total Charges'] * (1 - df['Churn'])
+
+    # Gestion des CustomerID
+    df = clean_customer_ids(df) if check_ids else standardize_customer_ids(df, generate_missing=False)
+
+    return df
+
+
+def resolve_partitions(source=None):
+    """
+    Liste les fichiers composant le dataset
+
+    Args:
+        source: Fichier CSV, dossier de partitions ou motif glob (par défaut DATA_PATH)
+
+    Returns:
+        Liste triée des chemins absolus des partitions
+
+    Raises:
+        FileNotFoundError si aucune partition n'est trouvée
+    """
+    source = source or DATA_PATH
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, PARTITION_PATTERN), recursive=True)
+    elif any(char in source for char in '*?['):
+        paths = glob.glob(source, recursive=True)
+    else:
+        return [os.path.abspath(source)]
+
+    paths = sorted(os.path.abspath(path) for path in paths if os.path.isfile(path))
+    if not paths:
+        raise FileNotFoundError(f"Aucune partition trouvée pour {source}")
+    return paths
+
+
+def partition_fingerprints(source=None):
+    """
+    Returns:
+        Liste de (chemin, date de modification en ns, taille) pour chaque partition
+    """
+    fingerprints = []
+    for path in resolve_partitions(source):
+        stat = os.stat(path)
+        fingerprints.append((path, stat.st_mtime_ns, stat.st_size))
+    return fingerprints
+
+
+def _version(fingerprints):
+    content = "\n".join(f"{path}|{mtime}|{size}" for path, mtime, size in fingerprints)
+    return hashlib.md5(content.encode()).hexdigest()[:12]
+
+
+def get_data_version(path=None):
+    """
+    Calcule la version du dataset à partir du chemin, de la date de modification et
+    de la taille de chacune de ses partitions
+
+    Args:
+        path: Fichier CSV, dossier de partitions ou motif glob (par défaut DATA_PATH)
+
+    Returns:
+        Identifiant court de version
+    """
+    return _version(partition_fingerprints(path))
+
+
+def _partition_cache_dir(source):
+    """Sous-dossier du cache disque propre à une source (fichier, dossier ou motif glob)"""
+    source = source or DATA_PATH
+    key = source if any(char in source for char in '*?[') else os.path.abspath(source)
+    return os.path.join(PARTITION_CACHE_DIR, hashlib.md5(key.encode()).hexdigest()[:12])
+
+
+def _partition_cache_path(cache_dir, fingerprint):
+    return os.path.join(cache_dir, _version([fingerprint]) + ".pkl")
+
+
+def _load_partition(cache_dir, fingerprint):
+    """
+    Lit et normalise une partition. La partition normalisée est conservée sur disque
+    selon son empreinte, et non en mémoire à côté du dataset concaténé.
+    """
+    path = fingerprint[0]
+    cached = _partition_cache_path(cache_dir, fingerprint)
+    if os.path.exists(cached):
+        return pd.read_pickle(cached)
+
+    try:
+        df = normalize_data(pd.read_csv(path), check_ids=False)
+    except Exception as e:
+        raise ValueError(f"{os.path.basename(path)}: {e}") from e
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temporary = f"{cached}.{uuid.uuid4().hex[:8]}.tmp"
+        df.to_pickle(temporary)
+        os.replace(temporary, cached)
+    except OSError:
+        # Cache disque indisponible (droits, espace) : la partition sera relue
+        pass
+    return df
+
+
+def _prune_partition_cache(cache_dir, fingerprints):
+    """
+    Supprime du disque les partitions normalisées de la source qui ne font plus partie
+    du dataset ; les caches des autres sources ne sont pas concernés
+    """
+    current = {os.path.basename(_partition_cache_path(cache_dir, fingerprint)) for fingerprint in fingerprints}
+    for cached in glob.glob(os.path.join(cache_dir, "*.pkl")):
+        if os.path.basename(cached) not in current:
+            try:
+                os.remove(cached)
+            except OSError:
+                pass
+
+
+def partition_period_key(path):
+    """
+    Clé de tri d'une partition selon la période portée par son chemin (ex: clients_2024-03.csv,
+    2024/03/clients.csv), en ordre naturel : les nombres sont comparés par valeur, de sorte que
+    clients_2024-9 précède clients_2024-10. La date de modification du fichier n'est pas utilisée :
+    une ancienne extraction recopiée ne devient pas la plus récente.
+    """
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part.lower())
+            for part in re.split(r'(\d+)', path) if part]
+
+
+def latest_customer_rows(df, order):
+    """
+    Ne conserve que la ligne la plus récente de chaque CustomerID : un client apparaît
+    dans l'extraction de chaque mois où il est actif
+
+    Args:
+        df: DataFrame concaténé avec CustomerID standardisés
+        order: Rang de récence de la partition de chaque ligne (plus grand = plus récent)
+
+    Returns:
+        DataFrame dédupliqué (les lignes sans CustomerID, notamment celles des partitions
+        dépourvues de colonne CustomerID, sont toutes conservées)
+    """
+    ids = df['CustomerID'].to_numpy()
+    keep = pd.isna(ids)
+    rows = np.flatnonzero(~keep)
+    # Tri stable par récence : la dernière occurrence de chaque identifiant est la plus récente
+    rows = rows[np.argsort(order[rows], kind='stable')]
+    keep[rows[~pd.Series(ids[rows]).duplicated(keep='last').to_numpy()]] = True
+    return df if keep.all() else df[keep].reset_index(drop=True)
+
+
+def _load_partitions(fingerprints, source=None):
+    """
+    Lit les partitions en parallèle et les concatène. Seules les partitions absentes
+    du cache disque (nouvelles ou modifiées) sont relues depuis le CSV. Un client
+    présent dans plusieurs partitions est représenté par sa ligne de la partition
+    la plus récente (voir partition_period_key). Les partitions sans CustomerID ne
+    sont pas dédupliquées : leurs identifiants sont attribués après concaténation.
+    """
+    if len(fingerprints) == 1:
+        return normalize_data(pd.read_csv(fingerprints[0][0]))
+
+    cache_dir = _partition_cache_dir(source)
+    with ThreadPoolExecutor(max_workers=min(LOAD_WORKERS, len(fingerprints)),
+                            thread_name_prefix="churn-load") as pool:
+        frames = list(pool.map(lambda fingerprint: _load_partition(cache_dir, fingerprint), fingerprints))
+    _prune_partition_cache(cache_dir, fingerprints)
+
+    # Rang de récence de chaque partition, répété pour chacune de ses lignes
+    ranked = sorted((path for path, _, _ in fingerprints), key=partition_period_key)
+    ranks = {path: rank for rank, path in enumerate(ranked)}
+    order = np.repeat([ranks[path] for path, _, _ in fingerprints], [len(frame) for frame in frames])
+    df = pd.concat(frames, ignore_index=True)
+    del frames
+    return check_customer_ids(latest_customer_rows(df, order))
+
+
+@traced("load_data")
+def load_data(path=None):
     """
     Charge les données du dataset de churn Tunisie Telecom.
     Applique un nettoyage initial et retourne un DataFrame.
 
+    Le DataFrame est partagé par toutes les sessions via le cache de
+    ressources du processus et ne doit pas être modifié en place.
+
+    Args:
+        path: Fichier CSV, dossier de partitions ou motif glob (par défaut DATA_PATH)
+
     Returns:
         DataFrame ou None en cas d'erreur
     """
     try:
-        path = "C:/Users/issam/Desktop/PFE_master/churn_dataset_tunisie_telecom_project.csv"  # Assuming the file is in the project root
-        df = pd.read_csv(path)
-
-        # Nettoyage des noms de colonnes
-        df.columns = [col.strip() for col in df.columns]
-
-        # Vérification des colonnes
-        expected_cols = {
-            'numeric': ['Age', 'Tenure (Months)', 'Monthly Charges', 'Total Charges',
-                        'Data Usage (GB)', 'Call Usage (Minutes)', 'Support Calls',
-                        'Satisfaction Score', 'Churn'],
-            'categorical': ['Location', 'Contract Type', 'Payment Method']
-        }
-
-        # Vérification et mapping des noms de colonnes
-        col_mapping = {}
-        missing_cols = []
-
-        for col in expected_cols['numeric'] + expected_cols['categorical']:
-            if col not in df.columns:
-                simplified = col.lower().replace(' ', '').replace('(', '').replace(')', '')
-                found = False
-                for actual_col in df.columns:
-                    if actual_col.lower().replace(' ', '').replace('(', '').replace(')', '') == simplified:
-                        col_mapping[col] = actual_col
-                        found = True
-                        break
-                if not found:
-                    missing_cols.append(col)
-
-        if missing_cols:
-            st.error(f"Colonnes manquantes: {', '.join(missing_cols)}")
-            return None
-
-        # Renommage des colonnes
-        df = df.rename(columns=col_mapping)
-
-        # Conversion des types
-        df['Churn'] = df['Churn'].astype(int)
-
-        # Calcul CLV
-        df['CLV'] = df['Total Charges'] * (1 - df['Churn'])
-
-        # Gestion des CustomerID
-        df = clean_customer_ids(df)
-
+        fingerprints = partition_fingerprints(path)
+        key = ('dataset', _version(fingerprints))
+        df = _get_dataset(fingerprints, path)
+        hold(st.session_state, 'dataset', key)
         return df
     except Exception as e:
         st.error(f"Erreur de chargement: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+
+def _get_dataset(fingerprints, source=None):
+    return get_resource_cache().get_or_create(('dataset', _version(fingerprints)),
+                                              lambda: _load_partitions(fingerprints, source))
+
+
+def get_query_store(path=None, backend=None):
+    """
+    Retourne le moteur de requêtes du dataset (voir data.query_store), partagé
+    entre sessions. Avec le moteur SQLite, une base déjà construite pour la
+    version du dataset est réutilisée sans recharger les données.
+
+    Args:
+        path: Fichier CSV, dossier de partitions ou motif glob (par défaut DATA_PATH)
+        backend: 'pandas' ou 'sqlite' (par défaut QUERY_BACKEND)
+
+    Returns:
+        QueryStore ou None en cas d'erreur
+    """
+    backend = backend or QUERY_BACKEND
+    try:
+        fingerprints = partition_fingerprints(path)
+        version = _version(fingerprints)
+
+        def build():
+            if backend == 'sqlite':
+                return SqliteQueryStore.open_or_build(version, lambda: _get_dataset(fingerprints, path))
+            return PandasQueryStore(_get_dataset(fingerprints, path))
+
+        key = ('query_store', backend, version)
+        store = get_resource_cache().get_or_create(key, build)
+        hold(st.session_state, 'query_store', key)
+        return store
+    except Exception as e:
+        st.error(f"Erreur de chargement: {str(e)}")
+        return None
@@ -0,0 +1,387 @@
+import abc
+import glob
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import closing
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Moteur des requêtes du tableau de bord, configurable via CHURN_QUERY_BACKEND ('pandas' ou 'sqlite')
+QUERY_BACKEND = os.environ.get("CHURN_QUERY_BACKEND", "pandas")
+# Dossier des bases SQLite (une par version du dataset), configurable via CHURN_QUERY_STORE_DIR
+QUERY_STORE_DIR = os.environ.get(
+    "CHURN_QUERY_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+)
+# Colonnes indexées dans la base SQLite
+INDEXED_COLUMNS = ['CustomerID', 'Location', 'Contract Type']
+
+SQL_AGGREGATIONS = {
+    'mean': 'AVG({})',
+    'sum': 'SUM({})',
+    'min': 'MIN({})',
+    'max': 'MAX({})',
+    'count': 'COUNT({})',
+    'nunique': 'COUNT(DISTINCT {})',
+}
+# Lignes de describe, dans l'ordre de DataFrame.describe
+DESCRIBE_QUANTILES = (0.25, 0.5, 0.75)
+DESCRIBE_INDEX = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+
+def _freeze(where):
+    """Forme hachable d'un filtre d'égalité"""
+    return tuple(sorted(
+        (column, tuple(value) if isinstance(value, (list, tuple, set)) else value)
+        for column, value in (where or {}).items()
+    ))
+
+
+class QueryStore(abc.ABC):
+    """
+    Accès en lecture au dataset nettoyé, avec filtres, projections et agrégations
+    exécutés par le moteur de stockage : seules les lignes et colonnes demandées
+    sont retournées sous forme de DataFrame.
+
+    Les filtres (where) sont des dict {colonne: valeur} ou {colonne: [valeurs]}.
+    Les agrégations sont des dict {alias: (colonne, fonction)} avec fonction parmi
+    'mean', 'sum', 'min', 'max', 'count' et 'nunique'.
+
+    Les résumés (describe, histogram) sont calculés une fois par filtre et conservés
+    par le store, partagé entre sessions pour une version du dataset.
+    """
+
+    backend = ""
+    _summaries = None
+    _summaries_lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        # Données sur disque (SQLite) ; PandasQueryStore compte son DataFrame
+        return 0
+
+    @abc.abstractmethod
+    def select(self, columns=None, where=None, order_by=None, descending=False, limit=None):
+        """
+        Args:
+            columns: Colonnes retournées (toutes par défaut)
+            where: Filtres d'égalité
+            order_by: Colonne de tri (ordre du dataset par défaut)
+            descending: Tri décroissant
+            limit: Nombre maximal de lignes
+
+        Returns:
+            DataFrame
+        """
+
+    @abc.abstractmethod
+    def aggregate(self, aggregations, group_by=None, where=None):
+        """
+        Args:
+            aggregations: dict {alias: (colonne, fonction)}
+            group_by: Liste des colonnes de regroupement (aucune : une seule ligne)
+            where: Filtres d'égalité
+
+        Returns:
+            DataFrame avec les colonnes de regroupement puis une colonne par alias
+        """
+
+    @abc.abstractmethod
+    def distinct(self, column, where=None):
+        """Retourne les valeurs distinctes triées d'une colonne"""
+
+    def _summary(self, key, compute):
+        with self._summaries_lock:
+            if self._summaries is None:
+                self._summaries = {}
+            if key in self._summaries:
+                return self._summaries[key]
+        result = compute()
+        with self._summaries_lock:
+            return self._summaries.setdefault(key, result)
+
+    def describe(self, columns, where=None):
+        """
+        Returns:
+            Statistiques descriptives des colonnes (format de DataFrame.describe)
+        """
+        columns = list(columns)
+        return self._summary(('describe', tuple(columns), _freeze(where)),
+                             lambda: self._describe(columns, where))
+
+    @abc.abstractmethod
+    def _describe(self, columns, where):
+        """Statistiques descriptives calculées par le moteur, sans lire les lignes"""
+
+    def histogram(self, column, bins=30, group_by=None, where=None):
+        """
+        Histogramme d'une colonne numérique en bins de largeur égale, compté par le moteur
+
+        Args:
+            column: Colonne numérique
+            bins: Nombre de bins entre le minimum et le maximum
+            group_by: Liste des colonnes de regroupement (ex: ['Churn'])
+            where: Filtres d'égalité
+
+        Returns:
+            DataFrame avec les colonnes de regroupement, 'bin_start', 'bin_end' et 'count'
+        """
+        group_by = list(group_by or [])
+
+        def compute():
+            bounds = self.aggregate({'low': (column, 'min'), 'high': (column, 'max')}, where=where).iloc[0]
+            low, high = float(bounds['low']), float(bounds['high'])
+            width = (high - low) / bins if high > low else 1.0
+            counts = self._bin_counts(column, low, width, bins, group_by, where)
+            counts['bin_start'] = low + counts['bin'] * width
+            counts['bin_end'] = counts['bin_start'] + width
+            return counts[group_by + ['bin_start', 'bin_end', 'count']]
+
+        return self._summary(('histogram', column, bins, tuple(group_by), _freeze(where)), compute)
+
+    @abc.abstractmethod
+    def _bin_counts(self, column, low, width, bins, group_by, where):
+        """Nombre de lignes par bin (colonnes group_by, 'bin', 'count'), lignes sans valeur exclues"""
+
+
+class PandasQueryStore(QueryStore):
+    """Requêtes exécutées sur le DataFrame en mémoire (moteur par défaut)"""
+
+    backend = "pandas"
+
+    def __init__(self, df):
+        self.df = df
+
+    @property
+    def nbytes(self):
+        # Le store garde le dataset en vie même si son entrée est évincée du cache
+        return int(self.df.memory_usage(deep=True).sum())
+
+    def _mask(self, where):
+        mask = pd.Series(True, index=self.df.index)
+        for column, value in (where or {}).items():
+            if isinstance(value, (list, tuple, set)):
+                mask &= self.df[column].isin(list(value))
+            else:
+                mask &= self.df[column] == value
+        return mask
+
+    def _rows(self, where):
+        return self.df if not where else self.df[self._mask(where)]
+
+    def select(self, columns=None, where=None, order_by=None, descending=False, limit=None):
+        rows = self._rows(where)
+        if order_by is not None:
+            rows = rows.sort_values(order_by, ascending=not descending, kind='stable')
+        if limit is not None:
+            rows = rows.head(limit)
+        return rows[list(columns)] if columns is not None else rows
+
+    def aggregate(self, aggregations, group_by=None, where=None):
+        rows = self._rows(where)
+        if group_by:
+            return rows.groupby(list(group_by)).agg(**aggregations).reset_index()
+        return pd.DataFrame({alias: [rows[column].agg(func)] for alias, (column, func) in aggregations.items()})
+
+    def distinct(self, column, where=None):
+        return sorted(self._rows(where)[column].dropna().unique())
+
+    def _describe(self, columns, where):
+        return self._rows(where)[columns].describe()
+
+    def _bin_counts(self, column, low, width, bins, group_by, where):
+        rows = self._rows(where)
+        rows = rows[rows[column].notna()]
+        codes = np.minimum((rows[column].to_numpy(dtype=float) - low) // width, bins - 1).astype(int)
+        return rows[group_by].assign(bin=codes).groupby(group_by + ['bin']).size().rename('count').reset_index()
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _param(value):
+    # Conversion des scalaires numpy en types Python acceptés par sqlite3
+    return value.item() if hasattr(value, 'item') else value
+
+
+class SqliteQueryStore(QueryStore):
+    """
+    Requêtes exécutées par une base SQLite sur disque, indexée sur CustomerID,
+    Location et Contract Type. Une connexion en lecture seule est ouverte par requête,
+    ce qui permet les requêtes concurrentes des sessions.
+
+    Args:
+        path: Chemin de la base
+        table: Nom de la table des clients
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path, table="clients"):
+        self.path = path
+        self.table = table
+        with closing(self._connect()) as conn:
+            self.columns = [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")]
+
+    @classmethod
+    def open_or_build(cls, data_version, load_df, directory=QUERY_STORE_DIR, table="clients"):
+        """
+        Ouvre la base de la version du dataset, en la construisant si elle n'existe pas.
+        La base est écrite dans un fichier temporaire puis renommée : une base
+        présente est toujours complète et peut être réutilisée après redémarrage.
+
+        Args:
+            data_version: Version du dataset
+            load_df: Fonction retournant le DataFrame nettoyé (appelée seulement si nécessaire)
+
+        Returns:
+            SqliteQueryStore
+        """
+        path = os.path.join(directory, f"churn_{data_version}.db")
+        if not os.path.exists(path):
+            os.makedirs(directory, exist_ok=True)
+            temporary = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            try:
+                cls._build(temporary, load_df(), table)
+                os.replace(temporary, path)
+            finally:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+            cls._remove_old_versions(directory, path)
+        return cls(path, table)
+
+    @staticmethod
+    def _remove_old_versions(directory, current):
+        """Supprime les bases des versions précédentes du dataset"""
+        for old in glob.glob(os.path.join(directory, "churn_*.db")):
+            if os.path.abspath(old) != os.path.abspath(current):
+                try:
+                    os.remove(old)
+                except OSError:
+                    # Base encore ouverte (Windows) : elle sera supprimée à la prochaine construction
+                    pass
+
+    @staticmethod
+    def _build(path, df, table):
+        conn = sqlite3.connect(path)
+        try:
+            # Construction en une seule transaction, sans journal ni fsync intermédiaire
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            df.to_sql(table, conn, index=False, chunksize=50_000)
+            for column in INDEXED_COLUMNS:
+                unique = "UNIQUE " if column == 'CustomerID' else ""
+                conn.execute(f'CREATE {unique}INDEX {_quote(f"idx_{table}_{column}")} '
+                             f'ON {_quote(table)} ({_quote(column)})')
+            conn.execute("ANALYZE")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(Path(self.path).resolve().as_uri() + "?mode=ro", uri=True)
+
+    def _check_columns(self, columns):
+        unknown = [column for column in columns if column not in self.columns]
+        if unknown:
+            raise ValueError(f"Colonnes inconnues: {', '.join(unknown)}")
+
+    def _where(self, where):
+        clauses, params = [], []
+        self._check_columns(list(where or {}))
+        for column, value in (where or {}).items():
+            if isinstance(value, (list, tuple, set)):
+                value = list(value)
+                clauses.append(f"{_quote(column)} IN ({', '.join('?' * len(value))})")
+                params.extend(_param(v) for v in value)
+            else:
+                clauses.append(f"{_quote(column)} = ?")
+                params.append(_param(value))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _query(self, sql, params):
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def select(self, columns=None, where=None, order_by=None, descending=False, limit=None):
+        columns = list(columns) if columns is not None else self.columns
+        self._check_columns(columns + ([order_by] if order_by else []))
+        where_sql, params = self._where(where)
+        sql = f"SELECT {', '.join(map(_quote, columns))} FROM {_quote(self.table)}{where_sql}"
+        sql += f" ORDER BY {_quote(order_by)} {'DESC' if descending else 'ASC'}" if order_by else " ORDER BY rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return self._query(sql, params)
+
+    def aggregate(self, aggregations, group_by=None, where=None):
+        group_by = list(group_by or [])
+        self._check_columns(group_by + [column for column, _ in aggregations.values()])
+        expressions = [f"{SQL_AGGREGATIONS[func].format(_quote(column))} AS {_quote(alias)}"
+                       for alias, (column, func) in aggregations.items()]
+        where_sql, params = self._where(where)
+        sql = f"SELECT {', '.join([_quote(c) for c in group_by] + expressions)} FROM {_quote(self.table)}{where_sql}"
+        if group_by:
+            sql += f" GROUP BY {', '.join(map(_quote, group_by))} ORDER BY {', '.join(map(_quote, group_by))}"
+        return self._query(sql, params)
+
+    def distinct(self, column, where=None):
+        self._check_columns([column])
+        where_sql, params = self._where(where)
+        sql = (f"SELECT DISTINCT {_quote(column)} FROM {_quote(self.table)}{where_sql}"
+               f"{' AND' if where_sql else ' WHERE'} {_quote(column)} IS NOT NULL ORDER BY {_quote(column)}")
+        return self._query(sql, params)[column].tolist()
+
+    def _bin_counts(self, column, low, width, bins, group_by, where):
+        self._check_columns(group_by + [column])
+        where_sql, params = self._where(where)
+        bin_sql = f"MIN(CAST(({_quote(column)} - ?) / ? AS INTEGER), ?)"
+        sql = (f"SELECT {', '.join([_quote(c) for c in group_by] + [bin_sql + ' AS bin', 'COUNT(*) AS count'])} "
+               f"FROM {_quote(self.table)}{where_sql}"
+               f"{' AND' if where_sql else ' WHERE'} {_quote(column)} IS NOT NULL "
+               f"GROUP BY {', '.join([_quote(c) for c in group_by] + ['bin'])} "
+               f"ORDER BY {', '.join([_quote(c) for c in group_by] + ['bin'])}")
+        return self._query(sql, [low, width, bins - 1] + params)
+
+    def _describe(self, columns, where):
+        self._check_columns(columns)
+        where_sql, params = self._where(where)
+        with closing(self._connect()) as conn:
+            stats = {column: self._column_stats(conn, column, where_sql, params) for column in columns}
+        return pd.DataFrame(stats, index=DESCRIBE_INDEX, dtype=float)
+
+    def _column_stats(self, conn, column, where_sql, params):
+        """Statistiques d'une colonne : moments par agrégation, quantiles par rang (interpolation linéaire)"""
+        table, quoted = _quote(self.table), _quote(column)
+        not_null = f"{where_sql}{' AND' if where_sql else ' WHERE'} {quoted} IS NOT NULL"
+        count, mean, low, high = conn.execute(
+            f"SELECT COUNT({quoted}), AVG({quoted}), MIN({quoted}), MAX({quoted}) FROM {table}{where_sql}",
+            params
+        ).fetchone()
+        if not count:
+            return [0] + [np.nan] * (len(DESCRIBE_INDEX) - 1)
+
+        # Écart-type de l'échantillon en deux passes (stable numériquement)
+        std = np.nan
+        if count > 1:
+            squares, = conn.execute(f"SELECT SUM(({quoted} - ?) * ({quoted} - ?)) FROM {table}{not_null}",
+                                    [mean, mean] + params).fetchone()
+            std = float(np.sqrt(squares / (count - 1)))
+
+        positions = [(count - 1) * q for q in DESCRIBE_QUANTILES]
+        ranks = sorted({int(np.floor(p)) for p in positions} | {int(np.ceil(p)) for p in positions})
+        values = dict(conn.execute(
+            f"SELECT position, value FROM (SELECT {quoted} AS value, "
+            f"ROW_NUMBER() OVER (ORDER BY {quoted}) - 1 AS position FROM {table}{not_null}) "
+            f"WHERE position IN ({', '.join('?' * len(ranks))})",
+            params + ranks
+        ).fetchall())
+        quantiles = []
+        for position in positions:
+            below, above = values[int(np.floor(position))], values[int(np.ceil(position))]
+            quantiles.append(below + (above - below) * (position - np.floor(position)))
+        return [count, mean, std, low] + quantiles + [high]
@@ -0,0 +1,139 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Modalités des variables catégorielles
+LOCATIONS = [
+    'Tunis', 'Ariana', 'Ben Arous', 'Manouba', 'Nabeul', 'Zaghouan', 'Bizerte',
+    'Béja', 'Jendouba', 'Le Kef', 'Siliana', 'Sousse', 'Monastir', 'Mahdia',
+    'Sfax', 'Kairouan', 'Kasserine', 'Sidi Bouzid', 'Gabès', 'Médenine',
+    'Tataouine', 'Gafsa', 'Tozeur', 'Kébili'
+]
+# Poids approximatifs de la population par gouvernorat
+LOCATION_WEIGHTS = np.array([
+    10.0, 5.5, 5.9, 3.5, 7.1, 1.6, 5.2, 2.8, 3.6, 2.2, 1.9, 6.3, 5.0, 3.8,
+    8.6, 5.2, 4.0, 3.8, 3.4, 4.4, 1.4, 3.1, 1.0, 1.4
+])
+CONTRACT_TYPES = ['Month-to-month', 'One year', 'Two year']
+CONTRACT_WEIGHTS = np.array([0.55, 0.25, 0.20])
+PAYMENT_METHODS = ['Credit card', 'Bank transfer', 'Cash', 'Mobile payment']
+PAYMENT_WEIGHTS = np.array([0.30, 0.25, 0.30, 0.15])
+
+
+def _generate_chunk(rng, start, n_rows):
+    location = rng.choice(len(LOCATIONS), n_rows, p=LOCATION_WEIGHTS / LOCATION_WEIGHTS.sum())
+    contract = rng.choice(len(CONTRACT_TYPES), n_rows, p=CONTRACT_WEIGHTS)
+    payment = rng.choice(len(PAYMENT_METHODS), n_rows, p=PAYMENT_WEIGHTS)
+
+    age = rng.integers(18, 80, n_rows)
+    # Les contrats longs correspondent à des clients plus anciens
+    tenure = np.minimum(rng.exponential(12 + 18 * contract), 120).astype(int)
+    monthly_charges = np.round(rng.gamma(4.0, 12.0, n_rows) + 10, 2)
+    total_charges = np.round(monthly_charges * np.maximum(tenure, 1) * rng.uniform(0.9, 1.1, n_rows), 2)
+    data_usage = np.round(rng.gamma(2.0, 10.0, n_rows), 1)
+    call_usage = np.round(rng.gamma(3.0, 100.0, n_rows), 1)
+    support_calls = rng.poisson(1.5, n_rows)
+    satisfaction = np.clip(np.round(rng.normal(3.6 - 0.3 * support_calls, 1.0)), 1, 5).astype(int)
+
+    # Probabilité de churn corrélée au contrat, à la satisfaction et à l'ancienneté
+    logit = (
+        -1.2
+        + np.array([1.2, 0.0, -0.9])[contract]
+        - 0.55 * (satisfaction - 3)
+        + 0.25 * support_calls
+        - 0.03 * tenure
+        + 0.012 * (monthly_charges - 58)
+        + np.where(payment == 2, 0.3, 0.0)
+    )
+    churn = (rng.random(n_rows) < 1 / (1 + np.exp(-logit))).astype(int)
+
+    # Identifiants bruts dans des formats hétérogènes, comme dans les extractions réelles
+    ids = pd.Series(np.arange(start + 1, start + n_rows + 1)).astype(str)
+    customer_id = np.where(ids.index % 2 == 0, 'CUST_' + ids.str.zfill(6), 'cust-' + ids)
+
+    return pd.DataFrame({
+        'CustomerID': customer_id,
+        'Age': age,
+        'Tenure (Months)': tenure,
+        'Monthly Charges': monthly_charges,
+        'Total Charges': total_charges,
+        'Data Usage (GB)': data_usage,
+        'Call Usage (Minutes)': call_usage,
+        'Support Calls': support_calls,
+        'Satisfaction Score': satisfaction,
+        'Location': pd.Categorical.from_codes(location, LOCATIONS).astype(object),
+        'Contract Type': pd.Categorical.from_codes(contract, CONTRACT_TYPES).astype(object),
+        'Payment Method': pd.Categorical.from_codes(payment, PAYMENT_METHODS).astype(object),
+        'Churn': churn,
+    })
+
+
+def iter_synthetic_chunks(n_rows, seed=42, chunk_size=1_000_000):
+    """
+    Génère un dataset synthétique par morceaux, au format brut attendu par load_data
+
+    Args:
+        n_rows: Nombre total de clients
+        seed: Graine aléatoire (même graine et même chunk_size => mêmes données)
+        chunk_size: Nombre de clients par morceau
+
+    Yields:
+        DataFrame de chunk_size lignes au plus
+    """
+    seeds = np.random.SeedSequence(seed).spawn((n_rows + chunk_size - 1) // chunk_size)
+    for i, start in enumerate(range(0, n_rows, chunk_size)):
+        rng = np.random.default_rng(seeds[i])
+        yield _generate_chunk(rng, start, min(chunk_size, n_rows - start))
+
+
+def generate_synthetic_data(n_rows, seed=42, chunk_size=1_000_000):
+    """
+    Génère un dataset synthétique complet en mémoire
+
+    Args:
+        n_rows: Nombre de clients
+        seed: Graine aléatoire
+        chunk_size: Nombre de clients générés à la fois
+
+    Returns:
+        DataFrame brut (à normaliser avec normalize_data)
+    """
+    return pd.concat(list(iter_synthetic_chunks(n_rows, seed, chunk_size)), ignore_index=True)
+
+
+def write_synthetic_csv(path, n_rows, seed=42, chunk_size=1_000_000):
+    """
+    Écrit un dataset synthétique dans un CSV sans le garder en mémoire
+
+    Args:
+        path: Chemin du fichier CSV
+        n_rows: Nombre de clients
+        seed: Graine aléatoire
+        chunk_size: Nombre de clients écrits à la fois
+    """
+    for i, chunk in enumerate(iter_synthetic_chunks(n_rows, seed, chunk_size)):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+
+
+def write_synthetic_partitions(directory, n_rows, n_partitions=12, seed=42):
+    """
+    Écrit un dataset synthétique sous forme de partitions CSV (une par extraction),
+    lisibles par load_data avec CHURN_DATA_PATH pointant sur le dossier
+
+    Args:
+        directory: Dossier de destination (créé si nécessaire)
+        n_rows: Nombre total de clients
+        n_partitions: Nombre de fichiers
+        seed: Graine aléatoire
+
+    Returns:
+        Liste des chemins écrits
+    """
+    os.makedirs(directory, exist_ok=True)
+    chunk_size = max(1, -(-n_rows // n_partitions))
+    paths = []
+    for i, chunk in enumerate(iter_synthetic_chunks(n_rows, seed, chunk_size)):
+        path = os.path.join(directory, f"partition_{i:03d}.csv")
+        chunk.to_csv(path, index=False)
+        paths.append(path)
+    return paths
@@ -0,0 +1,86 @@
+import copy
+import threading
+import time
+
+
+class FakeDocumentReference:
+    """Référence de document d'un client Firestore en mémoire"""
+
+    def __init__(self, store, collection, doc_id):
+        self._store = store
+        self.collection_name = collection
+        self.id = doc_id
+
+    def set(self, data):
+        self._store._write([(self.collection_name, self.id, data)])
+
+    def get(self):
+        return self._store.documents(self.collection_name).get(self.id)
+
+
+class FakeCollectionReference:
+    """Référence de collection d'un client Firestore en mémoire"""
+
+    def __init__(self, store, name):
+        self._store = store
+        self.name = name
+
+    def document(self, doc_id):
+        return FakeDocumentReference(self._store, self.name, doc_id)
+
+
+class FakeWriteBatch:
+    """Batch d'écritures appliqué de façon atomique au commit"""
+
+    def __init__(self, store):
+        self._store = store
+        self._writes = []
+
+    def set(self, doc_ref, data):
+        self._writes.append((doc_ref.collection_name, doc_ref.id, data))
+
+    def commit(self):
+        self._store._write(self._writes)
+        self._writes = []
+
+
+class FakeFirestore:
+    """
+    Client Firestore en mémoire pour les tests et benchmarks d'export.
+
+    Expose le sous-ensemble de l'API utilisé par export_to_firestore
+    (collection, document, batch, set, commit) et peut simuler la latence
+    réseau d'un commit.
+
+    Args:
+        latency: Délai (secondes) simulé pour chaque écriture envoyée
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.commits = 0
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def collection(self, name):
+        return FakeCollectionReference(self, name)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def collections(self):
+        with self._lock:
+            return [FakeCollectionReference(self, name) for name in self._data]
+
+    def documents(self, collection):
+        """Retourne une copie des documents d'une collection"""
+        with self._lock:
+            return dict(self._data.get(collection, {}))
+
+    def _write(self, writes):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            for collection, doc_id, data in writes:
+                self._data.setdefault(collection, {})[doc_id] = copy.deepcopy(data)
+            self.commits += 1
@@ -1,11 +1,134 @@
+import asyncio
+import time
 import pandas as pd
 from datetime import datetime
 import streamlit as st
-from config.firebase_config import init_firebase
-from preprocessing.data_cleaning import clean_customer_ids
+from config.firebase_config import init_firebase, mark_firestore_client_suspect
+from preprocessing.data_cleaning import clean_customer_ids, repair_customer_ids, standardize_customer_ids
+from utils.tracing import traced
 
+# Firestore limite un batch à 500 écritures
+BATCH_SIZE = 500
+# Nombre de commits envoyés en parallèle
+COMMIT_CONCURRENCY = 4
+# Intervalle minimal (secondes) entre deux mises à jour de la barre de progression
+PROGRESS_INTERVAL = 0.25
 
-def export_to_firestore(df, model_results=None, predictions=None, limit=1000):
+
+def prepare_export_data(df, predictions=None, limit=1000, warnings=None):
+    """
+    Prépare le DataFrame à exporter
+
+    Args:
+        df: DataFrame contenant les données client
+        predictions: DataFrame contenant les prédictions
+        limit: Nombre maximum de clients à exporter
+        warnings: Liste recevant les avertissements sur les CustomerID (appel depuis
+            une tâche d'arrière-plan) ; par défaut ils sont affichés dans la session
+
+    Returns:
+        DataFrame prêt pour l'export
+    """
+    export_data = df.head(limit).copy()
+
+    # Nettoyage des CustomerID
+    if warnings is None:
+        export_data = clean_customer_ids(export_data)
+    else:
+        export_data, id_warnings = repair_customer_ids(standardize_customer_ids(export_data))
+        warnings.extend(id_warnings)
+
+    # Ajout des prédictions si disponibles
+    if predictions is not None:
+        pred_columns = ['Future_Churn_Probability', 'Predicted_Churn']
+        for col in pred_columns:
+            if col in predictions.columns:
+                export_data[col] = predictions[col].values[:limit]
+
+    return export_data
+
+
+async def _export_pipeline(db, export_data, model_results, on_progress,
+                           batch_size, concurrency, progress_interval):
+    """
+    Pipeline producteur/consommateur : le producteur sérialise le batch suivant
+    pendant que les consommateurs attendent la fin des commits en cours.
+    La file bornée limite le nombre de batchs sérialisés en avance.
+    """
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    client_ref = db.collection("Clients")
+    total = len(export_data)
+    state = {'done': 0, 'last_update': 0.0}
+
+    def report_progress():
+        now = time.monotonic()
+        if state['done'] < total and now - state['last_update'] < progress_interval:
+            return
+        state['last_update'] = now
+        if on_progress is not None:
+            on_progress(min(1.0, state['done'] / total) if total else 1.0)
+
+    async def produce():
+        for start in range(0, total, batch_size):
+            records = export_data.iloc[start:start + batch_size].to_dict('records')
+            batch = db.batch()
+            for record in records:
+                batch.set(client_ref.document(record['CustomerID']), record)
+            await queue.put((batch, len(records)))
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def consume():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            batch, count = item
+            await asyncio.to_thread(batch.commit)
+            state['done'] += count
+            report_progress()
+
+    tasks = [produce()] + [consume() for _ in range(concurrency)]
+
+    # Les résultats des modèles sont écrits en même temps que les clients
+    if model_results is not None:
+        results_ref = db.collection("ModelResults").document("Latest")
+        tasks.append(asyncio.to_thread(results_ref.set, {
+            "Timestamp": datetime.now().isoformat(),
+            "Results": model_results
+        }))
+
+    await asyncio.gather(*tasks)
+
+
+@traced()
+def run_export(db, export_data, model_results=None, on_progress=None,
+               batch_size=BATCH_SIZE, concurrency=COMMIT_CONCURRENCY,
+               progress_interval=PROGRESS_INTERVAL):
+    """
+    Écrit les clients et les résultats des modèles dans Firestore.
+    Fonctionne avec tout client compatible (Firestore, émulateur via
+    FIRESTORE_EMULATOR_HOST ou FakeFirestore). Les erreurs sont propagées.
+
+    Args:
+        db: Client Firestore
+        export_data: DataFrame préparé par prepare_export_data
+        model_results: Résultats des modèles (dict)
+        on_progress: Fonction appelée avec l'avancement (0.0 à 1.0)
+        batch_size: Nombre de documents par batch
+        concurrency: Nombre de commits simultanés
+        progress_interval: Intervalle minimal entre deux appels à on_progress
+
+    Returns:
+        Nombre de clients exportés
+    """
+    asyncio.run(_export_pipeline(db, export_data, model_results, on_progress,
+                                 batch_size, concurrency, progress_interval))
+    return len(export_data)
+
+
+@traced()
+def export_to_firestore(df, model_results=None, predictions=None, limit=1000, db=None):
     """
     Exporte les données vers Firestore
 
@@ -14,56 +137,26 @@ def export_to_firestore(df, model_results=None, predictions=None, limit=1000):
         model_results: Résultats des modèles (dict)
         predictions: DataFrame contenant les prédictions
         limit: Nombre maximum de documents à exporter
+        db: Client Firestore à utiliser (par défaut celui de init_firebase)
 
     Returns:
         Boolean indiquant si l'export a réussi
     """
     try:
-        db = init_firebase()
+        if db is None:
+            db = init_firebase()
         if db is None:
             return False
 
         # Préparation des données
-        export_data = df.head(limit).copy()
-
-        # Nettoyage des CustomerID
-        export_data = clean_customer_ids(export_data)
-
-        # Ajout des prédictions si disponibles
-        if predictions is not None:
-            pred_columns = ['Future_Churn_Probability', 'Predicted_Churn']
-            for col in pred_columns:
-                if col in predictions.columns:
-                    export_data[col] = predictions[col].values[:limit]
-
-        # Conversion des données pour Firestore
-        records = export_data.to_dict('records')
+        export_data = prepare_export_data(df, predictions, limit)
 
         # Export Firestore
-        batch_size = 500
-        client_ref = db.collection("Clients")
-
-        with st.progress(0.0) as progress_bar:
-            for i in range(0, len(records), batch_size):
-                batch = db.batch()
-                batch_records = records[i:i + batch_size]
-
-                for record in batch_records:
-                    doc_ref = client_ref.document(record['CustomerID'])
-                    batch.set(doc_ref, record)
-
-                batch.commit()
-                progress_bar.progress(min(1.0, (i + batch_size) / len(records)))
-
-        # Export des résultats des modèles si fournis
-        if model_results is not None:
-            results_ref = db.collection("ModelResults").document("Latest")
-            results_ref.set({
-                "Timestamp": datetime.now().isoformat(),
-                "Results": model_results
-            })
+        progress_bar = st.progress(0.0)
+        run_export(db, export_data, model_results, on_progress=progress_bar.progress)
 
         return True
     except Exception as e:
+        mark_firestore_client_suspect()
         st.error(f"Erreur d'export: {str(e)}")
-        return False
\ No newline at end of file
+        return False
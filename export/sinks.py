@@ -0,0 +1,249 @@
+import abc
+import json
+import os
+import shutil
+import sqlite3
+import uuid
+from config.firebase_config import (get_credentials_path, get_firestore_client, has_firestore_client,
+                                    mark_firestore_client_suspect)
+from export.firebase_export import prepare_export_data, run_export
+from utils.tracing import span
+
+# Dossier par défaut des exports locaux
+DEFAULT_EXPORT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "exports"
+)
+
+
+class ExportSink(abc.ABC):
+    """
+    Destination d'export des données client.
+
+    Les sous-classes implémentent write() et, si besoin, check_available()
+    pour signaler une configuration ou une dépendance manquante.
+    """
+
+    label = ""
+    # Nombre maximal de clients proposé à l'export (None : tout le dataset)
+    max_rows = None
+
+    def check_available(self):
+        """
+        Returns:
+            None si l'export est possible, sinon un message d'erreur
+        """
+        return None
+
+    @abc.abstractmethod
+    def write(self, export_data, model_results=None, on_progress=None):
+        """
+        Écrit les données exportées
+
+        Args:
+            export_data: DataFrame préparé par prepare_export_data
+            model_results: Liste des résultats des modèles
+            on_progress: Fonction appelée avec l'avancement (0.0 à 1.0)
+
+        Returns:
+            Nombre de clients exportés
+        """
+
+
+class FirestoreSink(ExportSink):
+    """Export vers les collections Firestore Clients et ModelResults"""
+
+    label = "Firebase (Firestore)"
+    # Un document par client : l'export est limité pour maîtriser durée et coût des écritures
+    max_rows = 10_000
+
+    def check_available(self):
+        credentials_path = get_credentials_path()
+        if not has_firestore_client() and not os.path.exists(credentials_path):
+            return (f"Le fichier de configuration Firebase est introuvable ({credentials_path}). "
+                    "Placez firebase_credentials.json dans le dossier 'credentials' pour activer l'export.")
+        return None
+
+    def write(self, export_data, model_results=None, on_progress=None):
+        # Exécuté dans une tâche d'arrière-plan : les erreurs sont levées (message de la tâche)
+        # et non affichées avec st.error comme dans init_firebase
+        unavailable_reason = self.check_available()
+        if unavailable_reason:
+            raise RuntimeError(unavailable_reason)
+        try:
+            db = get_firestore_client()
+        except Exception as e:
+            raise RuntimeError(f"Connexion Firebase impossible: {e}") from e
+        try:
+            return run_export(db, export_data, model_results, on_progress=on_progress)
+        except Exception:
+            mark_firestore_client_suspect()
+            raise
+
+
+class _LocalSink(ExportSink):
+    """Base des exports vers des fichiers locaux"""
+
+    def __init__(self, output_dir=DEFAULT_EXPORT_DIR):
+        self.output_dir = output_dir
+
+    def _write_model_results(self, model_results):
+        if model_results is None:
+            return
+        with open(os.path.join(self.output_dir, "model_results.json"), "w", encoding="utf-8") as f:
+            json.dump(model_results, f, ensure_ascii=False, indent=2, default=str)
+
+
+class ParquetSink(_LocalSink):
+    """
+    Dataset Parquet partitionné par Location et Contract Type. Le dataset est écrit
+    dans un nouveau dossier puis mis à la place du précédent : aucune partition
+    d'un export antérieur ne subsiste et un export interrompu laisse l'ancien intact.
+    """
+
+    label = "Parquet partitionné"
+    partition_cols = ['Location', 'Contract Type']
+
+    def check_available(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return "Le package pyarrow est requis pour l'export Parquet (pip install pyarrow)."
+        return None
+
+    def write(self, export_data, model_results=None, on_progress=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        root_path = os.path.join(self.output_dir, "clients")
+        suffix = uuid.uuid4().hex[:8]
+        staging_path, previous_path = f"{root_path}.{suffix}.tmp", f"{root_path}.{suffix}.old"
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        table = pa.Table.from_pandas(export_data, preserve_index=False)
+        try:
+            pq.write_to_dataset(table, root_path=staging_path, partition_cols=self.partition_cols)
+            if os.path.exists(root_path):
+                os.rename(root_path, previous_path)
+            try:
+                os.rename(staging_path, root_path)
+            except OSError:
+                if os.path.exists(previous_path):
+                    os.rename(previous_path, root_path)
+                raise
+        finally:
+            shutil.rmtree(staging_path, ignore_errors=True)
+            shutil.rmtree(previous_path, ignore_errors=True)
+        self._write_model_results(model_results)
+        if on_progress is not None:
+            on_progress(1.0)
+        return len(export_data)
+
+
+class CsvSink(_LocalSink):
+    """Fichiers CSV découpés en morceaux de taille fixe"""
+
+    label = "CSV (fichiers découpés)"
+
+    def __init__(self, output_dir=DEFAULT_EXPORT_DIR, chunk_size=100_000):
+        super().__init__(output_dir)
+        self.chunk_size = chunk_size
+
+    def write(self, export_data, model_results=None, on_progress=None):
+        csv_dir = os.path.join(self.output_dir, "clients_csv")
+        os.makedirs(csv_dir, exist_ok=True)
+        for name in os.listdir(csv_dir):
+            if name.startswith("clients_") and name.endswith(".csv"):
+                os.remove(os.path.join(csv_dir, name))
+
+        total = len(export_data)
+        for part, start in enumerate(range(0, total, self.chunk_size)):
+            chunk = export_data.iloc[start:start + self.chunk_size]
+            chunk.to_csv(os.path.join(csv_dir, f"clients_{part:05d}.csv"), index=False)
+            if on_progress is not None:
+                on_progress(min(1.0, (start + len(chunk)) / total))
+
+        self._write_model_results(model_results)
+        return total
+
+
+class SqliteSink(_LocalSink):
+    """Table SQLite indexée sur CustomerID"""
+
+    label = "SQLite"
+
+    def __init__(self, output_dir=DEFAULT_EXPORT_DIR, table="clients", chunk_size=50_000):
+        super().__init__(output_dir)
+        self.table = table
+        self.chunk_size = chunk_size
+
+    def write(self, export_data, model_results=None, on_progress=None):
+        os.makedirs(self.output_dir, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.output_dir, "churn_export.db"))
+        try:
+            # Chargement en une seule transaction sans fsync intermédiaire
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            export_data.to_sql(self.table, conn, if_exists='replace', index=False,
+                               chunksize=self.chunk_size)
+            conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "idx_{self.table}_customer_id" '
+                         f'ON "{self.table}" ("CustomerID")')
+
+            if model_results is not None:
+                conn.execute("DROP TABLE IF EXISTS model_results")
+                conn.execute("CREATE TABLE model_results (Model TEXT, Payload TEXT)")
+                conn.executemany(
+                    "INSERT INTO model_results VALUES (?, ?)",
+                    [(r.get('Model'), json.dumps(r, default=str)) for r in model_results]
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+        if on_progress is not None:
+            on_progress(1.0)
+        return len(export_data)
+
+
+EXPORT_SINKS = {
+    sink.label: sink
+    for sink in [FirestoreSink, ParquetSink, CsvSink, SqliteSink]
+}
+
+
+def get_sink(label, **options):
+    """
+    Instancie la destination d'export correspondant au libellé
+
+    Args:
+        label: Libellé de la destination (clé de EXPORT_SINKS)
+        options: Paramètres du constructeur (ex: output_dir)
+
+    Returns:
+        ExportSink
+    """
+    return EXPORT_SINKS[label](**options)
+
+
+def export_job(job, sink, export_df, predictions=None, limit=1000, model_results=None):
+    """
+    Tâche d'arrière-plan d'export
+
+    Args:
+        job: Tâche (avancement et annulation)
+        sink: Destination d'export
+        export_df: DataFrame contenant les données client
+        predictions: DataFrame contenant les prédictions
+        limit: Nombre maximum de clients à exporter
+        model_results: Liste des résultats des modèles
+
+    Returns:
+        dict avec le nombre de clients exportés ('exported') et les avertissements
+        à afficher dans la session ('warnings')
+    """
+    job.set_progress(0.0, "Préparation des données")
+    warnings = []
+    export_data = prepare_export_data(export_df, predictions, limit, warnings=warnings)
+    job.set_progress(0.0, f"Export vers {sink.label}")
+    with span(f"export:{sink.label}", rows=len(export_data)):
+        exported = sink.write(export_data, model_results, on_progress=job.set_progress)
+    return {'exported': exported, 'warnings': warnings}
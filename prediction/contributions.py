@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+from prediction.model_compaction import PREDICT_CHUNK_ROWS, CompactTreeEnsemble
+from preprocessing.data_cleaning import to_float32
+from utils.resource_cache import get_resource_cache
+from utils.tracing import traced
+
+
+def feature_groups(preprocessor):
+    """
+    Associe chaque colonne encodée à la variable d'origine dont elle provient
+
+    Args:
+        preprocessor: Préprocesseur entraîné (ColumnTransformer, éventuellement dans un Pipeline)
+
+    Returns:
+        Liste des noms de variables d'origine, une entrée par colonne encodée
+    """
+    while isinstance(preprocessor, Pipeline):
+        preprocessor = next(step for _, step in preprocessor.steps
+                            if isinstance(step, Pipeline) or hasattr(step, 'transformers_'))
+
+    groups = []
+    for _, transformer, columns in preprocessor.transformers_:
+        if isinstance(transformer, str) and transformer == 'drop':
+            continue
+        if isinstance(transformer, OneHotEncoder):
+            for column, categories in zip(columns, transformer.categories_):
+                groups.extend([column] * len(categories))
+        else:
+            groups.extend(columns)
+    return groups
+
+
+def get_tree_ensemble(model_version, pipeline):
+    """
+    Retourne les tableaux plats des arbres du modèle (CompactTreeEnsemble), calculés
+    une fois par version de modèle ; un modèle déjà compacté est utilisé tel quel
+
+    Args:
+        model_version: Clé du modèle dans le registre (model_key)
+        pipeline: Pipeline entraîné
+    """
+    classifier = pipeline[-1]
+    if isinstance(classifier, CompactTreeEnsemble):
+        return classifier
+    return get_resource_cache().get_or_create(
+        ('tree_arrays',) + tuple(model_version), lambda: CompactTreeEnsemble.from_estimator(classifier)
+    )
+
+
+@traced()
+def compute_contributions(pipeline, X, ensemble=None):
+    """
+    Calcule la contribution de chaque variable au score de chaque client par
+    attribution le long du chemin de décision : à chaque nœud traversé, l'écart
+    de valeur entre le nœud et son enfant est attribué à la variable du test.
+    Le calcul est vectorisé sur les clients et les arbres.
+    Le score vaut exactement biais + somme des contributions : probabilité de churn
+    pour les forêts et arbres, log-odds pour le gradient boosting. Pour le gradient
+    boosting, la valeur d'un nœud interne est la moyenne pondérée de ses feuilles
+    (voir consistent_node_values) : l'écart attribué à chaque test reste à l'échelle
+    des scores. Vérifié par benchmarks/contributions_check.py.
+
+    Args:
+        pipeline: Pipeline entraîné (préprocesseur + classifieur à base d'arbres)
+        X: Features des clients (colonnes d'origine)
+        ensemble: Tableaux plats des arbres (get_tree_ensemble), calculés si absent
+
+    Returns:
+        (biais, DataFrame des contributions par variable d'origine, indexé comme X)
+    """
+    preprocessor = pipeline[:-1]
+    ensemble = CompactTreeEnsemble.from_estimator(pipeline[-1]) if ensemble is None else ensemble
+    encoded = to_float32(preprocessor.transform(X))
+
+    # Matrice de regroupement des colonnes encodées vers les variables d'origine
+    groups = feature_groups(preprocessor)
+    features = list(dict.fromkeys(groups))
+    grouping = np.zeros((len(groups), len(features)))
+    grouping[np.arange(len(groups)), [features.index(group) for group in groups]] = 1.0
+
+    n_rows, n_columns = encoded.shape
+    n_trees = len(ensemble.roots)
+    contributions = np.empty((n_rows, len(features)))
+    value = ensemble.value.astype(np.float64)
+    for start in range(0, n_rows, PREDICT_CHUNK_ROWS):
+        chunk = encoded[start:start + PREDICT_CHUNK_ROWS]
+        rows = np.arange(len(chunk))[:, None]
+        nodes = np.broadcast_to(ensemble.roots.astype(np.intp), (len(chunk), n_trees)).copy()
+        totals = np.zeros(len(chunk) * n_columns)
+        for _ in range(ensemble.max_depth):
+            left = ensemble.children_left[nodes]
+            internal = left >= 0
+            if not internal.any():
+                break
+            feature = ensemble.feature[nodes]
+            go_left = chunk[rows, feature] <= ensemble.threshold[nodes]
+            children = np.where(internal, np.where(go_left, left, ensemble.children_right[nodes]), nodes)
+            # Les feuilles déjà atteintes ont un écart nul
+            totals += np.bincount((rows * n_columns + feature).ravel(),
+                                  weights=(value[children] - value[nodes]).ravel(),
+                                  minlength=len(chunk) * n_columns)
+            nodes = children
+        contributions[start:start + len(chunk)] = totals.reshape(len(chunk), n_columns) @ grouping
+
+    root_values = value[ensemble.roots.astype(np.intp)]
+    if ensemble.kind == 'boosting':
+        bias = ensemble.init + root_values.sum()
+    else:
+        bias = root_values.mean()
+        contributions /= n_trees
+    return bias, pd.DataFrame(contributions, index=X.index, columns=features)
+
+
+def top_drivers(contributions, k=3):
+    """
+    Décrit les k variables qui augmentent le plus le risque de chaque client
+
+    Args:
+        contributions: DataFrame des contributions (compute_contributions)
+        k: Nombre de variables retenues
+
+    Returns:
+        Series de libellés, ex: "Satisfaction Score (+0.12), Support Calls (+0.05)"
+    """
+    values = contributions.to_numpy()
+    order = np.argsort(-values, axis=1)[:, :k]
+    columns = contributions.columns
+    labels = [
+        ", ".join(f"{columns[j]} ({row[j]:+.2f})" for j in top if row[j] > 0) or "-"
+        for row, top in zip(values, order)
+    ]
+    return pd.Series(labels, index=contributions.index)
@@ -0,0 +1,317 @@
+import heapq
+import pickle
+import time
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.pipeline import Pipeline
+from sklearn.tree import DecisionTreeClassifier
+from preprocessing.data_cleaning import to_float32
+
+# Profondeurs essayées, de la moins à la plus agressive, pour l'élagage sous tolérance d'AUC
+DEPTH_CANDIDATES = (24, 16, 12, 10, 8, 6)
+# Nombre de lignes parcourues simultanément lors de la prédiction
+PREDICT_CHUNK_ROWS = 20_000
+
+
+def smallest_int_dtype(max_value):
+    """Retourne le plus petit type entier signé pouvant contenir max_value"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def float32_floor(values):
+    """
+    Convertit des seuils float64 en float32 sans changer les décisions des arbres :
+    pour tout x float32, x <= seuil32 équivaut à x <= seuil64
+    """
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def _select_nodes(left, right, weights, max_depth=None, max_leaves=None):
+    """
+    Sélectionne les nœuds conservés d'un arbre : les nœuds sont développés du plus
+    au moins peuplé tant que la profondeur et le nombre de feuilles le permettent
+
+    Returns:
+        (nœuds conservés, nœuds développés, profondeur maximale atteinte)
+    """
+    kept, expanded = [0], set()
+    heap = [(-weights[0], 0, 0)]
+    n_leaves, depth_reached = 1, 0
+    while heap:
+        _, node, depth = heapq.heappop(heap)
+        if left[node] < 0 or (max_depth is not None and depth >= max_depth):
+            continue
+        if max_leaves is not None and n_leaves >= max_leaves:
+            break
+        expanded.add(node)
+        n_leaves += 1
+        depth_reached = max(depth_reached, depth + 1)
+        for child in (left[node], right[node]):
+            kept.append(child)
+            heapq.heappush(heap, (-weights[child], child, depth + 1))
+    return kept, expanded, depth_reached
+
+
+def consistent_node_values(tree, leaf_values):
+    """
+    Recalcule la valeur des nœuds internes comme moyenne pondérée (weighted_n_node_samples)
+    des valeurs de leurs feuilles. Dans un gradient boosting, seules les feuilles reçoivent
+    la mise à jour de Newton de la fonction de perte ; les nœuds internes gardent le résidu
+    moyen et ne sont pas à la même échelle.
+
+    Args:
+        tree: Attribut tree_ d'un arbre entraîné
+        leaf_values: Valeur de chaque nœud (seules celles des feuilles sont utilisées)
+
+    Returns:
+        Valeurs de tous les nœuds, cohérentes avec les feuilles
+    """
+    values = np.array(leaf_values, dtype=np.float64)
+    left, right, weights = tree.children_left, tree.children_right, tree.weighted_n_node_samples
+    # Les enfants ont un indice supérieur à leur parent : parcours des nœuds internes à rebours
+    for node in np.flatnonzero(left >= 0)[::-1]:
+        l, r = left[node], right[node]
+        values[node] = (weights[l] * values[l] + weights[r] * values[r]) / (weights[l] + weights[r])
+    return values
+
+
+def _tree_arrays(tree, value, max_depth=None, max_leaves=None):
+    """
+    Extrait (et élague si demandé) les tableaux d'un arbre scikit-learn
+
+    Args:
+        tree: Attribut tree_ d'un arbre entraîné
+        value: Valeur de sortie de chaque nœud (probabilité ou contribution au score)
+
+    Returns:
+        left, right, feature, threshold, value, profondeur
+    """
+    left, right = tree.children_left, tree.children_right
+    if max_depth is None and max_leaves is None:
+        return left, right, tree.feature, tree.threshold, value, tree.max_depth
+
+    kept, expanded, depth = _select_nodes(left, right, tree.weighted_n_node_samples, max_depth, max_leaves)
+    kept = np.array(kept)
+    new_id = np.full(tree.node_count, -1)
+    new_id[kept] = np.arange(len(kept))
+    is_split = np.array([node in expanded for node in kept], dtype=bool)
+    return (np.where(is_split, new_id[left[kept]], -1), np.where(is_split, new_id[right[kept]], -1),
+            tree.feature[kept], tree.threshold[kept], value[kept], depth)
+
+
+class CompactTreeEnsemble(ClassifierMixin, BaseEstimator):
+    """
+    Forme compacte et en lecture seule d'un arbre de décision, d'une forêt aléatoire
+    ou d'un gradient boosting binaire entraîné : les nœuds de tous les arbres sont
+    stockés dans des tableaux plats aux types les plus petits suffisants, sans les
+    attributs utiles seulement à l'entraînement.
+    Se construit avec from_estimator et s'utilise comme dernière étape d'un Pipeline.
+
+    Args:
+        kind: 'forest' (moyenne des probabilités des feuilles) ou 'boosting' (somme des scores)
+        roots: Indice du nœud racine de chaque arbre
+        feature, threshold: Variable et seuil de chaque nœud de décision
+        children_left, children_right: Enfants de chaque nœud (-1 pour une feuille)
+        value: Probabilité de la classe positive (forest) ou contribution au score (boosting)
+        max_depth: Profondeur maximale des arbres
+        classes: Classes du modèle d'origine
+        init: Score initial (boosting)
+    """
+
+    def __init__(self, kind='forest', roots=None, feature=None, threshold=None, children_left=None,
+                 children_right=None, value=None, max_depth=0, classes=None, init=0.0):
+        self.kind = kind
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.max_depth = max_depth
+        self.classes = classes
+        self.init = init
+
+    @classmethod
+    def from_estimator(cls, estimator, max_depth=None, max_leaves=None):
+        """
+        Compacte un classifieur à base d'arbres entraîné
+
+        Args:
+            estimator: DecisionTreeClassifier, RandomForestClassifier ou GradientBoostingClassifier binaire
+            max_depth: Profondeur maximale après élagage
+            max_leaves: Nombre maximal de feuilles par arbre
+
+        Returns:
+            CompactTreeEnsemble
+        """
+        if isinstance(estimator, GradientBoostingClassifier):
+            kind = 'boosting'
+            trees = [regressor.tree_ for regressor in estimator.estimators_[:, 0]]
+            # Nœuds internes recalculés depuis les feuilles ajustées par la fonction de perte :
+            # un nœud devenu feuille par élagage reste à l'échelle des scores
+            values = [consistent_node_values(tree, tree.value[:, 0, 0]) * estimator.learning_rate
+                      for tree in trees]
+            # Score initial : score du modèle moins la contribution des arbres, sur une ligne quelconque
+            probe = np.zeros((1, estimator.n_features_in_), dtype=np.float32)
+            init = float(estimator.decision_function(probe)[0]
+                         - sum(value[tree.apply(probe)[0]] for tree, value in zip(trees, values)))
+        elif isinstance(estimator, (RandomForestClassifier, DecisionTreeClassifier)):
+            kind, init = 'forest', 0.0
+            trees = [tree.tree_ for tree in getattr(estimator, 'estimators_', [estimator])]
+            values = []
+            for tree in trees:
+                counts = tree.value[:, 0, :]
+                values.append(counts[:, 1] / counts.sum(axis=1))
+        else:
+            raise ValueError(f"Compaction non supportée pour {type(estimator).__name__}")
+
+        if len(estimator.classes_) != 2:
+            raise ValueError("Compaction limitée aux modèles binaires")
+
+        parts = [_tree_arrays(tree, value, max_depth, max_leaves) for tree, value in zip(trees, values)]
+        sizes = [len(part[0]) for part in parts]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        node_dtype = smallest_int_dtype(sum(sizes))
+
+        def children(index):
+            return np.concatenate([
+                np.where(part[index] >= 0, part[index] + offset, -1) for part, offset in zip(parts, offsets)
+            ]).astype(node_dtype)
+
+        # Variable 0 pour les feuilles : l'indexation reste valide pendant le parcours vectorisé
+        feature = np.concatenate([np.maximum(part[2], 0) for part in parts])
+        model = cls(
+            kind=kind,
+            roots=offsets.astype(node_dtype),
+            feature=feature.astype(smallest_int_dtype(estimator.n_features_in_)),
+            threshold=float32_floor(np.concatenate([part[3] for part in parts])),
+            children_left=children(0),
+            children_right=children(1),
+            value=np.concatenate([part[4] for part in parts]).astype(np.float32),
+            max_depth=int(max(part[5] for part in parts)),
+            classes=np.asarray(estimator.classes_),
+            init=init,
+        )
+        model.classes_ = model.classes
+        model.n_features_in_ = estimator.n_features_in_
+        return model
+
+    @property
+    def node_count(self):
+        return len(self.value)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.roots, self.feature, self.threshold,
+                                              self.children_left, self.children_right, self.value))
+
+    def apply(self, X):
+        """
+        Returns:
+            Indice de la feuille atteinte dans chaque arbre, tableau (n_lignes, n_arbres)
+        """
+        X = to_float32(X)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots.astype(np.intp), (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            left = self.children_left[nodes]
+            internal = left >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(internal, np.where(go_left, left, self.children_right[nodes]), nodes)
+        return nodes
+
+    def predict_proba(self, X):
+        X = to_float32(X)
+        positive = np.empty(len(X))
+        for start in range(0, len(X), PREDICT_CHUNK_ROWS):
+            leaves = self.value[self.apply(X[start:start + PREDICT_CHUNK_ROWS])].astype(np.float64)
+            if self.kind == 'boosting':
+                chunk = 1.0 / (1.0 + np.exp(-(self.init + leaves.sum(axis=1))))
+            else:
+                chunk = leaves.mean(axis=1)
+            positive[start:start + len(chunk)] = chunk
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(int)]
+
+
+def compact_pipeline(pipeline, X_test=None, y_test=None, max_depth=None, max_leaves=None,
+                     auc_tolerance=None, depth_candidates=DEPTH_CANDIDATES):
+    """
+    Remplace le classifieur d'un pipeline entraîné par sa forme compacte
+
+    Args:
+        pipeline: Pipeline entraîné (préprocesseur + classifieur à base d'arbres)
+        X_test, y_test: Jeu de validation, requis avec auc_tolerance
+        max_depth, max_leaves: Élagage explicite des arbres
+        auc_tolerance: Si fourni, choisit la profondeur la plus faible de depth_candidates
+            dont l'AUC ne perd pas plus de auc_tolerance par rapport au modèle d'origine
+
+    Returns:
+        Pipeline compacté (préprocesseur partagé avec le pipeline d'origine)
+    """
+    preprocessor = pipeline[:-1]
+    classifier = pipeline[-1]
+
+    def build(depth):
+        return Pipeline(preprocessor.steps + [
+            ('classifier', CompactTreeEnsemble.from_estimator(classifier, depth, max_leaves))
+        ])
+
+    compact = build(max_depth)
+    if auc_tolerance is None:
+        return compact
+
+    X_encoded = preprocessor.transform(X_test)
+    target = roc_auc_score(y_test, classifier.predict_proba(X_encoded)[:, 1]) - auc_tolerance
+    tree_depth = compact[-1].max_depth
+    for depth in depth_candidates:
+        if depth >= tree_depth or (max_depth is not None and depth >= max_depth):
+            continue
+        candidate = build(depth)
+        if roc_auc_score(y_test, candidate[-1].predict_proba(X_encoded)[:, 1]) < target:
+            break
+        compact = candidate
+    return compact
+
+
+def _load_time(blob, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pickle.loads(blob)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def compaction_report(original, compact, X_test, y_test):
+    """
+    Compare un pipeline et sa forme compacte
+
+    Returns:
+        dict avec taille sérialisée (Mo), temps de chargement (s), AUC et accuracy avant/après
+    """
+    report = {}
+    for label, pipeline in (('before', original), ('after', compact)):
+        blob = pickle.dumps(pipeline, protocol=pickle.HIGHEST_PROTOCOL)
+        proba = pipeline.predict_proba(X_test)[:, 1]
+        report[label] = {
+            'size_mb': len(blob) / 1024 ** 2,
+            'load_s': _load_time(blob),
+            'AUCROC': roc_auc_score(y_test, proba),
+            'Accuracy': accuracy_score(y_test, pipeline.predict(X_test)),
+        }
+    report['after']['max_depth'] = compact[-1].max_depth
+    report['after']['nodes'] = compact[-1].node_count
+    return report
@@ -2,9 +2,35 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import streamlit as st
+from prediction.contributions import top_drivers
+from prediction.prediction_store import feature_hashes
+from utils.figure_cache import cached_figures
+from utils.tracing import span, traced
 
 
-def predict_future_churn(pipeline, df, months=3):
+def project_features(df, months):
+    """
+    Projette les variables des clients à l'horizon : ancienneté et charges totales
+    augmentent de months mois (months négatif : retour aux variables actuelles)
+
+    Returns:
+        Copie du DataFrame projetée
+    """
+    future_df = df.copy()
+    future_df['Tenure (Months)'] += months
+    future_df['Total Charges'] += future_df['Monthly Charges'] * months
+    return future_df
+
+
+def _future_proba(pipeline, X_future, X_current):
+    """Probabilités à l'horizon ; un modèle par segment affecte les clients selon leurs variables actuelles"""
+    if hasattr(pipeline, 'parts'):
+        return pipeline.predict_proba(X_future, route=X_current)[:, 1]
+    return pipeline.predict_proba(X_future)[:, 1]
+
+
+@traced()
+def predict_future_churn(pipeline, df, months=3, store=None):
     """
     Prédit le churn dans X mois
 
@@ -12,25 +38,37 @@ def predict_future_churn(pipeline, df, months=3):
         pipeline: Pipeline entrainé
         df: DataFrame contenant les données client
         months: Nombre de mois dans le futur pour la prédiction
+        store: PredictionStore du modèle et de l'horizon ; si fourni, seuls les clients
+            nouveaux ou dont les variables ont changé sont recalculés
 
     Returns:
         DataFrame avec prédictions
     """
-    # Copie des données pour simulation future
-    future_df = df.copy()
-
     # Simulation de l'évolution dans X mois
-    future_df['Tenure (Months)'] += months
-    future_df['Total Charges'] += future_df['Monthly Charges'] * months
+    future_df = project_features(df, months)
 
     # Prédiction
-    X_future = future_df[[col for col in pipeline.feature_names_in_ if col in future_df.columns]]
-    future_df['Future_Churn_Probability'] = pipeline.predict_proba(X_future)[:, 1]
+    columns = [col for col in pipeline.feature_names_in_ if col in future_df.columns]
+    X_future, X_current = future_df[columns], df[columns]
+    if store is None:
+        future_df['Future_Churn_Probability'] = _future_proba(pipeline, X_future, X_current)
+    else:
+        # Empreintes calculées sur les données actuelles : l'horizon fait partie de la clé du store
+        hashes = feature_hashes(df, columns)
+        customer_ids = df['CustomerID'].to_numpy()
+        probabilities = store.lookup(customer_ids, hashes)
+        stale = np.isnan(probabilities)
+        with span("rescore", rows=int(stale.sum())):
+            if stale.any():
+                probabilities[stale] = _future_proba(pipeline, X_future[stale], X_current[stale])
+                store.update(customer_ids[stale], hashes[stale], probabilities[stale])
+        future_df['Future_Churn_Probability'] = probabilities
     future_df['Predicted_Churn'] = (future_df['Future_Churn_Probability'] > 0.5).astype(int)
 
     return future_df
 
 
+@traced()
 def predict_for_individual(pipeline, client_data):
     """
     Prédit le churn pour un client individuel
@@ -47,15 +85,15 @@ def predict_for_individual(pipeline, client_data):
     return client_data
 
 
-def visualize_predictions(predictions):
+def build_prediction_figures(predictions):
     """
-    Visualise les résultats de prédiction
+    Construit les graphiques de prédiction
 
     Args:
         predictions: DataFrame contenant les prédictions
 
     Returns:
-        None (affiche des graphiques via Streamlit)
+        Liste de figures Plotly
     """
     # Distribution des probabilités
     fig1 = px.histogram(
@@ -65,7 +103,6 @@ def visualize_predictions(predictions):
         title="Distribution des probabilités de churn",
         color_discrete_sequence=['#3366CC']
     )
-    st.plotly_chart(fig1)
 
     # Relation entre ancienneté et churn
     fig2 = px.scatter(
@@ -76,12 +113,36 @@ def visualize_predictions(predictions):
         title="Relation entre ancienneté et risque de churn",
         color_discrete_sequence=['#33CC66', '#CC3366']
     )
-    st.plotly_chart(fig2)
+    return [fig1, fig2]
+
+
+@traced()
+def visualize_predictions(predictions, cache_key=None, contributions=None):
+    """
+    Visualise les résultats de prédiction
+
+    Args:
+        predictions: DataFrame contenant les prédictions
+        cache_key: Clé identifiant les prédictions ; si fournie, les graphiques sont mis en cache
+        contributions: Contributions des variables par client (compute_contributions) ;
+            si fournies, les principaux facteurs de risque sont affichés
+
+    Returns:
+        None (affiche des graphiques via Streamlit)
+    """
+    if cache_key is None:
+        figures = build_prediction_figures(predictions)
+    else:
+        figures = cached_figures(cache_key, build_prediction_figures, predictions)
+    for fig in figures:
+        st.plotly_chart(fig)
 
     # Top clients à risque
-    high_risk = predictions.sort_values('Future_Churn_Probability', ascending=False).head(10)
+    high_risk = predictions.nlargest(10, 'Future_Churn_Probability')
     st.subheader("Top 10 clients à risque élevé de churn")
-    st.dataframe(high_risk[[
-        'CustomerID', 'Age', 'Tenure (Months)', 'Monthly Charges',
-        'Satisfaction Score', 'Future_Churn_Probability'
-    ]])
\ No newline at end of file
+    columns = ['CustomerID', 'Age', 'Tenure (Months)', 'Monthly Charges',
+               'Satisfaction Score', 'Future_Churn_Probability']
+    if contributions is not None:
+        high_risk = high_risk.assign(**{'Principaux facteurs': top_drivers(contributions.loc[high_risk.index])})
+        columns.append('Principaux facteurs')
+    st.dataframe(high_risk[columns])
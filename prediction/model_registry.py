@@ -0,0 +1,324 @@
+import hashlib
+import os
+import pickle
+import numpy as np
+import pandas as pd
+import streamlit as st
+from prediction.contributions import compute_contributions, get_tree_ensemble
+from prediction.model_compaction import compact_pipeline, compaction_report
+from prediction.model_prediction import predict_future_churn, project_features
+from prediction.model_training import split_data, train_model
+from prediction.prediction_store import get_prediction_store, refresh_store_size
+from utils.resource_cache import get_resource_cache, hold
+
+# Compaction des modèles entraînés avant leur mise en cache, activable via CHURN_COMPACT_MODELS=1
+COMPACT_MODELS = os.environ.get("CHURN_COMPACT_MODELS", "0") == "1"
+# Perte d'AUC tolérée par l'élagage lors de la compaction
+COMPACT_AUC_TOLERANCE = float(os.environ.get("CHURN_COMPACT_AUC_TOLERANCE", "0.005"))
+
+
+def model_key(data_version, model_type, variant='default'):
+    """
+    Clé d'un modèle entraîné dans le cache partagé
+
+    Args:
+        data_version: Version du dataset (get_data_version)
+        model_type: Type de modèle ('RandomForest', 'GradientBoosting', 'DecisionTree')
+        variant: Variante d'entraînement (hyperparamètres, préprocesseur...)
+    """
+    return ('model', data_version, model_type, variant)
+
+
+class _HashWriter:
+    """Fichier en écriture seule qui ne conserve que l'empreinte des octets reçus"""
+
+    def __init__(self):
+        self.hash = hashlib.sha1()
+
+    def write(self, data):
+        self.hash.update(data)
+
+
+def model_fingerprint(version, pipeline):
+    """
+    Empreinte du modèle entraîné, calculée une fois par version de modèle.
+    Deux entraînements donnant le même modèle (ex: rafraîchissement des fichiers
+    sans changement des données d'entraînement) ont la même empreinte.
+
+    Args:
+        version: Clé du modèle dans le registre (model_key)
+        pipeline: Pipeline entraîné
+
+    Returns:
+        Empreinte hexadécimale
+    """
+    def compute():
+        # Sérialisation en flux : le modèle n'est pas copié en mémoire
+        writer = _HashWriter()
+        pickle.Pickler(writer, protocol=pickle.HIGHEST_PROTOCOL).dump(pipeline)
+        return writer.hash.hexdigest()[:16]
+
+    return get_resource_cache().get_or_create(('model_fingerprint',) + tuple(version), compute)
+
+
+def _lease_slot(model_type, variant):
+    return f'model:{model_type}' if variant == 'default' else f'model:{model_type}:{variant}'
+
+
+def get_model(data_version, model_type, variant='default'):
+    """
+    Retourne le modèle partagé s'il a déjà été entraîné
+
+    Returns:
+        (pipeline, metrics) ou None
+    """
+    key = model_key(data_version, model_type, variant)
+    entry = get_resource_cache().get(key)
+    if entry is not None:
+        hold(st.session_state, _lease_slot(model_type, variant), key)
+    return entry
+
+
+def register_model(data_version, model_type, pipeline, metrics, variant='default'):
+    """
+    Enregistre un modèle entraîné dans le cache partagé
+
+    Returns:
+        (pipeline, metrics)
+    """
+    key = model_key(data_version, model_type, variant)
+    entry = get_resource_cache().put(key, (pipeline, metrics))
+    hold(st.session_state, _lease_slot(model_type, variant), key)
+    return entry
+
+
+def train_and_register(data_version, X, y, preprocessor, model_type, variant='default',
+                       job=None, progress_range=(0.0, 1.0)):
+    """
+    Entraîne le modèle s'il n'est pas déjà dans le cache partagé.
+    N'utilise pas l'état de session : appelable depuis une tâche d'arrière-plan.
+
+    Args:
+        job: Tâche d'arrière-plan à notifier (avancement, annulation), optionnelle
+        progress_range: Portion de l'avancement de la tâche couverte par l'entraînement
+
+    Returns:
+        (pipeline, metrics)
+    """
+    start, end = progress_range
+
+    def train():
+        monitor = None
+        if job is not None:
+            job.set_progress(start, f"Entraînement du modèle {model_type}")
+
+            def monitor(i, estimator, _locals):
+                job.progress = start + (end - start) * (i + 1) / estimator.n_estimators
+                return job.cancel_requested
+
+        pipeline, metrics = train_model(X, y, preprocessor, model_type, monitor=monitor)
+        if COMPACT_MODELS:
+            pipeline, metrics = compact_model(pipeline, metrics, X, y)
+        if job is not None:
+            job.set_progress(end)
+        return pipeline, metrics
+
+    return get_resource_cache().get_or_create(model_key(data_version, model_type, variant), train)
+
+
+def compact_model(pipeline, metrics, X, y):
+    """
+    Compacte un pipeline entraîné (élagage dans la tolérance d'AUC) et ajoute
+    le rapport de compaction aux métriques
+
+    Returns:
+        (pipeline compacté, metrics)
+    """
+    _, X_test, _, y_test = split_data(X, y)
+    compact = compact_pipeline(pipeline, X_test, y_test, auc_tolerance=COMPACT_AUC_TOLERANCE)
+    return compact, dict(metrics, Compaction=compaction_report(pipeline, compact, X_test, y_test))
+
+
+def get_or_train_model(data_version, X, y, preprocessor, model_type, variant='default'):
+    """
+    Retourne le modèle partagé, en l'entraînant s'il n'existe pas encore.
+    Deux sessions demandant le même modèle ne l'entraînent qu'une fois.
+
+    Returns:
+        (pipeline, metrics)
+    """
+    entry = train_and_register(data_version, X, y, preprocessor, model_type, variant)
+    hold(st.session_state, _lease_slot(model_type, variant), model_key(data_version, model_type, variant))
+    return entry
+
+
+def trained_variants(data_version, model_type, variants):
+    """
+    Returns:
+        Variantes de la liste dont le modèle est présent dans le cache partagé
+    """
+    cache = get_resource_cache()
+    return [variant for variant in variants if cache.get(model_key(data_version, model_type, variant)) is not None]
+
+
+def train_job(job, data_version, X, y, preprocessor, model_type, variant='default'):
+    """
+    Tâche d'arrière-plan d'entraînement
+
+    Returns:
+        Clé du modèle dans le cache partagé
+    """
+    train_and_register(data_version, X, y, preprocessor, model_type, variant, job=job)
+    return model_key(data_version, model_type, variant)
+
+
+def predictions_key(data_version, model_type, n_clients, months, variant='default'):
+    """Clé des prédictions de groupe dans le cache partagé"""
+    return ('predictions', data_version, model_type, variant, n_clients, months)
+
+
+def predict_and_store(data_version, model_type, pipeline, df, n_clients, months, variant='default'):
+    """
+    Calcule les prédictions de groupe si elles ne sont pas déjà dans le cache partagé.
+    Seuls les clients nouveaux ou modifiés depuis le dernier calcul avec le même
+    modèle entraîné et le même horizon sont recalculés, y compris après un
+    rafraîchissement des données. N'utilise pas l'état de session.
+
+    Returns:
+        (clé, DataFrame avec prédictions)
+    """
+    key = predictions_key(data_version, model_type, n_clients, months, variant)
+
+    def predict():
+        # Store indexé par le modèle entraîné lui-même et non par la version des données
+        model_id = (model_type, variant, model_fingerprint(model_key(data_version, model_type, variant), pipeline))
+        store = get_prediction_store(model_id, months)
+        predictions = predict_future_churn(pipeline, df.head(n_clients), months, store=store)
+        refresh_store_size(model_id, months)
+        return predictions
+
+    return key, get_resource_cache().get_or_create(key, predict)
+
+
+def use_predictions(key):
+    """
+    Associe des prédictions du cache partagé à la session courante
+
+    Returns:
+        DataFrame avec prédictions, ou None si elles ne sont plus en cache
+    """
+    st.session_state.predictions_key = key
+    hold(st.session_state, 'predictions', key)
+    return get_resource_cache().get(key)
+
+
+def get_or_predict(data_version, model_type, pipeline, df, n_clients, months, variant='default'):
+    """
+    Retourne les prédictions de groupe partagées, en les calculant si nécessaire,
+    et les associe à la session courante
+
+    Returns:
+        DataFrame avec prédictions
+    """
+    key, predictions = predict_and_store(data_version, model_type, pipeline, df, n_clients, months, variant)
+    use_predictions(key)
+    return predictions
+
+
+def predict_job(job, data_version, X, y, preprocessor, model_type, df, n_clients, months, variant='default'):
+    """
+    Tâche d'arrière-plan de prédiction de groupe. Le modèle standard est entraîné
+    si nécessaire ; les autres variantes (optimisée, par segment) doivent avoir été
+    entraînées depuis la page d'évaluation.
+
+    Returns:
+        Clé des prédictions dans le cache partagé
+
+    Raises:
+        RuntimeError si le modèle d'une variante n'est plus dans le cache partagé
+    """
+    if variant == 'default':
+        pipeline, _ = train_and_register(data_version, X, y, preprocessor, model_type, variant,
+                                         job=job, progress_range=(0.0, 0.8))
+    else:
+        entry = get_resource_cache().get(model_key(data_version, model_type, variant))
+        if entry is None:
+            raise RuntimeError(f"Le modèle {model_type} ({variant}) n'est plus disponible, "
+                               "relancez son entraînement depuis l'évaluation des modèles")
+        pipeline = entry[0]
+    job.set_progress(0.8, "Prédiction en cours")
+    key, _ = predict_and_store(data_version, model_type, pipeline, df, n_clients, months, variant)
+    return key
+
+
+def get_session_predictions():
+    """Retourne les dernières prédictions de groupe de la session, ou None"""
+    key = st.session_state.get('predictions_key')
+    return None if key is None else get_resource_cache().get(key)
+
+
+def get_prediction_contributions(predictions_key, predictions):
+    """
+    Retourne les contributions des variables pour des prédictions de groupe,
+    mises en cache avec les prédictions (donc par version de modèle et horizon)
+
+    Args:
+        predictions_key: Clé des prédictions (predictions_key)
+        predictions: DataFrame des prédictions (variables projetées à l'horizon)
+
+    Returns:
+        DataFrame des contributions, ou None si le modèle n'est plus en cache
+    """
+    _, data_version, model_type, variant, _, months = predictions_key
+    version = model_key(data_version, model_type, variant)
+    entry = get_resource_cache().get(version)
+    if entry is None:
+        return None
+
+    def compute():
+        # Segments affectés selon les variables actuelles, comme lors de la prédiction
+        route = project_features(predictions, -months) if hasattr(entry[0], 'parts') else None
+        return model_contributions(version, entry[0], predictions, route)[1]
+
+    return get_resource_cache().get_or_create(('contributions',) + tuple(predictions_key), compute)
+
+
+def model_contributions(version, model, X, route=None):
+    """
+    Calcule les contributions des variables d'un modèle du registre. Pour un modèle
+    par segment (SegmentedChurnModel), chaque client est expliqué par le pipeline
+    qui l'évalue.
+
+    Args:
+        version: Clé du modèle dans le registre (model_key)
+        model: Pipeline entraîné ou modèle par segment
+        X: Features des clients (colonnes d'origine, colonnes supplémentaires ignorées)
+        route: Variables actuelles des clients pour l'affectation aux segments, si X
+            est projeté à un horizon (voir SegmentedChurnModel.segments)
+
+    Returns:
+        (biais, par client pour un modèle par segment ; DataFrame des contributions indexé comme X)
+    """
+    if not hasattr(model, 'parts'):
+        X = X[[col for col in model.feature_names_in_ if col in X.columns]]
+        return compute_contributions(model, X, get_tree_ensemble(version, model))
+
+    bias = np.empty(len(X))
+    frames = []
+    for segment, pipeline, rows in model.parts(X, route):
+        part_bias, part = model_contributions(tuple(version) + (segment,), pipeline, X.iloc[rows])
+        bias[rows] = part_bias
+        frames.append(part.set_axis(rows))
+    contributions = pd.concat(frames).sort_index().fillna(0.0)
+    contributions.index = X.index
+    return pd.Series(bias, index=X.index), contributions
+
+
+def explain_client(data_version, model_type, pipeline, client_data, variant='default'):
+    """
+    Calcule les contributions des variables pour des clients saisis individuellement
+
+    Returns:
+        (biais, DataFrame des contributions par variable d'origine)
+    """
+    return model_contributions(model_key(data_version, model_type, variant), pipeline, client_data)
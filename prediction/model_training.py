@@ -6,44 +6,99 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import (accuracy_score, precision_score,
                              recall_score, f1_score, roc_auc_score,
                              classification_report, confusion_matrix)
+from sklearn.base import clone
 from sklearn.pipeline import Pipeline
 import streamlit as st
+from utils.tracing import traced
 
+# Famille de préprocessing adaptée à chaque type de modèle (voir prepare_data)
+MODEL_FAMILY = {
+    'RandomForest': 'tree',
+    'GradientBoosting': 'tree',
+    'DecisionTree': 'tree',
+}
 
-def train_model(X, y, preprocessor, model_type='RandomForest'):
+
+def model_family(model_type):
+    """Retourne la famille de préprocessing du type de modèle ('linear' par défaut)"""
+    return MODEL_FAMILY.get(model_type, 'linear')
+
+
+def split_data(X, y):
     """
-    Entraîne un modèle de prédiction
+    Sépare les données en jeux d'entraînement et de test (séparation commune à tous les modèles)
+
+    Returns:
+        X_train, X_test, y_train, y_test
+    """
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+
+def build_classifier(model_type, params=None):
+    """
+    Crée le classifieur non entraîné
 
     Args:
-        X: Features
-        y: Target (Churn)
-        preprocessor: ColumnTransformer pour prétraitement
         model_type: Type de modèle ('RandomForest', 'GradientBoosting', 'DecisionTree')
+        params: Hyperparamètres remplaçant les valeurs par défaut
 
     Returns:
-        pipeline, metrics
+        Estimateur scikit-learn
     """
-    # Séparation train/test
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
     if model_type == 'RandomForest':
         model = RandomForestClassifier(random_state=42)
     elif model_type == 'GradientBoosting':
         model = GradientBoostingClassifier(random_state=42)
     else:
         model = DecisionTreeClassifier(max_depth=3, random_state=42)
+    if params:
+        model.set_params(**params)
+    return model
+
 
+def fit_pipeline(X, y, preprocessor, model_type, monitor=None, params=None):
+    """
+    Entraîne préprocesseur et classifieur sur toutes les lignes fournies
+
+    Args:
+        X: Features
+        y: Target (Churn)
+        preprocessor: Préprocesseur non entraîné (copié avant entraînement)
+        model_type: Type de modèle
+        monitor: Voir train_model
+        params: Hyperparamètres du classifieur
+
+    Returns:
+        Pipeline entraîné
+    """
     pipeline = Pipeline([
-        ('preprocessor', preprocessor),
-        ('classifier', model)
+        # Copie non entraînée : le préprocesseur peut être partagé entre entraînements concurrents
+        ('preprocessor', clone(preprocessor)),
+        ('classifier', build_classifier(model_type, params))
     ])
-    pipeline.fit(X_train, y_train)
+    fit_params = {}
+    if monitor is not None and model_type == 'GradientBoosting':
+        fit_params['classifier__monitor'] = monitor
+    return pipeline.fit(X, y, **fit_params)
 
-    # Évaluation du modèle
+
+def evaluate_model(pipeline, X_test, y_test, model_type):
+    """
+    Évalue un pipeline entraîné sur le jeu de test
+
+    Args:
+        pipeline: Pipeline entraîné
+        X_test: Features de test
+        y_test: Target de test
+        model_type: Type de modèle
+
+    Returns:
+        dict des métriques
+    """
     y_pred = pipeline.predict(X_test)
     y_proba = pipeline.predict_proba(X_test)[:, 1]
 
-    metrics = {
+    return {
         'Model_Type': model_type,
         'Accuracy': accuracy_score(y_test, y_pred),
         'Precision': precision_score(y_test, y_pred),
@@ -52,7 +107,33 @@ def train_model(X, y, preprocessor, model_type='RandomForest'):
         'AUCROC': roc_auc_score(y_test, y_proba),
         'Confusion_Matrix': confusion_matrix(y_test, y_pred),
         'Classification_Report': classification_report(y_test, y_pred, output_dict=True),
-        'Features': list(X.columns)
+        'Features': list(X_test.columns)
     }
 
-    return pipeline, metrics
\ No newline at end of file
+
+@traced()
+def train_model(X, y, preprocessor, model_type='RandomForest', monitor=None, params=None):
+    """
+    Entraîne un modèle de prédiction
+
+    Args:
+        X: Features
+        y: Target (Churn)
+        preprocessor: ColumnTransformer pour prétraitement
+        model_type: Type de modèle ('RandomForest', 'GradientBoosting', 'DecisionTree')
+        monitor: Fonction monitor(i, estimator, locals) appelée après chaque itération
+            du GradientBoosting ; l'entraînement s'arrête si elle retourne True
+        params: Hyperparamètres du classifieur remplaçant les valeurs par défaut
+
+    Returns:
+        pipeline, metrics
+    """
+    # Séparation train/test
+    X_train, X_test, y_train, y_test = split_data(X, y)
+
+    pipeline = fit_pipeline(X_train, y_train, preprocessor, model_type, monitor=monitor, params=params)
+
+    # Évaluation du modèle
+    metrics = evaluate_model(pipeline, X_test, y_test, model_type)
+
+    return pipeline, metrics
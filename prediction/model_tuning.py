@@ -0,0 +1,167 @@
+import os
+from scipy.stats import loguniform, randint, uniform
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV
+from sklearn.pipeline import Pipeline
+from prediction.model_registry import model_key
+from prediction.model_training import build_classifier, evaluate_model, model_family, split_data
+from utils.jobs import DEFAULT_MAX_WORKERS
+from utils.resource_cache import get_resource_cache
+from utils.tracing import span, traced
+
+# Variante sous laquelle les modèles optimisés sont enregistrés dans le registre
+TUNED_VARIANT = 'tuned'
+
+# Nombre de candidats tirés au premier tour de la recherche
+N_CANDIDATES = int(os.environ.get("CHURN_TUNING_CANDIDATES", "32"))
+# Facteur d'élimination : seul 1/FACTOR des candidats passe au tour suivant, avec FACTOR fois plus de données
+HALVING_FACTOR = 3
+# Nombre de processus d'évaluation des candidats, configurable via CHURN_TUNING_JOBS (-1 : tous les cœurs).
+# Par défaut, les cœurs sont partagés entre les tâches d'arrière-plan qui peuvent s'exécuter simultanément.
+TUNING_N_JOBS = int(os.environ.get("CHURN_TUNING_JOBS", str(max(1, (os.cpu_count() or 1) // DEFAULT_MAX_WORKERS))))
+
+PARAM_SPACES = {
+    'RandomForest': {
+        'n_estimators': randint(50, 400),
+        'max_depth': [None, 6, 10, 16, 24],
+        'min_samples_leaf': randint(1, 20),
+        'max_features': ['sqrt', 'log2', 0.5],
+        'class_weight': [None, 'balanced'],
+    },
+    'GradientBoosting': {
+        'n_estimators': randint(50, 400),
+        'learning_rate': loguniform(0.01, 0.3),
+        'max_depth': randint(2, 6),
+        'subsample': uniform(0.6, 0.4),
+        'min_samples_leaf': randint(1, 50),
+    },
+    'DecisionTree': {
+        'max_depth': randint(2, 16),
+        'min_samples_leaf': randint(1, 100),
+        'criterion': ['gini', 'entropy'],
+        'class_weight': [None, 'balanced'],
+    },
+}
+
+
+class _MonitoredHalvingSearch(HalvingRandomSearchCV):
+    """
+    HalvingRandomSearchCV qui notifie une tâche d'arrière-plan avant chaque tour :
+    avancement, et arrêt de la recherche si l'annulation a été demandée
+    """
+
+    job = None
+    progress_range = (0.0, 1.0)
+
+    def _run_search(self, evaluate_candidates):
+        rounds = []
+
+        def evaluate(candidate_params, cv=None, more_results=None):
+            if self.job is not None:
+                self.job.check_cancelled()
+                start, end = self.progress_range
+                n_rounds = getattr(self, 'n_iterations_', None) or len(rounds) + 1
+                self.job.set_progress(start + (end - start) * len(rounds) / n_rounds,
+                                      f"Tour {len(rounds) + 1}/{n_rounds} : {len(candidate_params)} candidats")
+            rounds.append(len(candidate_params))
+            return evaluate_candidates(candidate_params, cv, more_results=more_results)
+
+        super()._run_search(evaluate)
+
+
+def get_encoded_split(data_version, X, y, preprocessor, family):
+    """
+    Retourne la séparation train/test avec le jeu d'entraînement déjà prétraité,
+    calculée une fois par version du dataset et famille de préprocessing,
+    et partagée entre les recherches
+
+    Returns:
+        preprocessor entraîné, X_train prétraité, X_test (brut), y_train, y_test
+    """
+    def encode():
+        X_train, X_test, y_train, y_test = split_data(X, y)
+        fitted = clone(preprocessor).fit(X_train)
+        return fitted, fitted.transform(X_train), X_test, y_train, y_test
+
+    return get_resource_cache().get_or_create(('encoded', data_version, family), encode)
+
+
+@traced()
+def tune_model(data_version, X, y, preprocessor, model_type, job=None):
+    """
+    Recherche les hyperparamètres du modèle par successive halving : les candidats
+    sont évalués en parallèle sur des sous-échantillons croissants et seuls les
+    meilleurs passent au tour suivant. Le préprocesseur est entraîné une seule fois.
+    L'annulation de la tâche est prise en compte entre deux tours et avant
+    l'entraînement final.
+    N'utilise pas l'état de session : appelable depuis une tâche d'arrière-plan.
+
+    Args:
+        data_version: Version du dataset (get_data_version)
+        X: Features
+        y: Target (Churn)
+        preprocessor: Préprocesseur non entraîné de la famille du modèle
+        model_type: Type de modèle ('RandomForest', 'GradientBoosting', 'DecisionTree')
+        job: Tâche d'arrière-plan à notifier (avancement, annulation), optionnelle
+
+    Returns:
+        pipeline, metrics (avec les meilleurs hyperparamètres et le score de validation croisée)
+    """
+    if job is not None:
+        job.set_progress(0.05, "Prétraitement des données")
+    fitted_preprocessor, X_train_encoded, X_test, y_train, y_test = get_encoded_split(
+        data_version, X, y, preprocessor, model_family(model_type)
+    )
+
+    if job is not None:
+        job.set_progress(0.15, f"Recherche des hyperparamètres ({N_CANDIDATES} candidats)")
+    search = _MonitoredHalvingSearch(
+        build_classifier(model_type),
+        PARAM_SPACES[model_type],
+        n_candidates=N_CANDIDATES,
+        factor=HALVING_FACTOR,
+        resource='n_samples',
+        scoring='roc_auc',
+        cv=3,
+        # Meilleur candidat réentraîné ci-dessous, après vérification de l'annulation
+        refit=False,
+        n_jobs=TUNING_N_JOBS,
+        random_state=42,
+    )
+    search.job, search.progress_range = job, (0.15, 0.75)
+    with span(f"halving_search[{model_type}]", rows=len(y_train)):
+        search.fit(X_train_encoded, y_train)
+
+    if job is not None:
+        job.check_cancelled()
+        job.set_progress(0.75, "Entraînement du meilleur modèle")
+    with span(f"refit[{model_type}]", rows=len(y_train)):
+        classifier = build_classifier(model_type).set_params(**search.best_params_).fit(X_train_encoded, y_train)
+
+    if job is not None:
+        job.set_progress(0.9, "Évaluation du meilleur modèle")
+    pipeline = Pipeline([
+        ('preprocessor', fitted_preprocessor),
+        ('classifier', classifier)
+    ])
+    metrics = evaluate_model(pipeline, X_test, y_test, model_type)
+    metrics['Best_Params'] = search.best_params_
+    metrics['CV_AUCROC'] = search.best_score_
+    metrics['Search_Rounds'] = search.n_iterations_
+    return pipeline, metrics
+
+
+def tune_job(job, data_version, X, y, preprocessor, model_type):
+    """
+    Tâche d'arrière-plan d'optimisation ; le modèle retenu est enregistré
+    dans le registre sous la variante TUNED_VARIANT
+
+    Returns:
+        Clé du modèle dans le cache partagé
+    """
+    key = model_key(data_version, model_type, TUNED_VARIANT)
+    get_resource_cache().get_or_create(
+        key, lambda: tune_model(data_version, X, y, preprocessor, model_type, job=job)
+    )
+    return key
@@ -0,0 +1,94 @@
+import threading
+import numpy as np
+import pandas as pd
+from utils.resource_cache import get_resource_cache
+
+
+def feature_hashes(df, columns):
+    """
+    Calcule une empreinte par ligne des variables utilisées par le modèle
+
+    Args:
+        df: DataFrame contenant les données client
+        columns: Colonnes prises en compte
+
+    Returns:
+        Tableau numpy uint64 (une empreinte par ligne)
+    """
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+class PredictionStore:
+    """
+    Probabilités de churn déjà calculées pour un modèle entraîné et un horizon,
+    indexées par CustomerID avec l'empreinte des variables au moment du calcul.
+    Une ligne n'est recalculée que si son empreinte a changé ou si le client est nouveau.
+    """
+
+    def __init__(self):
+        self._frame = pd.DataFrame(
+            {'hash': np.array([], dtype=np.uint64), 'proba': np.array([], dtype=np.float64)},
+            index=pd.Index([], name='CustomerID')
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._frame)
+
+    @property
+    def nbytes(self):
+        return int(self._frame.memory_usage(deep=True).sum())
+
+    def lookup(self, customer_ids, hashes):
+        """
+        Args:
+            customer_ids: Identifiants des clients
+            hashes: Empreintes actuelles des lignes (feature_hashes)
+
+        Returns:
+            Probabilités stockées, NaN pour les lignes à recalculer
+        """
+        with self._lock:
+            frame = self._frame
+        positions = frame.index.get_indexer(customer_ids)
+        known = positions >= 0
+        match = known.copy()
+        match[known] = frame['hash'].to_numpy()[positions[known]] == hashes[known]
+
+        probabilities = np.full(len(positions), np.nan)
+        probabilities[match] = frame['proba'].to_numpy()[positions[match]]
+        return probabilities
+
+    def update(self, customer_ids, hashes, probabilities):
+        """Enregistre les probabilités recalculées (la dernière occurrence d'un client l'emporte)"""
+        new = pd.DataFrame({'hash': hashes, 'proba': probabilities},
+                           index=pd.Index(customer_ids, name='CustomerID'))
+        new = new[~new.index.duplicated(keep='last')]
+        with self._lock:
+            kept = self._frame[~self._frame.index.isin(new.index)]
+            self._frame = new if kept.empty else pd.concat([kept, new])
+
+
+def get_prediction_store(model_id, months):
+    """
+    Retourne le store partagé d'un modèle entraîné et d'un horizon. Le store
+    survit aux nouvelles versions du dataset tant que le modèle est identique.
+
+    Args:
+        model_id: Identité du modèle entraîné (type, variante, empreinte ; voir model_fingerprint)
+        months: Horizon de prédiction en mois
+
+    Returns:
+        PredictionStore
+    """
+    return get_resource_cache().get_or_create(('prediction_store',) + tuple(model_id) + (months,),
+                                              PredictionStore)
+
+
+def refresh_store_size(model_id, months):
+    """Met à jour la taille du store dans le cache partagé après un ajout"""
+    key = ('prediction_store',) + tuple(model_id) + (months,)
+    cache = get_resource_cache()
+    store = cache.get(key)
+    if store is not None:
+        cache.put(key, store)
@@ -0,0 +1,183 @@
+from itertools import product
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+from preprocessing.data_cleaning import to_float32
+from utils.tracing import span, traced
+
+# Nombre maximal de lignes (clients x scénarios) évaluées par appel au modèle
+MAX_BLOCK_ROWS = 2_000_000
+
+OPERATIONS = {
+    'set': lambda values, value: np.full_like(values, value),
+    'multiply': lambda values, value: values * value,
+    'add': lambda values, value: values + value,
+}
+
+
+def encoded_layout(preprocessor):
+    """
+    Décrit l'emplacement de chaque variable d'origine dans la matrice encodée
+
+    Args:
+        preprocessor: Préprocesseur entraîné (ColumnTransformer, éventuellement dans un Pipeline)
+
+    Returns:
+        dict {variable: (type, position, ...)} avec type parmi 'numeric', 'scaled'
+        (moyenne et écart-type), 'ordinal' et 'onehot' (modalités)
+    """
+    while isinstance(preprocessor, Pipeline):
+        preprocessor = next(step for _, step in preprocessor.steps
+                            if isinstance(step, Pipeline) or hasattr(step, 'transformers_'))
+
+    layout, position = {}, 0
+    for _, transformer, columns in preprocessor.transformers_:
+        if isinstance(transformer, str) and transformer == 'drop':
+            continue
+        for k, column in enumerate(columns):
+            if isinstance(transformer, OneHotEncoder):
+                categories = list(transformer.categories_[k])
+                layout[column] = ('onehot', position, categories)
+                position += len(categories)
+                continue
+            if isinstance(transformer, OrdinalEncoder):
+                layout[column] = ('ordinal', position, list(transformer.categories_[k]))
+            elif isinstance(transformer, StandardScaler):
+                layout[column] = ('scaled', position, transformer.mean_[k], transformer.scale_[k])
+            else:
+                layout[column] = ('numeric', position)
+            position += 1
+    return layout
+
+
+def scenario_grid(options):
+    """
+    Construit toutes les combinaisons d'interventions (chaque variable peut aussi rester inchangée)
+
+    Args:
+        options: dict {variable: [(opération, valeur, libellé), ...]} avec opération
+            parmi 'set', 'multiply' et 'add' ('set' uniquement pour les variables catégorielles)
+
+    Returns:
+        Liste de scénarios {'name': libellé, 'changes': {variable: (opération, valeur)}}
+    """
+    columns = list(options)
+    scenarios = []
+    for combination in product(*[[None] + list(options[column]) for column in columns]):
+        changes = {column: choice for column, choice in zip(columns, combination) if choice is not None}
+        if changes:
+            scenarios.append({
+                'name': " + ".join(label for _, _, label in changes.values()),
+                'changes': {column: (operation, value) for column, (operation, value, _) in changes.items()},
+            })
+    return scenarios
+
+
+def _raw_values(rows, spec):
+    if spec[0] == 'scaled':
+        return rows[:, spec[1]] * spec[3] + spec[2]
+    return rows[:, spec[1]]
+
+
+def _write_values(rows, spec, values):
+    if spec[0] == 'scaled':
+        values = (values - spec[2]) / spec[3]
+    rows[:, spec[1]] = values
+
+
+def _apply_changes(rows, layout, changes, months):
+    """Applique un scénario, en place, à un bloc de lignes encodées"""
+    for column, (operation, value) in changes.items():
+        spec = layout[column]
+        if spec[0] in ('numeric', 'scaled'):
+            old = _raw_values(rows, spec)
+            new = OPERATIONS[operation](old, value)
+            _write_values(rows, spec, new)
+            # Une baisse des charges mensuelles réduit aussi les charges cumulées sur l'horizon
+            if column == 'Monthly Charges' and months and 'Total Charges' not in changes:
+                total = layout['Total Charges']
+                _write_values(rows, total, _raw_values(rows, total) + (new - old) * months)
+            continue
+
+        if operation != 'set':
+            raise ValueError(f"Seule l'opération 'set' est possible pour la variable {column}")
+        if value not in spec[2]:
+            raise ValueError(f"Modalité inconnue du modèle pour {column}: {value}")
+        code = spec[2].index(value)
+        if spec[0] == 'ordinal':
+            rows[:, spec[1]] = code
+        else:
+            rows[:, spec[1]:spec[1] + len(spec[2])] = 0
+            rows[:, spec[1] + code] = 1
+
+
+@traced()
+def simulate_scenarios(pipeline, X, scenarios, months=0, max_block_rows=MAX_BLOCK_ROWS, route=None):
+    """
+    Évalue une grille d'interventions sur un ensemble de clients. Les clients sont
+    encodés une seule fois ; chaque scénario est un bloc copié de la matrice encodée
+    dont seules les colonnes modifiées sont réécrites, et tous les blocs sont évalués
+    en un seul appel au modèle (par paquet de max_block_rows lignes).
+
+    Args:
+        pipeline: Pipeline entraîné, ou modèle par segment (SegmentedChurnModel) dont
+            chaque segment est simulé avec son propre pipeline
+        X: Features des clients (colonnes d'origine, déjà projetées à l'horizon)
+        scenarios: Liste de scénarios (voir scenario_grid)
+        months: Horizon de la prédiction ; une variation des charges mensuelles est
+            répercutée sur les charges totales sur cette durée
+        max_block_rows: Nombre maximal de lignes par appel au modèle
+        route: Variables actuelles des clients pour l'affectation aux segments d'un
+            modèle par segment (voir SegmentedChurnModel.segments)
+
+    Returns:
+        (probabilités de churn sans intervention, DataFrame des écarts de probabilité
+        par client et par scénario), indexés comme X
+    """
+    if hasattr(pipeline, 'parts'):
+        base = np.empty(len(X))
+        deltas = np.empty((len(X), len(scenarios)))
+        for _, part, rows in pipeline.parts(X, route):
+            part_base, part_deltas = simulate_scenarios(part, X.iloc[rows], scenarios, months, max_block_rows)
+            base[rows] = part_base.to_numpy()
+            deltas[rows] = part_deltas.to_numpy()
+        return (pd.Series(base, index=X.index),
+                pd.DataFrame(deltas, index=X.index, columns=[scenario['name'] for scenario in scenarios]))
+
+    preprocessor, classifier = pipeline[:-1], pipeline[-1]
+    layout = encoded_layout(preprocessor)
+    encoded = to_float32(preprocessor.transform(X[[col for col in pipeline.feature_names_in_ if col in X.columns]]))
+    base = classifier.predict_proba(encoded)[:, 1]
+
+    n_rows, n_columns = encoded.shape
+    n_scenarios = len(scenarios)
+    deltas = np.empty((n_rows, n_scenarios))
+    chunk_rows = max(1, max_block_rows // max(n_scenarios, 1))
+    with span("score_scenarios", rows=n_rows * n_scenarios):
+        for start in range(0, n_rows, chunk_rows):
+            part = encoded[start:start + chunk_rows]
+            block = np.broadcast_to(part, (n_scenarios,) + part.shape).copy()
+            for index, scenario in enumerate(scenarios):
+                _apply_changes(block[index], layout, scenario['changes'], months)
+            proba = classifier.predict_proba(block.reshape(-1, n_columns))[:, 1].reshape(n_scenarios, len(part))
+            deltas[start:start + len(part)] = (proba - base[start:start + len(part)]).T
+
+    return (pd.Series(base, index=X.index),
+            pd.DataFrame(deltas, index=X.index, columns=[scenario['name'] for scenario in scenarios]))
+
+
+def summarize_scenarios(base, deltas, threshold=0.5):
+    """
+    Résume l'effet de chaque scénario sur l'ensemble des clients
+
+    Returns:
+        DataFrame par scénario, du plus au moins efficace
+    """
+    before = base.to_numpy()[:, None] > threshold
+    after = base.to_numpy()[:, None] + deltas.to_numpy() > threshold
+    return pd.DataFrame({
+        'Écart moyen': deltas.mean(),
+        'Clients retenus': (before & ~after).sum(axis=0),
+        'Nouveaux clients à risque': (~before & after).sum(axis=0),
+    }, index=deltas.columns).sort_values('Écart moyen')
@@ -0,0 +1,201 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+from prediction.model_registry import model_key
+from prediction.model_training import evaluate_model, fit_pipeline, split_data
+from segmentation.customer_segmentation import get_segmenter
+from utils.jobs import DEFAULT_MAX_WORKERS
+from utils.resource_cache import get_resource_cache
+from utils.tracing import traced
+
+# Segmentation utilisée si aucune segmentation n'a été effectuée dans la session
+DEFAULT_SEGMENT_FEATURES = ['Tenure (Months)', 'Monthly Charges', 'Total Charges']
+DEFAULT_N_SEGMENTS = 3
+# Nombre de processus d'entraînement par tâche, configurable via CHURN_SEGMENT_WORKERS
+# (0 : un par segment, dans la limite des cœurs disponibles pour chacune des tâches d'arrière-plan)
+SEGMENT_WORKERS = int(os.environ.get("CHURN_SEGMENT_WORKERS", "0"))
+# En dessous de ce nombre de clients (ou avec une seule classe), un segment utilise le modèle global
+MIN_SEGMENT_ROWS = 200
+
+
+def segmented_variant(features, n_clusters):
+    """Variante du registre d'un modèle par segment pour une segmentation donnée"""
+    return f"segmented:{n_clusters}:{'/'.join(features)}"
+
+
+def is_segmented_variant(variant):
+    return variant.startswith('segmented:')
+
+
+class SegmentedChurnModel:
+    """
+    Un pipeline de churn par segment. Chaque client est affecté à un segment par
+    la segmentation entraînée puis évalué par le modèle de son segment ; les clients
+    d'un même segment sont évalués ensemble. S'utilise comme un pipeline
+    (feature_names_in_, predict_proba, predict).
+
+    Pour une prédiction à horizon, les variables évaluées sont projetées mais le
+    segment doit rester celui du client aujourd'hui : les méthodes acceptent les
+    variables actuelles (route) utilisées pour l'affectation aux segments.
+
+    Args:
+        segmenter: Segmentation entraînée (fit_segmenter)
+        segment_features: Caractéristiques utilisées par la segmentation
+        models: dict {segment: pipeline entraîné sur ce segment}
+        fallback: Pipeline global pour les segments sans modèle propre, optionnel
+    """
+
+    def __init__(self, segmenter, segment_features, models, fallback=None):
+        self.segmenter = segmenter
+        self.segment_features = list(segment_features)
+        self.models = models
+        self.fallback = fallback
+        pipelines = list(models.values()) + ([fallback] if fallback is not None else [])
+        self.feature_names_in_ = np.array(list(dict.fromkeys(
+            [col for pipeline in pipelines for col in pipeline.feature_names_in_] + self.segment_features
+        )), dtype=object)
+        self.classes_ = pipelines[0].classes_
+
+    def segments(self, X, route=None):
+        """
+        Retourne le segment de chaque client
+
+        Args:
+            X: Features des clients
+            route: Variables actuelles des mêmes clients (même ordre) utilisées pour
+                l'affectation, par défaut X
+        """
+        route = X if route is None else route
+        return self.segmenter.predict(route[self.segment_features])
+
+    def parts(self, X, route=None):
+        """
+        Regroupe les clients par pipeline évaluateur (voir segments pour route)
+
+        Returns:
+            Liste de (segment, pipeline, positions des lignes de X) ; le segment vaut
+            None pour les clients évalués par le pipeline global
+        """
+        segments = self.segments(X, route)
+        parts = []
+        for segment in np.unique(segments):
+            rows = np.flatnonzero(segments == segment)
+            if segment in self.models:
+                parts.append((segment, self.models[segment], rows))
+            else:
+                parts.append((None, self.fallback, rows))
+        return parts
+
+    def predict_proba(self, X, route=None):
+        positive = np.empty(len(X))
+        for _, pipeline, rows in self.parts(X, route):
+            positive[rows] = pipeline.predict_proba(X.iloc[rows])[:, 1]
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X, route=None):
+        return self.classes_[(self.predict_proba(X, route)[:, 1] > 0.5).astype(int)]
+
+
+def _segment_metrics(model, X_test, y_test):
+    """Métriques de test par segment"""
+    segments = model.segments(X_test)
+    proba = model.predict_proba(X_test)[:, 1]
+    metrics = {}
+    for segment in np.unique(segments):
+        mask = segments == segment
+        y_segment, proba_segment = y_test[mask], proba[mask]
+        predicted = (proba_segment > 0.5).astype(int)
+        metrics[int(segment)] = {
+            'Clients': int(mask.sum()),
+            'Taux de churn': float(y_segment.mean()),
+            'Modèle': 'segment' if segment in model.models else 'global',
+            'Accuracy': accuracy_score(y_segment, predicted),
+            'F1': f1_score(y_segment, predicted, zero_division=0),
+            'AUCROC': roc_auc_score(y_segment, proba_segment) if y_segment.nunique() == 2 else float('nan'),
+        }
+    return metrics
+
+
+@traced()
+def train_segmented_model(X, y, preprocessor, model_type, segmenter, segment_features, job=None):
+    """
+    Entraîne un modèle par segment, en parallèle dans des processus séparés,
+    chacun sur les seules lignes d'entraînement de son segment. N'utilise pas
+    l'état de session : appelable depuis une tâche d'arrière-plan.
+
+    Args:
+        X: Features
+        y: Target (Churn)
+        preprocessor: Préprocesseur non entraîné
+        model_type: Type de modèle
+        segmenter: Segmentation entraînée (fit_segmenter)
+        segment_features: Caractéristiques utilisées par la segmentation
+        job: Tâche d'arrière-plan à notifier (avancement, annulation), optionnelle
+
+    Returns:
+        SegmentedChurnModel, metrics (globales, avec le détail par segment dans 'Segments')
+    """
+    X_train, X_test, y_train, y_test = split_data(X, y)
+    train_segments = segmenter.predict(X_train[segment_features])
+
+    slices, needs_fallback = {}, False
+    for segment in np.unique(train_segments):
+        mask = train_segments == segment
+        if mask.sum() < MIN_SEGMENT_ROWS or y_train[mask].nunique() < 2:
+            needs_fallback = True
+        else:
+            slices[segment] = (X_train[mask], y_train[mask])
+    if needs_fallback or not slices:
+        slices[None] = (X_train, y_train)
+
+    # Processus lancés par 'spawn' : pas de fork d'un serveur multi-thread. Les cœurs
+    # sont partagés entre les tâches d'arrière-plan qui peuvent s'exécuter simultanément.
+    workers = SEGMENT_WORKERS or min(len(slices), max(1, (os.cpu_count() or 1) // DEFAULT_MAX_WORKERS))
+    pipelines = {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {
+            pool.submit(fit_pipeline, X_slice, y_slice, preprocessor, model_type): segment
+            for segment, (X_slice, y_slice) in slices.items()
+        }
+        try:
+            if job is not None:
+                job.set_progress(0.05, f"Entraînement de {len(futures)} modèles sur {workers} processus")
+            for done, future in enumerate(as_completed(futures), start=1):
+                pipelines[futures[future]] = future.result()
+                if job is not None:
+                    job.set_progress(0.05 + 0.85 * done / len(futures), f"{done}/{len(futures)} modèles entraînés")
+        except BaseException:
+            # Annulation ou échec d'un entraînement : les entraînements non démarrés sont
+            # abandonnés, la sortie du bloc attend seulement ceux en cours
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    fallback = pipelines.pop(None, None)
+    model = SegmentedChurnModel(segmenter, segment_features, pipelines, fallback)
+    if job is not None:
+        job.set_progress(0.95, "Évaluation par segment")
+    metrics = evaluate_model(model, X_test, y_test, model_type)
+    metrics['Segments'] = _segment_metrics(model, X_test, y_test)
+    return model, metrics
+
+
+def segmented_job(job, data_version, df, X, y, preprocessor, model_type,
+                  segment_features=DEFAULT_SEGMENT_FEATURES, n_clusters=DEFAULT_N_SEGMENTS):
+    """
+    Tâche d'arrière-plan d'entraînement d'un modèle par segment ; le modèle est
+    enregistré dans le registre sous la variante segmented_variant(...)
+
+    Returns:
+        Clé du modèle dans le cache partagé
+    """
+    key = model_key(data_version, model_type, segmented_variant(segment_features, n_clusters))
+
+    def train():
+        job.set_progress(0.0, "Segmentation des clients")
+        segmenter = get_segmenter(df, data_version, segment_features, n_clusters)
+        return train_segmented_model(X, y, preprocessor, model_type, segmenter, segment_features, job=job)
+
+    get_resource_cache().get_or_create(key, train)
+    return key
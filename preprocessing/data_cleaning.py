@@ -1,20 +1,40 @@
+import numpy as np
 import pandas as pd
 import re
 import streamlit as st
+from utils.resource_cache import get_resource_cache
+from utils.tracing import traced
 
+NUMERIC_FEATURES = ['Age', 'Tenure (Months)', 'Monthly Charges', 'Total Charges',
+                    'Data Usage (GB)', 'Call Usage (Minutes)', 'Support Calls',
+                    'Satisfaction Score']
 
-def clean_customer_ids(df):
+CATEGORICAL_FEATURES = ['Location', 'Contract Type', 'Payment Method']
+
+# Familles de modèles : 'linear' pour les modèles linéaires et à distance (variables
+# standardisées, one-hot), 'tree' pour les arbres (codes ordinaux, matrice dense float32)
+MODEL_FAMILIES = ('linear', 'tree')
+
+
+def standardize_customer_ids(df, generate_missing=True):
     """
-    Uniformise les formats des CustomerID
+    Uniformise le format des CustomerID sans vérifier leur validité ni leur unicité
+    (les identifiants invalides valent None). N'utilise pas Streamlit : appelable
+    depuis un thread de chargement.
 
     Args:
         df: DataFrame contenant les données client
+        generate_missing: Si False, une colonne CustomerID absente est créée vide : les
+            identifiants sont attribués par l'appelant (ex: après concaténation des partitions)
 
     Returns:
         DataFrame avec CustomerID standardisés
     """
     if 'CustomerID' not in df.columns:
-        df['CustomerID'] = ['CUST_' + str(i).zfill(6) for i in range(1, len(df) + 1)]
+        if generate_missing:
+            df['CustomerID'] = ['CUST_' + str(i).zfill(6) for i in range(1, len(df) + 1)]
+        else:
+            df['CustomerID'] = None
         return df
 
     # Conversion en string et nettoyage
@@ -29,46 +49,150 @@ def clean_customer_ids(df):
         return 'CUST_' + numbers.zfill(6)
 
     df['CustomerID'] = df['CustomerID'].apply(standardize_id)
+    return df
+
 
+def repair_customer_ids(df):
+    """
+    Réinitialise les CustomerID s'ils contiennent des identifiants invalides ou des doublons.
+    N'utilise pas Streamlit : appelable depuis une tâche d'arrière-plan.
+
+    Args:
+        df: DataFrame avec CustomerID standardisés
+
+    Returns:
+        (DataFrame avec CustomerID valides et uniques, liste des avertissements)
+    """
+    warnings = []
     # Réindexation si des IDs sont invalides
     if df['CustomerID'].isnull().any():
-        st.warning("Certains CustomerID étaient invalides et ont été réinitialisés")
+        warnings.append("Certains CustomerID étaient invalides et ont été réinitialisés")
         df['CustomerID'] = ['CUST_' + str(i).zfill(6) for i in range(1, len(df) + 1)]
 
     # Vérification des doublons
     if df['CustomerID'].duplicated().any():
-        st.warning("Doublons détectés dans les CustomerID - réinitialisation")
+        warnings.append("Doublons détectés dans les CustomerID - réinitialisation")
         df['CustomerID'] = ['CUST_' + str(i).zfill(6) for i in range(1, len(df) + 1)]
 
+    return df, warnings
+
+
+def check_customer_ids(df):
+    """
+    Réinitialise les CustomerID s'ils contiennent des identifiants invalides ou des doublons
+    et affiche les avertissements dans la session
+
+    Args:
+        df: DataFrame avec CustomerID standardisés
+
+    Returns:
+        DataFrame avec CustomerID valides et uniques
+    """
+    df, warnings = repair_customer_ids(df)
+    for warning in warnings:
+        st.warning(warning)
     return df
 
 
-def prepare_data(df):
+@traced()
+def clean_customer_ids(df):
     """
-    Prépare les données pour le machine learning
+    Uniformise les formats des CustomerID
 
     Args:
         df: DataFrame contenant les données client
 
     Returns:
-        X, y, preprocessor, numeric_features, categorical_features
+        DataFrame avec CustomerID standardisés
     """
-    from sklearn.preprocessing import StandardScaler, OneHotEncoder
-    from sklearn.compose import ColumnTransformer
+    return check_customer_ids(standardize_customer_ids(df))
+
 
-    numeric_features = ['Age', 'Tenure (Months)', 'Monthly Charges', 'Total Charges',
-                        'Data Usage (GB)', 'Call Usage (Minutes)', 'Support Calls',
-                        'Satisfaction Score']
+def to_float32(X):
+    """Convertit la sortie du préprocesseur en matrice dense float32"""
+    if hasattr(X, 'toarray'):
+        X = X.toarray()
+    return np.asarray(X, dtype=np.float32)
 
-    categorical_features = ['Location', 'Contract Type', 'Payment Method']
 
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('num', StandardScaler(), numeric_features),
-            ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
+@traced()
+def prepare_data(df, model_family='linear'):
+    """
+    Prépare les données pour le machine learning
+
+    Args:
+        df: DataFrame contenant les données client
+        model_family: 'linear' (StandardScaler + OneHotEncoder) ou 'tree'
+            (variables numériques inchangées + codes ordinaux, en float32)
+
+    Returns:
+        X, y, preprocessor, numeric_features, categorical_features
+    """
+    from sklearn.preprocessing import StandardScaler, OneHotEncoder, OrdinalEncoder, FunctionTransformer
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+
+    if model_family not in MODEL_FAMILIES:
+        raise ValueError(f"Famille de modèles inconnue: {model_family}")
+
+    numeric_features = list(NUMERIC_FEATURES)
+    categorical_features = list(CATEGORICAL_FEATURES)
+
+    if model_family == 'tree':
+        # Les arbres n'ont besoin ni de standardisation ni de one-hot :
+        # une colonne de codes par variable catégorielle suffit
+        preprocessor = Pipeline([
+            ('columns', ColumnTransformer(
+                transformers=[
+                    ('num', 'passthrough', numeric_features),
+                    ('cat', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1,
+                                           dtype=np.float32), categorical_features)
+                ],
+                sparse_threshold=0)),
+            ('float32', FunctionTransformer(to_float32))
         ])
+    else:
+        preprocessor = ColumnTransformer(
+            transformers=[
+                ('num', StandardScaler(), numeric_features),
+                ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_features)
+            ])
 
     X = df[numeric_features + categorical_features]
     y = df['Churn']
 
-    return X, y, preprocessor, numeric_features, categorical_features
\ No newline at end of file
+    return X, y, preprocessor, numeric_features, categorical_features
+
+
+def get_prepared_data(df, data_version, model_family='linear'):
+    """
+    Retourne le résultat de prepare_data partagé entre sessions pour une version du dataset.
+    Le préprocesseur retourné n'est pas entraîné et ne doit pas être modifié.
+
+    Args:
+        df: DataFrame contenant les données client
+        data_version: Version du dataset (get_data_version)
+        model_family: Famille de modèles (voir prepare_data)
+
+    Returns:
+        X, y, preprocessor, numeric_features, categorical_features
+    """
+    return get_resource_cache().get_or_create(('prepared', data_version, model_family),
+                                              lambda: prepare_data(df, model_family))
+
+
+def get_category_values(df, data_version):
+    """
+    Retourne les modalités de chaque variable catégorielle, partagées entre sessions
+
+    Args:
+        df: DataFrame contenant les données client
+        data_version: Version du dataset (get_data_version)
+
+    Returns:
+        dict {colonne: liste des modalités dans l'ordre d'apparition}
+    """
+    return get_resource_cache().get_or_create(
+        ('categories', data_version),
+        lambda: {col: list(df[col].unique()) for col in CATEGORICAL_FEATURES}
+    )
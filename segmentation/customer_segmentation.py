@@ -2,10 +2,15 @@ import pandas as pd
 import numpy as np
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
+from sklearn.pipeline import Pipeline
 import plotly.express as px
 import streamlit as st
+from utils.figure_cache import cached_figures
+from utils.resource_cache import get_resource_cache
+from utils.tracing import traced
 
 
+@traced()
 def perform_segmentation(df, features, n_clusters=3):
     """
     Effectue la segmentation client
@@ -18,27 +23,115 @@ def perform_segmentation(df, features, n_clusters=3):
     Returns:
         DataFrame avec la colonne 'Segment' ajoutée
     """
-    scaler = StandardScaler()
-    X = scaler.fit_transform(df[features])
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    df['Segment'] = kmeans.fit_predict(X)
+    df['Segment'] = compute_segments(df, features, n_clusters)
     return df
 
 
-def plot_segments(df, features):
+def compute_segments(df, features, n_clusters=3):
     """
-    Visualise les segments de clients
+    Calcule le segment de chaque client sans modifier le DataFrame
+
+    Args:
+        df: DataFrame contenant les données client
+        features: Liste des caractéristiques à utiliser pour la segmentation
+        n_clusters: Nombre de segments à créer
+
+    Returns:
+        Tableau numpy des segments, aligné sur les lignes de df
+    """
+    return fit_segmenter(df, features, n_clusters)[-1].labels_
+
+
+def fit_segmenter(df, features, n_clusters=3):
+    """
+    Entraîne la segmentation (standardisation + KMeans)
+
+    Args:
+        df: DataFrame contenant les données client
+        features: Liste des caractéristiques à utiliser pour la segmentation
+        n_clusters: Nombre de segments à créer
+
+    Returns:
+        Pipeline entraîné ; predict() affecte un segment à de nouveaux clients
+    """
+    segmenter = Pipeline([
+        ('scaler', StandardScaler()),
+        ('kmeans', KMeans(n_clusters=n_clusters, random_state=42))
+    ])
+    return segmenter.fit(df[features])
+
+
+def get_segmenter(df, data_version, features, n_clusters=3):
+    """
+    Retourne la segmentation entraînée partagée entre sessions
+
+    Returns:
+        Pipeline entraîné (voir fit_segmenter)
+    """
+    return get_resource_cache().get_or_create(
+        ('segmenter', data_version, tuple(features), n_clusters),
+        lambda: fit_segmenter(df, features, n_clusters)
+    )
+
+
+def segmentation_key(data_version, features, n_clusters):
+    """Clé d'une segmentation dans le cache partagé"""
+    return ('segmentation', data_version, tuple(features), n_clusters)
+
+
+def get_segment_profile(df, labels, cache_key, features):
+    """
+    Retourne les moyennes des caractéristiques et du churn par segment,
+    partagées entre sessions
+
+    Args:
+        df: DataFrame contenant les données client
+        labels: Segments des clients
+        cache_key: Clé de la segmentation (segmentation_key)
+        features: Caractéristiques à agréger
+
+    Returns:
+        DataFrame avec une ligne par segment
+    """
+    return get_resource_cache().get_or_create(
+        ('segment_profile',) + tuple(cache_key) + (tuple(features),),
+        lambda: df[features + ['Churn']].groupby(labels).mean().rename_axis('Segment').reset_index()
+    )
+
+
+def get_segment_labels(df, data_version, features, n_clusters=3):
+    """
+    Retourne les segments partagés entre sessions, en les calculant si nécessaire
+
+    Args:
+        df: DataFrame contenant les données client
+        data_version: Version du dataset (get_data_version)
+        features: Liste des caractéristiques à utiliser pour la segmentation
+        n_clusters: Nombre de segments à créer
+
+    Returns:
+        Tableau numpy des segments
+    """
+    return get_resource_cache().get_or_create(
+        segmentation_key(data_version, features, n_clusters),
+        lambda: get_segmenter(df, data_version, features, n_clusters)[-1].labels_
+    )
+
+
+def build_segment_figures(df, features, labels=None):
+    """
+    Construit les graphiques de segmentation
 
     Args:
         df: DataFrame contenant les données segmentées
         features: Caractéristiques utilisées pour la visualisation
+        labels: Segments des clients, si df n'a pas de colonne 'Segment'
 
     Returns:
-        None (affiche des graphiques via Streamlit)
+        Liste de figures Plotly (répartition, projection 2D, caractéristiques, churn)
     """
-    if len(features) < 2:
-        st.warning("Au moins 2 caractéristiques sont nécessaires pour la visualisation")
-        return
+    if labels is not None:
+        df = df[features + ['Churn']].assign(Segment=labels)
 
     # Distribution des segments
     fig1 = px.pie(
@@ -48,7 +141,6 @@ def plot_segments(df, features):
         color='Segment',
         color_discrete_sequence=px.colors.qualitative.Bold
     )
-    st.plotly_chart(fig1)
 
     # Visualisation 2D des segments
     fig2 = px.scatter(
@@ -59,10 +151,8 @@ def plot_segments(df, features):
         title=f"Segmentation des clients ({features[0]} vs {features[1]})",
         color_discrete_sequence=px.colors.qualitative.Bold
     )
-    st.plotly_chart(fig2)
 
     # Analyse par segment
-    st.subheader("Caractéristiques par segment")
     segment_stats = df.groupby('Segment')[features + ['Churn']].mean().reset_index()
 
     fig3 = px.bar(
@@ -74,7 +164,6 @@ def plot_segments(df, features):
         title="Comparaison des caractéristiques par segment",
         color_discrete_sequence=px.colors.qualitative.Bold
     )
-    st.plotly_chart(fig3)
 
     # Taux de churn par segment
     fig4 = px.bar(
@@ -87,4 +176,36 @@ def plot_segments(df, features):
         color_discrete_sequence=px.colors.qualitative.Bold
     )
     fig4.update_traces(texttemplate='%{y:.1%}')
-    st.plotly_chart(fig4)
\ No newline at end of file
+    return [fig1, fig2, fig3, fig4]
+
+
+@traced()
+def plot_segments(df, features, cache_key=None, labels=None):
+    """
+    Visualise les segments de clients
+
+    Args:
+        df: DataFrame contenant les données segmentées
+        features: Caractéristiques utilisées pour la visualisation
+        cache_key: Clé identifiant les données et la segmentation ; si fournie,
+            les graphiques sont mis en cache
+        labels: Segments des clients, si df n'a pas de colonne 'Segment'
+
+    Returns:
+        None (affiche des graphiques via Streamlit)
+    """
+    if len(features) < 2:
+        st.warning("Au moins 2 caractéristiques sont nécessaires pour la visualisation")
+        return
+
+    if cache_key is None:
+        figures = build_segment_figures(df, features, labels)
+    else:
+        figures = cached_figures(tuple(cache_key) + (tuple(features),), build_segment_figures,
+                                 df, features, labels)
+
+    st.plotly_chart(figures[0])
+    st.plotly_chart(figures[1])
+    st.subheader("Caractéristiques par segment")
+    st.plotly_chart(figures[2])
+    st.plotly_chart(figures[3])
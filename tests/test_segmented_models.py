@@ -0,0 +1,74 @@
+"""
+Affectation aux segments d'un modèle par segment lors d'une prédiction à horizon :
+le segment d'un client est déterminé par ses variables actuelles, non projetées.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from prediction.model_prediction import predict_future_churn
+from prediction.prediction_store import PredictionStore
+from prediction.segmented_models import SegmentedChurnModel
+
+FEATURES = ['Tenure (Months)', 'Monthly Charges', 'Total Charges']
+# Limite d'ancienneté entre les deux segments (mois)
+TENURE_BOUNDARY = 12
+
+
+class TenureSegmenter:
+    """Segment 0 : ancienneté inférieure à TENURE_BOUNDARY, segment 1 sinon"""
+
+    def predict(self, X):
+        return (X['Tenure (Months)'].to_numpy() >= TENURE_BOUNDARY).astype(int)
+
+
+class ConstantPipeline:
+    """Pipeline renvoyant la même probabilité pour tous les clients"""
+
+    def __init__(self, proba):
+        self.proba = proba
+        self.feature_names_in_ = np.array(FEATURES, dtype=object)
+        self.classes_ = np.array([0, 1])
+
+    def predict_proba(self, X):
+        return np.column_stack([np.full(len(X), 1 - self.proba), np.full(len(X), self.proba)])
+
+
+def segmented_model():
+    return SegmentedChurnModel(TenureSegmenter(), ['Tenure (Months)'],
+                               {0: ConstantPipeline(0.8), 1: ConstantPipeline(0.2)})
+
+
+def customers():
+    # Le premier client franchit la limite d'ancienneté dès 2 mois de projection
+    return pd.DataFrame({
+        'CustomerID': ['CUST_000001', 'CUST_000002'],
+        'Tenure (Months)': [TENURE_BOUNDARY - 2, 30],
+        'Monthly Charges': [50.0, 70.0],
+        'Total Charges': [500.0, 2100.0],
+    })
+
+
+@pytest.mark.parametrize('use_store', [False, True])
+def test_customer_crossing_boundary_keeps_current_segment(use_store):
+    store = PredictionStore() if use_store else None
+    predictions = predict_future_churn(segmented_model(), customers(), months=3, store=store)
+
+    assert predictions['Tenure (Months)'].tolist() == [TENURE_BOUNDARY + 1, 33]
+    assert predictions['Future_Churn_Probability'].tolist() == [0.8, 0.2]
+
+
+def test_segment_does_not_depend_on_horizon():
+    model = segmented_model()
+    for months in (1, 3, 6, 12):
+        predictions = predict_future_churn(model, customers(), months=months)
+        assert predictions['Future_Churn_Probability'].tolist() == [0.8, 0.2]
+
+
+def test_parts_route_on_current_features():
+    model = segmented_model()
+    current = customers()
+    projected = current.assign(**{'Tenure (Months)': current['Tenure (Months)'] + 3})
+
+    assert [segment for segment, _, _ in model.parts(projected)] == [1]
+    parts = model.parts(projected, route=current)
+    assert [(segment, rows.tolist()) for segment, _, rows in parts] == [(0, [0]), (1, [1])]
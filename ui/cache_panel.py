@@ -0,0 +1,22 @@
+import pandas as pd
+import streamlit as st
+from utils.resource_cache import get_resource_cache
+
+
+def render_cache_stats():
+    """Affiche dans la barre latérale l'état du cache partagé entre sessions"""
+    stats = get_resource_cache().stats()
+    with st.sidebar.expander("Cache partagé"):
+        st.write(f"Mémoire utilisée: {stats['used_mb']:.1f} / {stats['budget_mb']:.0f} Mo")
+        st.write(f"Entrées: {stats['entries']} — succès: {stats['hits']}, "
+                 f"échecs: {stats['misses']}, évictions: {stats['evictions']}")
+        if stats['items']:
+            st.dataframe(
+                pd.DataFrame(stats['items']).rename(columns={
+                    'key': 'Clé',
+                    'size_mb': 'Taille (Mo)',
+                    'refcount': 'Sessions',
+                    'hits': 'Succès',
+                }),
+                hide_index=True
+            )
@@ -1,42 +1,62 @@
 import streamlit as st
-from data.data_loader import load_data
-from export.firebase_export import export_to_firestore
+from data.data_loader import get_data_version, load_data
+from export.sinks import DEFAULT_EXPORT_DIR, EXPORT_SINKS, FirestoreSink, export_job, get_sink
+from prediction.model_registry import get_session_predictions
+from segmentation.customer_segmentation import get_segment_labels
+from ui.job_status import forget_job, submit_job, track_job
 from datetime import datetime
 
 
 def render_export():
-    """Affiche la page d'export vers Firebase"""
-    st.header("Export vers Firebase")
+    """Affiche la page d'export des données"""
+    st.header("Export des données")
 
-    # Chargement des données
-    if 'df' not in st.session_state:
-        st.session_state.df = load_data()
+    # Chargement des données (partagées entre sessions, à ne pas modifier)
+    df = load_data()
 
-    if st.session_state.df is None:
+    if df is None:
         st.error("Impossible de charger les données. Vérifiez le chemin du fichier CSV.")
         return
 
-    df = st.session_state.df
+    data_version = get_data_version()
 
     # Interface utilisateur
     st.write("""
     Cette page vous permet d'exporter vos données et prédictions vers Firebase
-    pour les rendre accessibles à d'autres applications ou services.
+    ou vers des fichiers locaux (Parquet, CSV, SQLite) pour les rendre accessibles
+    à d'autres applications ou services.
     """)
 
-    st.info("Seuls les 1000 premiers clients seront exportés par défaut.")
-
-    # Options d'export
-    export_limit = st.slider(
-        "Nombre de clients à exporter",
-        min_value=10,
-        max_value=min(10000, len(df)),
-        value=min(1000, len(df))
-    )
-
+    sink_label = st.selectbox("Destination de l'export", list(EXPORT_SINKS))
+    sink_options = {}
+    if EXPORT_SINKS[sink_label] is not FirestoreSink:
+        sink_options['output_dir'] = st.text_input("Dossier de sortie", DEFAULT_EXPORT_DIR)
+    sink = get_sink(sink_label, **sink_options)
+
+    # Options d'export : tout le dataset pour les fichiers locaux, plafond pour Firestore
+    if sink.max_rows is None:
+        max_rows, default_rows = len(df), len(df)
+    else:
+        max_rows, default_rows = min(sink.max_rows, len(df)), min(1000, len(df))
+        st.info(f"Seuls les {default_rows} premiers clients seront exportés par défaut "
+                f"(au plus {max_rows} vers {sink.label}).")
+    # Bornes ramenées à la taille du dataset ; pas de choix possible avec un seul nombre de clients
+    min_rows = min(10, max_rows)
+    if min_rows < max_rows:
+        export_limit = st.slider(
+            "Nombre de clients à exporter",
+            min_value=min_rows,
+            max_value=max_rows,
+            value=max(default_rows, min_rows),
+            key=f'export_limit:{sink_label}'
+        )
+    else:
+        export_limit = max_rows
+
+    session_predictions = get_session_predictions()
     export_predictions = st.checkbox(
         "Inclure les prédictions",
-        value=True if 'predictions' in st.session_state and st.session_state.predictions is not None else False
+        value=session_predictions is not None
     )
 
     export_models = st.checkbox(
@@ -44,60 +64,67 @@ def render_export():
         value=True if 'model_metrics' in st.session_state and st.session_state.model_metrics else False
     )
 
-    # Vérification de la configuration Firebase
-    import os
-    firebase_config_exists = os.path.exists("serviceAccountKey.json")
+    # Vérification de la configuration de la destination
+    unavailable_reason = sink.check_available()
 
-    if not firebase_config_exists:
-        st.error("""
-        Le fichier de configuration Firebase (serviceAccountKey.json) est introuvable.
-        Veuillez placer ce fichier à la racine du projet pour activer l'export.
-        """)
+    if unavailable_reason:
+        st.error(unavailable_reason)
 
     # Bouton d'export
-    export_disabled = not firebase_config_exists
+    export_disabled = unavailable_reason is not None
 
     if st.button("Exporter les données", disabled=export_disabled):
-        with st.spinner("Export en cours..."):
-            # Préparation des résultats de modèle
-            model_results = None
-            if export_models and 'model_metrics' in st.session_state and st.session_state.model_metrics:
-                model_results = [
-                    {
-                        'Model': key,
-                        'Accuracy': value['Accuracy'],
-                        'Precision': value['Precision'],
-                        'Recall': value['Recall'],
-                        'F1': value['F1'],
-                        'AUCROC': value['AUCROC'],
-                        'Timestamp': datetime.now().isoformat()
-                    }
-                    for key, value in st.session_state.model_metrics.items()
-                ]
-
-            # Préparation des prédictions
-            predictions = None
-            if export_predictions and 'predictions' in st.session_state and st.session_state.predictions is not None:
-                predictions = st.session_state.predictions
-
-            # Export
-            success = export_to_firestore(
-                df,
-                model_results if export_models else None,
-                predictions if export_predictions else None,
-                limit=export_limit
-            )
-
-            if success:
-                st.success(f"Export réussi de {export_limit} clients vers Firebase!")
-                st.balloons()
-            else:
-                st.error("Échec de l'export. Vérifiez la configuration Firebase.")
+        # Préparation des résultats de modèle
+        model_results = None
+        if export_models and 'model_metrics' in st.session_state and st.session_state.model_metrics:
+            model_results = [
+                {
+                    'Model': key,
+                    'Accuracy': value['Accuracy'],
+                    'Precision': value['Precision'],
+                    'Recall': value['Recall'],
+                    'F1': value['F1'],
+                    'AUCROC': value['AUCROC'],
+                    'Timestamp': datetime.now().isoformat()
+                }
+                for key, value in st.session_state.model_metrics.items()
+            ]
+
+        # Préparation des prédictions
+        predictions = None
+        if export_predictions and session_predictions is not None:
+            predictions = session_predictions
+
+        # Ajout des segments si une segmentation a été effectuée dans la session
+        export_df = df.head(export_limit)
+        segmentation = st.session_state.get('segmentation')
+        if segmentation is not None:
+            labels = get_segment_labels(df, data_version, segmentation['features'],
+                                        segmentation['n_clusters'])
+            export_df = export_df.assign(Segment=labels[:export_limit])
+
+        # Export en arrière-plan ; une demande identique en cours n'est pas relancée
+        job_key = (
+            sink_label, sink_options.get('output_dir'), data_version, export_limit,
+            st.session_state.get('predictions_key') if predictions is not None else None,
+            model_results is not None,
+            None if segmentation is None else (tuple(segmentation['features']), segmentation['n_clusters'])
+        )
+        submit_job('export', 'export', job_key, export_job, sink, export_df, predictions,
+                   export_limit, model_results, label=f"Export vers {sink_label}")
+
+    job = track_job('export')
+    if job is not None:
+        forget_job('export')
+        for warning in job.result['warnings']:
+            st.warning(warning)
+        st.success(f"Export réussi de {job.result['exported']} clients vers {job.key[1]}!")
+        st.balloons()
 
     # Informations sur l'utilisation des données exportées
     st.subheader("Utilisation des données exportées")
     st.write("""
-    Les données exportées vers Firebase peuvent être utilisées pour:
+    Les données exportées peuvent être utilisées pour:
 
     1. **Visualisation dans des tableaux de bord externes**
     2. **Intégration avec des applications mobiles**
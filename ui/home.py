@@ -1,64 +1,82 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from data.data_loader import load_data
+from data.data_loader import EXPECTED_COLUMNS, get_query_store
+
+ALL_REGIONS = "Toutes les régions"
+# Nombre de bins des histogrammes, comptés par le moteur de requêtes
+HISTOGRAM_BINS = 30
+CHURN_COLORS = {0: '#3366CC', 1: '#CC3366'}
+
+
+def _histogram_figure(store, column, title, where):
+    """Histogramme superposé par valeur de Churn, à partir des comptes par bin du moteur"""
+    counts = store.histogram(column, bins=HISTOGRAM_BINS, group_by=['Churn'], where=where)
+    counts = counts.assign(center=(counts['bin_start'] + counts['bin_end']) / 2,
+                           Churn=counts['Churn'].astype(str))
+    fig = px.bar(counts, x='center', y='count', color='Churn', barmode='overlay', title=title,
+                 labels={'center': column, 'count': "Nombre de clients"}, opacity=0.75,
+                 color_discrete_map={str(value): color for value, color in CHURN_COLORS.items()})
+    fig.update_layout(bargap=0)
+    if not counts.empty:
+        fig.update_traces(width=float((counts['bin_end'] - counts['bin_start']).iloc[0]))
+    return fig
 
 
 def render_home():
     """Affiche la page d'aperçu des données"""
     st.header("Aperçu des données")
 
-    # Chargement des données
-    if 'df' not in st.session_state:
-        st.session_state.df = load_data()
+    # Moteur de requêtes partagé entre sessions : filtres, projections et
+    # agrégations sont exécutés par le moteur, seul le résultat arrive dans pandas
+    store = get_query_store()
 
-    if st.session_state.df is None:
+    if store is None:
         st.error("Impossible de charger les données. Vérifiez le chemin du fichier CSV.")
         return
 
-    df = st.session_state.df
+    # Filtre optionnel par région
+    region = st.selectbox("Région", [ALL_REGIONS] + store.distinct('Location'))
+    where = None if region == ALL_REGIONS else {'Location': region}
+
+    summary = store.aggregate({
+        'clients': ('CustomerID', 'count'),
+        'unique_ids': ('CustomerID', 'nunique'),
+        'churn_rate': ('Churn', 'mean'),
+        'avg_value': ('Total Charges', 'mean'),
+    }, where=where).iloc[0]
 
     # Affichage des informations de base
-    st.write(f"Nombre total de clients: {len(df)}")
+    st.write(f"Nombre total de clients: {int(summary['clients'])}")
 
     col1, col2 = st.columns(2)
     with col1:
-        st.metric("Taux de Churn Global", f"{df['Churn'].mean():.2%}")
+        st.metric("Taux de Churn Global", f"{summary['churn_rate']:.2%}")
     with col2:
-        st.metric("Valeur Client Moyenne", f"{df['Total Charges'].mean():.2f} TND")
+        st.metric("Valeur Client Moyenne", f"{summary['avg_value']:.2f} TND")
 
     # Aperçu des données
     with st.expander("Aperçu des données"):
-        st.dataframe(df.head())
+        st.dataframe(store.select(where=where, limit=5))
 
-    # Statistiques descriptives
+    # Statistiques descriptives (calculées une fois par version du dataset et région)
     with st.expander("Statistiques descriptives"):
-        st.write(df.describe())
+        st.write(store.describe(EXPECTED_COLUMNS['numeric'] + ['CLV'], where=where))
 
-    # Distribution des variables importantes
+    # Distribution des variables importantes : seuls les comptes par bin sont lus
     st.subheader("Distribution des variables clés")
     col1, col2 = st.columns(2)
 
     with col1:
         # Distribution de l'ancienneté
-        fig1 = px.histogram(df, x='Tenure (Months)',
-                            title="Distribution de l'ancienneté",
-                            color='Churn',
-                            barmode='overlay',
-                            color_discrete_sequence=['#3366CC', '#CC3366'])
-        st.plotly_chart(fig1)
+        st.plotly_chart(_histogram_figure(store, 'Tenure (Months)', "Distribution de l'ancienneté", where))
 
     with col2:
         # Distribution des charges mensuelles
-        fig2 = px.histogram(df, x='Monthly Charges',
-                            title="Distribution des charges mensuelles",
-                            color='Churn',
-                            barmode='overlay',
-                            color_discrete_sequence=['#3366CC', '#CC3366'])
-        st.plotly_chart(fig2)
+        st.plotly_chart(_histogram_figure(store, 'Monthly Charges', "Distribution des charges mensuelles", where))
 
     # Répartition du churn par type de contrat
-    fig3 = px.bar(df.groupby('Contract Type')['Churn'].mean().reset_index(),
+    fig3 = px.bar(store.aggregate({'Churn': ('Churn', 'mean')}, group_by=['Contract Type'], where=where),
                   x='Contract Type',
                   y='Churn',
                   title="Taux de churn par type de contrat",
@@ -66,12 +84,15 @@ def render_home():
     fig3.update_traces(texttemplate='%{y:.1%}', textposition='outside')
     st.plotly_chart(fig3)
 
-    # Satisfaction vs. Churn
-    fig4 = px.box(df, x='Satisfaction Score', y='Churn',
+    # Satisfaction vs. Churn (taux de churn par score, agrégé par le moteur)
+    fig4 = px.bar(store.aggregate({'Churn': ('Churn', 'mean')}, group_by=['Satisfaction Score'], where=where),
+                  x='Satisfaction Score',
+                  y='Churn',
                   title="Relation entre satisfaction et churn")
+    fig4.update_traces(texttemplate='%{y:.1%}', textposition='outside')
     st.plotly_chart(fig4)
 
     # Vérification des CustomerID
     with st.expander("Vérification des CustomerID"):
-        st.write("Exemples d'ID clients:", df['CustomerID'].head(10).tolist())
-        st.write("Nombre de doublons:", df['CustomerID'].duplicated().sum())
\ No newline at end of file
+        st.write("Exemples d'ID clients:", store.select(['CustomerID'], where=where, limit=10)['CustomerID'].tolist())
+        st.write("Nombre de doublons:", int(summary['clients'] - summary['unique_ids']))
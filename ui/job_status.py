@@ -0,0 +1,79 @@
+import uuid
+import streamlit as st
+from utils.jobs import CANCELLED, FAILED, get_job_manager
+
+
+def _session_token():
+    """Identifiant de la session auprès du gestionnaire de tâches"""
+    if 'job_subscriber' not in st.session_state:
+        st.session_state.job_subscriber = uuid.uuid4().hex
+    return st.session_state.job_subscriber
+
+
+def submit_job(slot, kind, key, fn, *args, label=None, **kwargs):
+    """
+    Soumet une tâche d'arrière-plan et la rattache à la session ; une tâche
+    identique déjà lancée par une autre session est partagée
+
+    Args:
+        slot: Nom sous lequel la session suit la tâche (ex: 'train:RandomForest')
+        kind, key, fn, args, label, kwargs: Voir JobManager.submit
+
+    Returns:
+        Job
+    """
+    job = get_job_manager().submit(kind, key, fn, *args, label=label, subscriber=_session_token(), **kwargs)
+    st.session_state.setdefault('jobs', {})[slot] = job.id
+    return job
+
+
+def get_session_job(slot):
+    """Retourne la tâche suivie par la session sous ce nom, ou None"""
+    job_id = st.session_state.get('jobs', {}).get(slot)
+    return None if job_id is None else get_job_manager().get(job_id)
+
+
+def forget_job(slot):
+    """Arrête le suivi d'une tâche par la session"""
+    st.session_state.get('jobs', {}).pop(slot, None)
+
+
+@st.fragment(run_every=1.0)
+def _job_progress(job_id, slot):
+    job = get_job_manager().get(job_id)
+    if job is None or job.is_finished:
+        # Rerun complet pour afficher le résultat
+        st.rerun()
+    st.progress(job.progress, text=f"{job.label} — {job.message}")
+    if st.button("Annuler", key=f"cancel_job_{job_id}", disabled=job.cancel_requested):
+        # La tâche n'est annulée que si aucune autre session ne la suit
+        if not get_job_manager().unsubscribe(job_id, _session_token()):
+            forget_job(slot)
+            st.rerun()
+
+
+def track_job(slot):
+    """
+    Affiche l'avancement de la tâche suivie sous ce nom. L'affichage est
+    rafraîchi sans bloquer la page ; un rerun complet est déclenché à la fin.
+
+    Returns:
+        La tâche si elle est terminée avec succès, sinon None
+    """
+    job = get_session_job(slot)
+    if job is None:
+        return None
+
+    if not job.is_finished:
+        _job_progress(job.id, slot)
+        return None
+
+    if job.status == FAILED:
+        st.error(f"{job.label}: {job.message}")
+        forget_job(slot)
+        return None
+    if job.status == CANCELLED:
+        st.warning(f"{job.label}: tâche annulée")
+        forget_job(slot)
+        return None
+    return job
@@ -0,0 +1,24 @@
+import importlib
+
+# Libellé du menu -> (module, fonction de rendu, arguments)
+# Le module d'une page, et donc ses dépendances lourdes (plotly, sklearn,
+# firebase_admin...), n'est importé qu'à la première sélection de la page.
+PAGES = {
+    "Aperçu": ("ui.home", "render_home", {}),
+    "Segmentation": ("ui.segmentation_view", "render_segmentation", {}),
+    "Prédiction": ("ui.prediction_view", "render_prediction", {}),
+    "Évaluation des Modèles": ("ui.prediction_view", "render_prediction", {'evaluation_only': True}),
+    "Export des données": ("ui.export_view", "render_export", {}),
+}
+
+
+def render_page(label):
+    """
+    Importe le module de la page si nécessaire puis l'affiche
+
+    Args:
+        label: Libellé de la page dans le menu (clé de PAGES)
+    """
+    module_name, function_name, kwargs = PAGES[label]
+    module = importlib.import_module(module_name)
+    getattr(module, function_name)(**kwargs)
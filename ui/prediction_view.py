@@ -1,11 +1,76 @@
 import streamlit as st
 import pandas as pd
-from data.data_loader import load_data
-from preprocessing.data_cleaning import prepare_data
-from prediction.model_training import train_model
-from prediction.model_prediction import predict_future_churn, predict_for_individual, visualize_predictions
+import plotly.express as px
+from data.data_loader import get_data_version, load_data
+from preprocessing.data_cleaning import get_category_values, get_prepared_data
+from prediction.model_registry import (explain_client, get_model, get_prediction_contributions,
+                                       get_session_predictions, predict_job, train_job, trained_variants,
+                                       use_predictions)
+from prediction.model_training import model_family
+from prediction.model_prediction import predict_for_individual, project_features, visualize_predictions
+from prediction.model_tuning import TUNED_VARIANT, tune_job
+from prediction.segmented_models import (DEFAULT_N_SEGMENTS, DEFAULT_SEGMENT_FEATURES, is_segmented_variant,
+                                         segmented_job, segmented_variant)
+from prediction.scenarios import scenario_grid, simulate_scenarios, summarize_scenarios
+from ui.job_status import forget_job, get_session_job, submit_job, track_job
+from utils.jobs import DONE
 from utils.helpers import display_model_evaluation
 
+MODEL_TYPES = ['RandomForest', 'GradientBoosting', 'DecisionTree']
+# Modes d'entraînement proposés sur la page d'évaluation
+TRAINING_MODES = ["Standard", "Optimisation des hyperparamètres (successive halving)", "Un modèle par segment"]
+# Remises proposées sur les charges mensuelles dans le simulateur d'offres (%)
+DISCOUNT_OPTIONS = [5, 10, 15, 20, 30]
+
+
+def _submit_training(data_version, X, y, preprocessors, model_type):
+    """Soumet l'entraînement du modèle en arrière-plan (dédupliqué entre sessions)"""
+    return submit_job(f'train:{model_type}', 'train', (data_version, model_type, 'default'),
+                      train_job, data_version, X, y, preprocessors[model_type], model_type,
+                      label=f"Entraînement {model_type}")
+
+
+def _submit_tuning(data_version, X, y, preprocessors, model_type):
+    """Soumet la recherche d'hyperparamètres du modèle en arrière-plan"""
+    return submit_job(f'tune:{model_type}', 'tune', (data_version, model_type),
+                      tune_job, data_version, X, y, preprocessors[model_type], model_type,
+                      label=f"Optimisation {model_type}")
+
+
+def _submit_segmented(data_version, df, X, y, preprocessors, model_type, features, n_clusters):
+    """Soumet l'entraînement d'un modèle par segment en arrière-plan"""
+    return submit_job(f'segment:{model_type}', 'segment', (data_version, model_type, tuple(features), n_clusters),
+                      segmented_job, data_version, df, X, y, preprocessors[model_type], model_type,
+                      features, n_clusters, label=f"Modèles par segment {model_type}")
+
+
+def _metrics_label(model_type, variant='default'):
+    """Nom sous lequel les métriques d'un modèle sont affichées"""
+    if variant == 'default':
+        return model_type
+    if is_segmented_variant(variant):
+        return f"{model_type} (par segment)"
+    return f"{model_type} (optimisé)"
+
+
+def _segmentation_variant():
+    """Variante par segment correspondant à la segmentation de la session (ou à la segmentation par défaut)"""
+    segmentation = st.session_state.get('segmentation') or {}
+    return segmented_variant(list(segmentation.get('features') or DEFAULT_SEGMENT_FEATURES),
+                             segmentation.get('n_clusters', DEFAULT_N_SEGMENTS))
+
+
+def _collect_training(slot):
+    """Suit l'entraînement en cours et récupère les métriques du modèle une fois terminé"""
+    job = track_job(slot)
+    if job is None:
+        return
+    _, data_version, job_model_type, variant = job.result
+    entry = get_model(data_version, job_model_type, variant)
+    if entry is not None:
+        st.session_state.model_metrics[_metrics_label(job_model_type, variant)] = entry[1]
+    forget_job(slot)
+
 
 def render_prediction(evaluation_only=False):
     """
@@ -19,26 +84,25 @@ def render_prediction(evaluation_only=False):
     else:
         st.header("Prédiction de Churn")
 
-    # Chargement des données
-    if 'df' not in st.session_state:
-        st.session_state.df = load_data()
+    # Chargement des données (partagées entre sessions, à ne pas modifier)
+    df = load_data()
 
-    if st.session_state.df is None:
+    if df is None:
         st.error("Impossible de charger les données. Vérifiez le chemin du fichier CSV.")
         return
 
-    df = st.session_state.df
+    data_version = get_data_version()
 
-    # Préparation des données
-    X, y, preprocessor, numeric_features, categorical_features = prepare_data(df)
+    # Préparation des données (calculée une fois par version du dataset)
+    X, y, _, numeric_features, categorical_features = get_prepared_data(df, data_version)
+    # Préprocesseur adapté à la famille de chaque modèle (codes ordinaux pour les arbres)
+    preprocessors = {model_type: get_prepared_data(df, data_version, model_family(model_type))[2]
+                     for model_type in MODEL_TYPES}
 
     # Initialisation session state pour les modèles
-    if 'trained_models' not in st.session_state:
-        st.session_state.trained_models = {}
+    # (les modèles et prédictions sont partagés entre sessions, seules les métriques sont conservées ici)
     if 'model_metrics' not in st.session_state:
         st.session_state.model_metrics = {}
-    if 'predictions' not in st.session_state:
-        st.session_state.predictions = None
 
     if evaluation_only:
         # Interface d'évaluation des modèles
@@ -54,23 +118,44 @@ def render_prediction(evaluation_only=False):
         with col2:
             evaluate_gb = st.checkbox("Évaluer Gradient Boosting", True)
         evaluate_dt = st.checkbox("Évaluer Arbre de Décision", True)
+        mode = st.radio("Mode d'entraînement", TRAINING_MODES, horizontal=True,
+                        help="Optimisation : recherche aléatoire des hyperparamètres, les candidats sont "
+                             "évalués en parallèle sur des échantillons croissants et les moins bons sont "
+                             "éliminés à chaque tour. Par segment : un modèle est entraîné pour chaque "
+                             "segment de clients, en parallèle, et chaque client est évalué par le "
+                             "modèle de son segment.")
+        tune = mode == TRAINING_MODES[1]
+        segmented = mode == TRAINING_MODES[2]
+        # Segmentation de la page Segmentation si elle a été effectuée, sinon segmentation par défaut
+        segmentation = st.session_state.get('segmentation') or {}
+        segment_features = list(segmentation.get('features') or DEFAULT_SEGMENT_FEATURES)
+        n_clusters = segmentation.get('n_clusters', DEFAULT_N_SEGMENTS)
+        if segmented:
+            st.caption(f"{n_clusters} segments sur: {', '.join(segment_features)}")
 
         if st.button("Lancer l'évaluation des modèles"):
-            with st.spinner("Évaluation en cours..."):
-                if evaluate_rf and 'RandomForest' not in st.session_state.model_metrics:
-                    pipeline, metrics = train_model(X, y, preprocessor, 'RandomForest')
-                    st.session_state.trained_models['RandomForest'] = pipeline
-                    st.session_state.model_metrics['RandomForest'] = metrics
-
-                if evaluate_gb and 'GradientBoosting' not in st.session_state.model_metrics:
-                    pipeline, metrics = train_model(X, y, preprocessor, 'GradientBoosting')
-                    st.session_state.trained_models['GradientBoosting'] = pipeline
-                    st.session_state.model_metrics['GradientBoosting'] = metrics
-
-                if evaluate_dt and 'DecisionTree' not in st.session_state.model_metrics:
-                    pipeline, metrics = train_model(X, y, preprocessor, 'DecisionTree')
-                    st.session_state.trained_models['DecisionTree'] = pipeline
-                    st.session_state.model_metrics['DecisionTree'] = metrics
+            if segmented:
+                variant = segmented_variant(segment_features, n_clusters)
+            else:
+                variant = TUNED_VARIANT if tune else 'default'
+            for model_type, selected in zip(MODEL_TYPES, [evaluate_rf, evaluate_gb, evaluate_dt]):
+                if selected and _metrics_label(model_type, variant) not in st.session_state.model_metrics:
+                    entry = get_model(data_version, model_type, variant)
+                    if entry is not None:
+                        st.session_state.model_metrics[_metrics_label(model_type, variant)] = entry[1]
+                    elif segmented:
+                        _submit_segmented(data_version, df, X, y, preprocessors, model_type,
+                                          segment_features, n_clusters)
+                    elif tune:
+                        _submit_tuning(data_version, X, y, preprocessors, model_type)
+                    else:
+                        _submit_training(data_version, X, y, preprocessors, model_type)
+
+        # Suivi des entraînements et optimisations en arrière-plan
+        for model_type in MODEL_TYPES:
+            _collect_training(f'train:{model_type}')
+            _collect_training(f'tune:{model_type}')
+            _collect_training(f'segment:{model_type}')
 
         # Affichage des résultats
         if st.session_state.model_metrics:
@@ -89,132 +174,264 @@ def render_prediction(evaluation_only=False):
         prediction_type = st.radio("Type de prédiction",
                                    ["Prédire pour un seul client", "Prédire pour un groupe de clients"])
 
-        model_type = st.selectbox("Modèle à utiliser",
-                                  ['RandomForest', 'GradientBoosting', 'DecisionTree'])
-
-        months = st.slider("Période de prédiction (mois)", 1, 12, 3)
-
         if prediction_type == "Prédire pour un seul client":
-            # Interface pour prédiction individuelle
-            st.subheader("Saisie des caractéristiques du client")
-
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                age = st.number_input("Age", min_value=18, max_value=100, value=35)
-                tenure = st.number_input("Ancienneté (mois)", min_value=0, max_value=120, value=12)
-                monthly_charges = st.number_input("Charges mensuelles", min_value=0, value=50)
-            with col2:
-                total_charges = st.number_input("Charges totales", min_value=0, value=600)
-                data_usage = st.number_input("Usage données (GB)", min_value=0, value=10)
-                call_usage = st.number_input("Usage appel (minutes)", min_value=0, value=300)
-            with col3:
-                support_calls = st.number_input("Appels support", min_value=0, value=1)
-                satisfaction = st.number_input("Score satisfaction", min_value=1, max_value=5, value=3)
-                location = st.selectbox("Localisation", df['Location'].unique())
-                contract_type = st.selectbox("Type de contrat", df['Contract Type'].unique())
-                payment_method = st.selectbox("Méthode paiement", df['Payment Method'].unique())
-
-            if st.button("Prédire le churn pour ce client"):
-                # Création d'un dataframe avec les données du client
-                client_data = pd.DataFrame([[
-                    age, tenure, monthly_charges, total_charges,
-                    data_usage, call_usage, support_calls, satisfaction,
-                    location, contract_type, payment_method
-                ]], columns=numeric_features + categorical_features)
-
-                # Entraînement du modèle s'il n'existe pas déjà
-                if model_type not in st.session_state.trained_models:
-                    with st.spinner(f"Entraînement du modèle {model_type} en cours..."):
-                        pipeline, metrics = train_model(X, y, preprocessor, model_type)
-                        st.session_state.trained_models[model_type] = pipeline
-                        st.session_state.model_metrics[model_type] = metrics
-                else:
-                    pipeline = st.session_state.trained_models[model_type]
-
-                # Prédiction
-                client_data = predict_for_individual(pipeline, client_data)
-
-                # Affichage résultat
-                st.subheader("Résultat de la prédiction")
-                proba = client_data['Future_Churn_Probability'].iloc[0]
-                prediction = "OUI" if client_data['Predicted_Churn'].iloc[0] else "NON"
-
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("Probabilité de churn", f"{proba:.2%}")
-                with col2:
-                    st.metric("Prédiction de churn", prediction)
-
-                # Recommandations basées sur la prédiction
-                st.subheader("Recommandations")
-                if proba > 0.7:
-                    st.error("Client à très haut risque de churn!")
-                    st.write("""
-                    Actions recommandées:
-                    - Contacter immédiatement le client
-                    - Offrir une réduction ou un avantage significatif
-                    - Résoudre les problèmes potentiels en priorité
-                    """)
-                elif proba > 0.4:
-                    st.warning("Client à risque modéré de churn")
-                    st.write("""
-                    Actions recommandées:
-                    - Proposer une offre de fidélisation
-                    - Enquête de satisfaction
-                    - Améliorer les services utilisés fréquemment
-                    """)
-                else:
-                    st.success("Client à faible risque de churn")
-                    st.write("""
-                    Actions recommandées:
-                    - Maintenir la qualité de service
-                    - Proposer des services complémentaires
-                    - Programme de parrainage
-                    """)
+            # Suivi de l'entraînement demandé pour une prédiction individuelle
+            client_request = st.session_state.get('client_request')
+            if (client_request is not None and client_request['variant'] == 'default'
+                    and get_model(data_version, client_request['model_type']) is None):
+                request_model = client_request['model_type']
+                job = get_session_job(f'train:{request_model}')
+                if job is None:
+                    _submit_training(data_version, X, y, preprocessors, request_model)
+                elif job.is_finished and job.status != DONE:
+                    st.session_state.pop('client_request')
+                _collect_training(f'train:{request_model}')
+
+            _individual_prediction(data_version, X, y, preprocessors, numeric_features, categorical_features,
+                                   get_category_values(df, data_version))
 
         else:  # Prédiction pour groupe de clients
             st.subheader("Prédiction pour un groupe de clients")
-            n_clients = st.slider("Nombre de clients à prédire", 1, min(10000, len(df)), min(1000, len(df)))
-
-            if st.button("Lancer la prédiction pour le groupe"):
-                # Entraînement du modèle s'il n'existe pas déjà
-                if model_type not in st.session_state.trained_models:
-                    with st.spinner(f"Entraînement du modèle {model_type} en cours..."):
-                        pipeline, metrics = train_model(X, y, preprocessor, model_type)
-                        st.session_state.trained_models[model_type] = pipeline
-                        st.session_state.model_metrics[model_type] = metrics
-                else:
-                    pipeline = st.session_state.trained_models[model_type]
-
-                # Prédiction
-                with st.spinner("Prédiction en cours..."):
-                    st.session_state.predictions = predict_future_churn(
-                        pipeline,
-                        df.head(n_clients),
-                        months
-                    )
-                    st.success(f"Prédiction terminée pour {n_clients} clients sur {months} mois")
-
-            if st.session_state.predictions is not None:
-                st.write("Résultats de prédiction:")
-                st.dataframe(st.session_state.predictions[[
-                    'CustomerID', 'Age', 'Tenure (Months)', 'Monthly Charges',
-                    'Future_Churn_Probability', 'Predicted_Churn'
-                ]].head())
-
-                # Visualisation
-                visualize_predictions(st.session_state.predictions)
-
-                # Résumé des prédictions
-                predicted_churn_count = st.session_state.predictions['Predicted_Churn'].sum()
-                total_clients = len(st.session_state.predictions)
-                predicted_churn_rate = predicted_churn_count / total_clients
-
-                st.subheader("Résumé des prédictions")
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Clients analysés", total_clients)
-                with col2:
-                    st.metric("Clients à risque de churn", predicted_churn_count)
-                with col3:
-                    st.metric("Taux de churn prédit", f"{predicted_churn_rate:.2%}")
\ No newline at end of file
+            _group_prediction_form(df, data_version, X, y, preprocessors)
+
+            job = track_job('predict')
+            if job is not None:
+                _, job_version, job_model_type, job_variant, job_n_clients, job_months = job.key
+                use_predictions(job.result)
+                entry = get_model(job_version, job_model_type, job_variant)
+                if entry is not None:
+                    st.session_state.model_metrics[_metrics_label(job_model_type, job_variant)] = entry[1]
+                forget_job('predict')
+                st.success(f"Prédiction terminée pour {job_n_clients} clients sur {job_months} mois")
+
+            _group_prediction_results()
+
+
+def _model_controls(data_version):
+    """
+    Choix du modèle, de sa variante et de l'horizon, partagés entre les deux modes de prédiction.
+    Le modèle standard est entraîné à la demande ; les variantes optimisée et par segment
+    sont proposées une fois entraînées depuis la page d'évaluation.
+    """
+    model_type = st.selectbox("Modèle à utiliser", MODEL_TYPES, key='prediction_model')
+    variants = ['default'] + trained_variants(data_version, model_type, [TUNED_VARIANT, _segmentation_variant()])
+    variant = st.selectbox("Variante du modèle", variants, key='prediction_variant',
+                           format_func=lambda variant: _metrics_label(model_type, variant),
+                           help="Les modèles optimisés et par segment s'entraînent depuis la page "
+                                "d'évaluation des modèles.")
+    months = st.slider("Période de prédiction (mois)", 1, 12, 3, key='prediction_months')
+    return model_type, variant, months
+
+
+@st.fragment
+def _individual_prediction(data_version, X, y, preprocessors, numeric_features, categorical_features,
+                           category_values):
+    """Saisie et résultat de la prédiction individuelle ; les widgets ne relancent que cette section"""
+    model_type, variant, _ = _model_controls(data_version)
+
+    # Interface pour prédiction individuelle
+    st.subheader("Saisie des caractéristiques du client")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        age = st.number_input("Age", min_value=18, max_value=100, value=35)
+        tenure = st.number_input("Ancienneté (mois)", min_value=0, max_value=120, value=12)
+        monthly_charges = st.number_input("Charges mensuelles", min_value=0, value=50)
+    with col2:
+        total_charges = st.number_input("Charges totales", min_value=0, value=600)
+        data_usage = st.number_input("Usage données (GB)", min_value=0, value=10)
+        call_usage = st.number_input("Usage appel (minutes)", min_value=0, value=300)
+    with col3:
+        support_calls = st.number_input("Appels support", min_value=0, value=1)
+        satisfaction = st.number_input("Score satisfaction", min_value=1, max_value=5, value=3)
+        location = st.selectbox("Localisation", category_values['Location'])
+        contract_type = st.selectbox("Type de contrat", category_values['Contract Type'])
+        payment_method = st.selectbox("Méthode paiement", category_values['Payment Method'])
+
+    if st.button("Prédire le churn pour ce client"):
+        # Création d'un dataframe avec les données du client
+        client_data = pd.DataFrame([[
+            age, tenure, monthly_charges, total_charges,
+            data_usage, call_usage, support_calls, satisfaction,
+            location, contract_type, payment_method
+        ]], columns=numeric_features + categorical_features)
+        st.session_state.client_request = {'data': client_data, 'model_type': model_type, 'variant': variant}
+
+        if variant == 'default' and get_model(data_version, model_type) is None:
+            # Entraînement en arrière-plan, suivi par la page complète
+            _submit_training(data_version, X, y, preprocessors, model_type)
+            st.rerun()
+
+    client_request = st.session_state.get('client_request')
+    if client_request is None:
+        return
+
+    request_model, request_variant = client_request['model_type'], client_request['variant']
+    entry = get_model(data_version, request_model, request_variant)
+    if entry is None:
+        if request_variant == 'default':
+            st.info(f"Entraînement du modèle {request_model} en cours...")
+        else:
+            st.warning(f"Le modèle {_metrics_label(request_model, request_variant)} n'est plus disponible, "
+                       "relancez son entraînement depuis l'évaluation des modèles.")
+        return
+
+    pipeline, metrics = entry
+    st.session_state.model_metrics[_metrics_label(request_model, request_variant)] = metrics
+
+    # Prédiction
+    client_data = predict_for_individual(pipeline, client_request['data'].copy())
+
+    # Affichage résultat
+    st.subheader("Résultat de la prédiction")
+    proba = client_data['Future_Churn_Probability'].iloc[0]
+    prediction = "OUI" if client_data['Predicted_Churn'].iloc[0] else "NON"
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Probabilité de churn", f"{proba:.2%}")
+    with col2:
+        st.metric("Prédiction de churn", prediction)
+
+    # Principaux facteurs expliquant le score du client
+    st.subheader("Facteurs de risque")
+    _, contributions = explain_client(data_version, request_model, pipeline, client_request['data'],
+                                      variant=request_variant)
+    drivers = contributions.iloc[0].sort_values()
+    fig = px.bar(x=drivers.values, y=drivers.index, orientation='h',
+                 color=drivers.values > 0, color_discrete_map={True: '#CC3366', False: '#33CC66'},
+                 labels={'x': "Contribution au score", 'y': "", 'color': "Augmente le risque"},
+                 title="Contribution de chaque variable au risque de churn")
+    st.plotly_chart(fig)
+    increasing = drivers[drivers > 0].sort_values(ascending=False).head(3)
+    if not increasing.empty:
+        st.write("Variables augmentant le plus le risque: " + ", ".join(increasing.index))
+
+    # Recommandations basées sur la prédiction
+    st.subheader("Recommandations")
+    if proba > 0.7:
+        st.error("Client à très haut risque de churn!")
+        st.write("""
+        Actions recommandées:
+        - Contacter immédiatement le client
+        - Offrir une réduction ou un avantage significatif
+        - Résoudre les problèmes potentiels en priorité
+        """)
+    elif proba > 0.4:
+        st.warning("Client à risque modéré de churn")
+        st.write("""
+        Actions recommandées:
+        - Proposer une offre de fidélisation
+        - Enquête de satisfaction
+        - Améliorer les services utilisés fréquemment
+        """)
+    else:
+        st.success("Client à faible risque de churn")
+        st.write("""
+        Actions recommandées:
+        - Maintenir la qualité de service
+        - Proposer des services complémentaires
+        - Programme de parrainage
+        """)
+
+
+@st.fragment
+def _group_prediction_form(df, data_version, X, y, preprocessors):
+    """Paramètres de la prédiction de groupe ; les widgets ne relancent que cette section"""
+    model_type, variant, months = _model_controls(data_version)
+    n_clients = st.slider("Nombre de clients à prédire", 1, min(10000, len(df)), min(1000, len(df)))
+
+    if st.button("Lancer la prédiction pour le groupe"):
+        # Entraînement (si nécessaire) et prédiction en arrière-plan
+        submit_job('predict', 'predict', (data_version, model_type, variant, n_clients, months),
+                   predict_job, data_version, X, y, preprocessors[model_type], model_type, df, n_clients, months,
+                   variant=variant,
+                   label=f"Prédiction {_metrics_label(model_type, variant)} ({n_clients} clients, {months} mois)")
+        # Rerun complet pour suivre la tâche
+        st.rerun()
+
+
+@st.fragment
+def _group_prediction_results():
+    """Résultats de la dernière prédiction de groupe, avec graphiques mis en cache"""
+    predictions = get_session_predictions()
+    if predictions is None:
+        return
+
+    st.write("Résultats de prédiction:")
+    st.dataframe(predictions[[
+        'CustomerID', 'Age', 'Tenure (Months)', 'Monthly Charges',
+        'Future_Churn_Probability', 'Predicted_Churn'
+    ]].head())
+
+    # Visualisation
+    key = st.session_state.predictions_key
+    visualize_predictions(predictions, cache_key=key, contributions=get_prediction_contributions(key, predictions))
+
+    # Résumé des prédictions
+    predicted_churn_count = predictions['Predicted_Churn'].sum()
+    total_clients = len(predictions)
+    predicted_churn_rate = predicted_churn_count / total_clients
+
+    st.subheader("Résumé des prédictions")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Clients analysés", total_clients)
+    with col2:
+        st.metric("Clients à risque de churn", predicted_churn_count)
+    with col3:
+        st.metric("Taux de churn prédit", f"{predicted_churn_rate:.2%}")
+
+    _scenario_simulator(predictions, key)
+
+
+def _scenario_simulator(predictions, key):
+    """Simulation d'offres de fidélisation sur les clients de la dernière prédiction de groupe"""
+    with st.expander("Simulateur d'offres de fidélisation"):
+        st.write("""
+        Combinez des interventions pour estimer leur effet sur le risque de churn de chaque client.
+        Toutes les combinaisons sont évaluées en un seul calcul.
+        """)
+        discounts = st.multiselect("Remise sur les charges mensuelles (%)", DISCOUNT_OPTIONS, default=[10])
+        contracts = st.multiselect("Passage au type de contrat", sorted(predictions['Contract Type'].unique()))
+        payments = st.multiselect("Changement de méthode de paiement", sorted(predictions['Payment Method'].unique()))
+
+        if st.button("Simuler les offres"):
+            scenarios = scenario_grid({
+                'Monthly Charges': [('multiply', 1 - discount / 100, f"Remise {discount}%") for discount in discounts],
+                'Contract Type': [('set', contract, f"Contrat {contract}") for contract in contracts],
+                'Payment Method': [('set', payment, f"Paiement {payment}") for payment in payments],
+            })
+            _, data_version, model_type, variant, _, months = key
+            entry = get_model(data_version, model_type, variant)
+            if not scenarios:
+                st.warning("Sélectionnez au moins une intervention.")
+            elif entry is None:
+                st.warning("Le modèle n'est plus disponible, relancez la prédiction.")
+            else:
+                # Segments affectés selon les variables actuelles, comme lors de la prédiction
+                route = project_features(predictions, -months) if hasattr(entry[0], 'parts') else None
+                base, deltas = simulate_scenarios(entry[0], predictions, scenarios, months=months, route=route)
+                st.session_state.scenario_results = {'key': key, 'base': base, 'deltas': deltas}
+
+        results = st.session_state.get('scenario_results')
+        if results is None or results['key'] != key:
+            return
+
+        base, deltas = results['base'], results['deltas']
+        summary = summarize_scenarios(base, deltas)
+        st.subheader("Effet des offres")
+        st.dataframe(summary.style.format({'Écart moyen': "{:+.2%}"}))
+
+        # Meilleure offre pour chaque client à risque
+        at_risk = base > 0.5
+        if at_risk.any():
+            best = deltas[at_risk].idxmin(axis=1)
+            best_clients = pd.DataFrame({
+                'CustomerID': predictions.loc[best.index, 'CustomerID'],
+                'Probabilité actuelle': base[at_risk],
+                'Meilleure offre': best,
+                'Écart': deltas[at_risk].min(axis=1),
+            }).nsmallest(20, 'Écart')
+            st.write("**Clients à risque les plus sensibles aux offres:**")
+            st.dataframe(best_clients.style.format({'Probabilité actuelle': "{:.2%}", 'Écart': "{:+.2%}"}))
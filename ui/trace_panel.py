@@ -0,0 +1,36 @@
+import pandas as pd
+import streamlit as st
+from utils.tracing import TRACE_ENABLED, TRACE_FILE, TRACE_MEMORY, begin_run, get_run_spans
+
+
+def start_traced_run():
+    """Affiche les options de profilage dans la barre latérale et démarre la collecte du rerun"""
+    with st.sidebar.expander("Profilage"):
+        show_panel = st.checkbox("Afficher le détail des étapes", value=TRACE_ENABLED, key="trace_panel")
+    begin_run(enabled=show_panel)
+    return show_panel
+
+
+def render_trace_panel():
+    """Affiche dans la barre latérale le détail des étapes du rerun courant"""
+    spans = get_run_spans()
+    if not spans:
+        return
+
+    st.sidebar.subheader("Profilage du rerun")
+    trace_df = pd.DataFrame([s.to_dict() for s in spans])
+    trace_df['Étape'] = [' ' * depth + name for depth, name in zip(trace_df['depth'], trace_df['name'])]
+    columns = ['Étape', 'wall_ms', 'cpu_ms'] + (['peak_mem_mb'] if TRACE_MEMORY else []) + ['rows']
+    st.sidebar.dataframe(
+        trace_df[columns].rename(columns={
+            'wall_ms': 'Temps (ms)',
+            'cpu_ms': 'CPU (ms)',
+            'peak_mem_mb': 'Pic mémoire approx. (Mo)',
+            'rows': 'Lignes',
+        }),
+        hide_index=True
+    )
+    if TRACE_MEMORY:
+        st.sidebar.caption("Pics mémoire approximatifs : tracemalloc mesure tout le processus, "
+                           "sessions et tâches concurrentes comprises.")
+    st.sidebar.caption(f"Traces enregistrées dans {TRACE_FILE}")
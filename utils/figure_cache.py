@@ -0,0 +1,76 @@
+import os
+import numpy as np
+from utils.resource_cache import get_resource_cache
+
+# Nombre maximal de points des nuages de points mis en cache, configurable via CHURN_MAX_SCATTER_POINTS.
+# Au-delà, un échantillon fixe des points est conservé, dans les mêmes proportions pour chaque trace.
+MAX_SCATTER_POINTS = int(os.environ.get("CHURN_MAX_SCATTER_POINTS", "20000"))
+SCATTER_TYPES = {'scatter', 'scattergl'}
+# Attributs d'une trace (et de son marker) donnant une valeur par point
+POINT_KEYS = ('x', 'y', 'z', 'text', 'hovertext', 'customdata', 'ids')
+MARKER_POINT_KEYS = ('color', 'size', 'symbol', 'opacity')
+
+
+def _take(values, rows, n_points):
+    """Sélectionne les lignes d'un attribut par point ; les valeurs communes à la trace sont conservées"""
+    if values is None or isinstance(values, (str, bytes, dict)) or not hasattr(values, '__len__'):
+        return values
+    if len(values) != n_points:
+        return values
+    return np.asarray(values)[rows]
+
+
+def downsample_scatter(spec, max_points=MAX_SCATTER_POINTS, seed=0):
+    """
+    Réduit les nuages de points d'une figure (dict Plotly) à max_points points au total
+
+    Args:
+        spec: Spécification de la figure (fig.to_dict()), modifiée en place
+        max_points: Nombre maximal de points de l'ensemble des traces de nuage de points
+        seed: Graine de l'échantillon (identique d'un calcul à l'autre)
+
+    Returns:
+        La spécification
+    """
+    traces = [trace for trace in spec.get('data', [])
+              if trace.get('type', 'scatter') in SCATTER_TYPES and trace.get('x') is not None]
+    total = sum(len(trace['x']) for trace in traces)
+    if total <= max_points:
+        return spec
+
+    rng = np.random.default_rng(seed)
+    for trace in traces:
+        n_points = len(trace['x'])
+        rows = np.sort(rng.choice(n_points, size=max(1, n_points * max_points // total), replace=False))
+        for key in POINT_KEYS:
+            if key in trace:
+                trace[key] = _take(trace[key], rows, n_points)
+        marker = trace.get('marker')
+        if isinstance(marker, dict):
+            for key in MARKER_POINT_KEYS:
+                if key in marker:
+                    marker[key] = _take(marker[key], rows, n_points)
+    return spec
+
+
+def cached_figures(cache_key, builder, *args):
+    """
+    Retourne les spécifications (dict Plotly) des figures construites par builder(*args),
+    mises en cache selon cache_key dans le cache partagé du processus (budget mémoire
+    commun, voir utils.resource_cache). Les nuages de points sont échantillonnés avant
+    mise en cache (downsample_scatter). Les données ne sont pas hachées : cache_key doit
+    identifier toutes les entrées des figures (version des données, paramètres...).
+    Les spécifications retournées sont partagées et ne doivent pas être modifiées.
+
+    Args:
+        cache_key: Tuple identifiant les entrées des figures
+        builder: Fonction retournant une liste de figures Plotly
+        args: Arguments de builder
+
+    Returns:
+        Liste de dict utilisables avec st.plotly_chart
+    """
+    key = ('figures', builder.__module__, builder.__qualname__) + tuple(cache_key)
+    return get_resource_cache().get_or_create(
+        key, lambda: [downsample_scatter(fig.to_dict()) for fig in builder(*args)]
+    )
@@ -2,8 +2,10 @@ import plotly.express as px
 import plotly.figure_factory as ff
 import pandas as pd
 import streamlit as st
+from utils.tracing import traced
 
 
+@traced()
 def display_model_evaluation(metrics_dict):
     """
     Affiche l'évaluation des modèles
@@ -32,6 +34,12 @@ def display_model_evaluation(metrics_dict):
     st.plotly_chart(fig)
 
     # Détails par modèle
+    _model_details(metrics_dict)
+
+
+@st.fragment
+def _model_details(metrics_dict):
+    """Détails d'un modèle ; changer de modèle ne relance que cette section"""
     selected_model = st.selectbox("Voir les détails pour le modèle:", list(metrics_dict.keys()))
 
     st.subheader(f"Détails pour le modèle {selected_model}")
@@ -54,4 +62,26 @@ def display_model_evaluation(metrics_dict):
 
     # Features utilisées
     st.write("**Variables utilisées:**")
-    st.write(", ".join(model_metrics['Features']))
\ No newline at end of file
+    st.write(", ".join(model_metrics['Features']))
+
+    # Hyperparamètres retenus par l'optimisation
+    if 'Best_Params' in model_metrics:
+        st.write("**Hyperparamètres optimisés:**")
+        st.write(f"AUC-ROC en validation croisée: {model_metrics['CV_AUCROC']:.2%} "
+                 f"({model_metrics['Search_Rounds']} tours d'élimination)")
+        st.json({name: str(value) for name, value in model_metrics['Best_Params'].items()})
+
+    # Compaction du modèle chargé
+    if 'Compaction' in model_metrics:
+        st.write("**Compaction du modèle:**")
+        compaction_df = pd.DataFrame(model_metrics['Compaction']).transpose()
+        st.dataframe(compaction_df[['size_mb', 'load_s', 'AUCROC', 'Accuracy']])
+
+    # Métriques de chaque segment d'un modèle par segment
+    if 'Segments' in model_metrics:
+        st.write("**Performances par segment:**")
+        segments_df = pd.DataFrame(model_metrics['Segments']).transpose()
+        segments_df.index.name = "Segment"
+        st.dataframe(segments_df.style.format({
+            'Taux de churn': "{:.2%}", 'Accuracy': "{:.2%}", 'F1': "{:.2%}", 'AUCROC': "{:.2%}"
+        }, na_rep="-"))
\ No newline at end of file
@@ -0,0 +1,212 @@
+import os
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Nombre de tâches exécutées simultanément, configurable via CHURN_JOB_WORKERS
+DEFAULT_MAX_WORKERS = int(os.environ.get("CHURN_JOB_WORKERS", "2"))
+# Nombre de tâches terminées conservées pour consultation
+MAX_FINISHED_JOBS = 200
+# Durée (secondes) pendant laquelle le résultat d'une tâche terminée est réutilisé
+# par une nouvelle soumission de même clé, configurable via CHURN_JOB_RESULT_TTL
+RESULT_TTL = int(os.environ.get("CHURN_JOB_RESULT_TTL", "60"))
+
+PENDING, RUNNING, DONE, FAILED, CANCELLED = 'pending', 'running', 'done', 'failed', 'cancelled'
+
+
+class JobCancelled(Exception):
+    """Levée dans une tâche dont l'annulation a été demandée"""
+
+
+class Job:
+    """
+    Tâche exécutée en arrière-plan (entraînement, prédiction, export).
+
+    La fonction exécutée reçoit la tâche en premier argument pour publier
+    son avancement (set_progress) et vérifier les demandes d'annulation
+    (check_cancelled). L'annulation est coopérative : elle prend effet au
+    prochain point de contrôle de la fonction.
+
+    Une tâche dédupliquée est partagée par les sessions qui l'ont soumise
+    (abonnées) ; elle n'est annulée que lorsque toutes l'ont abandonnée.
+    """
+
+    def __init__(self, kind, key, label):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.key = key
+        self.label = label or kind
+        self.status = PENDING
+        self.progress = 0.0
+        self.message = "En attente"
+        self.result = None
+        self.error = None
+        self.submitted_at = datetime.now()
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._future = None
+        self._subscribers = set()
+
+    @property
+    def is_finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_event.is_set()
+
+    def set_progress(self, progress, message=None):
+        """
+        Publie l'avancement de la tâche et vérifie l'annulation
+
+        Args:
+            progress: Avancement entre 0.0 et 1.0
+            message: Description de l'étape en cours
+        """
+        self.progress = min(1.0, max(0.0, progress))
+        if message is not None:
+            self.message = message
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        """Lève JobCancelled si l'annulation a été demandée"""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        """Demande l'annulation de la tâche"""
+        self._cancel_event.set()
+        if self._future is not None and self._future.cancel():
+            self._finish(CANCELLED, "Annulée")
+
+    def _finish(self, status, message):
+        self.status = status
+        self.message = message
+        self.finished_at = datetime.now()
+
+
+class JobManager:
+    """
+    Pool borné de threads et registre des tâches du processus.
+
+    Une tâche soumise avec la même clé qu'une tâche en attente ou en cours,
+    ou terminée avec succès depuis moins de RESULT_TTL secondes, n'est pas
+    relancée : la tâche existante est retournée et le demandeur est ajouté
+    à ses abonnés.
+
+    Args:
+        max_workers: Nombre de tâches exécutées simultanément
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="churn-job")
+        self._jobs = {}
+        self._latest_by_key = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, key, fn, *args, label=None, subscriber=None, **kwargs):
+        """
+        Soumet une tâche, ou retourne la tâche active de même clé
+
+        Args:
+            kind: Type de tâche ('train', 'predict', 'export')
+            key: Paramètres identifiant la tâche (version des données, modèle...)
+            fn: Fonction exécutée comme fn(job, *args, **kwargs)
+            label: Libellé affiché
+            subscriber: Identifiant du demandeur (ex: session), abonné à la tâche
+
+        Returns:
+            Job
+        """
+        full_key = (kind,) + tuple(key)
+        with self._lock:
+            latest = self._latest_by_key.get(full_key)
+            if latest is not None and self._reusable(latest):
+                if subscriber is not None:
+                    latest._subscribers.add(subscriber)
+                return latest
+
+            job = Job(kind, full_key, label)
+            if subscriber is not None:
+                job._subscribers.add(subscriber)
+            self._jobs[job.id] = job
+            self._latest_by_key[full_key] = job
+            self._prune()
+            job._future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    @staticmethod
+    def _reusable(job):
+        if not job.is_finished:
+            return not job.cancel_requested
+        return job.status == DONE and (datetime.now() - job.finished_at).total_seconds() < RESULT_TTL
+
+    def _run(self, job, fn, args, kwargs):
+        try:
+            job.check_cancelled()
+            job.status = RUNNING
+            job.message = "En cours"
+            job.result = fn(job, *args, **kwargs)
+            job.progress = 1.0
+            job._finish(DONE, "Terminée")
+        except JobCancelled:
+            job._finish(CANCELLED, "Annulée")
+        except Exception as e:
+            job.error = f"{e}\n{traceback.format_exc()}"
+            job._finish(FAILED, f"Échec: {e}")
+        finally:
+            # Seul un résultat réussi reste réutilisable (RESULT_TTL)
+            with self._lock:
+                if job.status != DONE and self._latest_by_key.get(job.key) is job:
+                    del self._latest_by_key[job.key]
+
+    def unsubscribe(self, job_id, subscriber):
+        """
+        Désabonne un demandeur d'une tâche ; la tâche est annulée s'il était
+        le dernier abonné
+
+        Returns:
+            True si l'annulation de la tâche a été demandée
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.is_finished:
+                return False
+            job._subscribers.discard(subscriber)
+            if job._subscribers:
+                return False
+        job.cancel()
+        return True
+
+    def get(self, job_id):
+        """Retourne la tâche correspondant à l'identifiant, ou None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self):
+        """Retourne les tâches connues, de la plus récente à la plus ancienne"""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.submitted_at, reverse=True)
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if job.is_finished]
+        for job in sorted(finished, key=lambda job: job.finished_at)[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+        for key, job in list(self._latest_by_key.items()):
+            if not self._reusable(job):
+                del self._latest_by_key[key]
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Retourne le gestionnaire de tâches du processus"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
@@ -0,0 +1,270 @@
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+
+# Budget mémoire du cache partagé, configurable via CHURN_CACHE_BUDGET_MB
+DEFAULT_BUDGET_MB = int(os.environ.get("CHURN_CACHE_BUDGET_MB", "2048"))
+
+
+# Tableaux des arbres scikit-learn (sklearn.tree._tree.Tree), qui n'exposent pas de __dict__
+_TREE_ARRAYS = ('children_left', 'children_right', 'feature', 'threshold', 'value', 'impurity',
+                'n_node_samples', 'weighted_n_node_samples', 'missing_go_to_left')
+
+
+def estimate_size(value, _seen=None):
+    """
+    Estime l'empreinte mémoire d'un objet en octets, sans le sérialiser : les modèles
+    sont parcourus attribut par attribut et les arbres comptés par leurs tableaux
+    de nœuds. Un objet référencé plusieurs fois n'est compté qu'une fois.
+
+    Args:
+        value: DataFrame, Series, tableau numpy, conteneur ou modèle
+
+    Returns:
+        Taille estimée en octets
+    """
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if hasattr(value, 'memory_usage') and hasattr(value, 'columns'):
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage(deep=True))
+    if getattr(value, 'dtype', None) == object and hasattr(value, 'ravel'):
+        # Tableau d'objets (ex: estimators_ d'un gradient boosting) : pointeurs + objets
+        return int(value.nbytes) + sum(estimate_size(item, seen) for item in value.ravel())
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if hasattr(value, 'node_count') and hasattr(value, 'children_left'):
+        return sys.getsizeof(value) + sum(int(getattr(value, name).nbytes)
+                                          for name in _TREE_ARRAYS if hasattr(value, name))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v, seen) for v in value.values())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(v, seen) for v in value)
+    if hasattr(value, '__dict__') and not isinstance(value, type):
+        # Modèles scikit-learn et autres objets : somme des attributs
+        return sys.getsizeof(value) + sum(estimate_size(v, seen) for v in vars(value).values())
+    return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'refcount', 'hits')
+
+    def __init__(self, value, size):
+        self.value = value
+        self.size = size
+        self.refcount = 0
+        self.hits = 0
+
+
+class Lease:
+    """
+    Référence détenue par une session sur une entrée du cache.
+    La référence est libérée par release() ou quand le bail est détruit
+    (par exemple à la fermeture de la session Streamlit).
+    """
+
+    def __init__(self, cache, key, entry=None):
+        self.key = key
+        # Le bail est lié à l'entrée référencée : si elle est évincée puis recréée sous la
+        # même clé, la libération ne décrémente pas le compteur de la nouvelle entrée
+        self._finalizer = weakref.finalize(self, cache._release, entry) if entry is not None else None
+
+    def release(self):
+        if self._finalizer is not None:
+            self._finalizer()
+
+
+class ResourceCache:
+    """
+    Cache d'artefacts immuables partagé par toutes les sessions du processus
+    (dataset nettoyé, pipelines entraînés, segmentations...).
+
+    Les entrées sont indexées par une clé de version. Quand le budget mémoire
+    est dépassé, les entrées les moins récemment utilisées et non référencées
+    par une session sont évincées. Les valeurs ne doivent pas être modifiées.
+
+    Args:
+        budget_mb: Budget mémoire en Mo
+    """
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget_bytes = budget_mb * 1024 ** 2
+        self._entries = OrderedDict()
+        self._build_locks = {}
+        self._lock = threading.RLock()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Retourne la valeur associée à la clé, ou default si elle est absente"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            entry.hits += 1
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry.value
+
+    def put(self, key, value, size=None):
+        """
+        Ajoute ou remplace une entrée puis applique le budget mémoire
+
+        Returns:
+            La valeur ajoutée
+        """
+        size = estimate_size(value) if size is None else size
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(value, size)
+            else:
+                # Entrée remplacée en place : les baux existants restent valides
+                self._total_bytes -= entry.size
+                entry.value, entry.size = value, size
+                self._entries.move_to_end(key)
+            self._total_bytes += size
+            self._evict(keep=key)
+        return value
+
+    def get_or_create(self, key, factory, size=None):
+        """
+        Retourne la valeur en cache ou la construit avec factory().
+        Les constructions concurrentes d'une même clé sont dédupliquées, y compris
+        après l'échec d'une construction ; une valeur None n'est pas mise en cache.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.hits += 1
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            # Le verrou de construction est conservé tant qu'une session l'attend : après un
+            # échec, les sessions en attente reprennent la construction l'une après l'autre
+            build = self._build_locks.setdefault(key, [threading.Lock(), 0])
+            build[1] += 1
+
+        try:
+            with build[0]:
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        entry.hits += 1
+                        self.hits += 1
+                        return entry.value
+                    self.misses += 1
+                value = factory()
+                if value is not None:
+                    self.put(key, value, size)
+                return value
+        finally:
+            with self._lock:
+                build[1] -= 1
+                if build[1] == 0:
+                    self._build_locks.pop(key, None)
+
+    def lease(self, key):
+        """
+        Incrémente le compteur de références d'une entrée
+
+        Returns:
+            Lease à conserver tant que la session utilise l'entrée
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refcount += 1
+        return Lease(self, key, entry)
+
+    def _release(self, entry):
+        """Décrémente le compteur de références d'une entrée (appelé par Lease)"""
+        with self._lock:
+            if entry.refcount > 0:
+                entry.refcount -= 1
+            self._evict()
+
+    def discard(self, key):
+        """Supprime une entrée, même référencée"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._total_bytes -= entry.size
+                # Un bail encore détenu ne doit pas retenir la valeur supprimée
+                entry.value = None
+
+    def _evict(self, keep=None):
+        if self._total_bytes <= self.budget_bytes:
+            return
+        for key in list(self._entries):
+            if self._total_bytes <= self.budget_bytes:
+                break
+            entry = self._entries[key]
+            if entry.refcount == 0 and key != keep:
+                del self._entries[key]
+                self._total_bytes -= entry.size
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict avec les compteurs globaux et le détail des entrées (de la plus ancienne à la plus récente)
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'used_mb': self._total_bytes / 1024 ** 2,
+                'budget_mb': self.budget_bytes / 1024 ** 2,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'items': [
+                    {
+                        'key': ' / '.join(str(part) for part in key) if isinstance(key, tuple) else str(key),
+                        'size_mb': entry.size / 1024 ** 2,
+                        'refcount': entry.refcount,
+                        'hits': entry.hits,
+                    }
+                    for key, entry in self._entries.items()
+                ],
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_resource_cache():
+    """Retourne le cache partagé du processus"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResourceCache()
+        return _cache
+
+
+def hold(state, slot, key):
+    """
+    Fait détenir par une session une référence sur une entrée du cache.
+    Le bail précédemment détenu pour le même emplacement est libéré.
+
+    Args:
+        state: État de la session (st.session_state)
+        slot: Nom de l'emplacement (ex: 'dataset', 'model:RandomForest')
+        key: Clé de l'entrée du cache
+    """
+    leases = state.setdefault('resource_leases', {})
+    current = leases.get(slot)
+    if current is not None and current.key == key:
+        return
+    leases[slot] = get_resource_cache().lease(key)
+    if current is not None:
+        current.release()
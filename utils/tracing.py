@@ -0,0 +1,205 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+# Activation globale via variables d'environnement ; sinon le traçage peut
+# être activé pour un seul rerun avec begin_run(enabled=True).
+TRACE_ENABLED = os.environ.get("CHURN_TRACE", "0") == "1"
+# Mesure mémoire des spans (tracemalloc), réservée aux benchmarks et profilages hors
+# production : tracemalloc ralentit toutes les allocations du processus et son pic est global
+TRACE_MEMORY = os.environ.get("CHURN_TRACE_MEMORY", "0") == "1"
+TRACE_FILE = os.environ.get(
+    "CHURN_TRACE_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "traces", "trace.jsonl")
+)
+
+_run = contextvars.ContextVar("trace_run", default=None)
+_current_span = contextvars.ContextVar("trace_span", default=None)
+_file_lock = threading.Lock()
+
+
+class _Run:
+    def __init__(self, enabled, memory, keep_spans=True):
+        self.id = uuid.uuid4().hex[:12]
+        self.enabled = enabled
+        self.memory = memory
+        # Spans conservés pour le panneau du rerun ; None pour un run implicite,
+        # dont les spans sont seulement écrits dans TRACE_FILE
+        self.spans = [] if keep_spans else None
+
+
+class Span:
+    """
+    Mesure d'une étape : temps réel, temps CPU du thread, pic mémoire et nombre de lignes.
+    Le pic mémoire est approximatif : tracemalloc est global au processus, il inclut
+    les allocations des autres threads et des spans concurrents.
+    """
+
+    def __init__(self, name, parent, memory):
+        self.name = name
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.rows = None
+        self.started_at = datetime.now().isoformat()
+        self.wall_s = None
+        self.cpu_s = None
+        self.peak_mb = None
+        self._memory = memory and tracemalloc.is_tracing()
+        self._mem_start = 0
+        self._peak_seen = 0
+
+    def _start(self):
+        if self._memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # Le pic courant appartient au span parent avant sa remise à zéro
+            if self.parent is not None:
+                self.parent._peak_seen = max(self.parent._peak_seen, peak)
+            tracemalloc.reset_peak()
+            self._mem_start = self._peak_seen = current
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+
+    def _stop(self):
+        self.wall_s = time.perf_counter() - self._wall_start
+        self.cpu_s = time.thread_time() - self._cpu_start
+        if self._memory:
+            _, peak = tracemalloc.get_traced_memory()
+            self._peak_seen = max(self._peak_seen, peak)
+            self.peak_mb = (self._peak_seen - self._mem_start) / 1024 ** 2
+            if self.parent is not None:
+                self.parent._peak_seen = max(self.parent._peak_seen, self._peak_seen)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'parent': None if self.parent is None else self.parent.name,
+            'depth': self.depth,
+            'started_at': self.started_at,
+            'wall_ms': round(self.wall_s * 1000, 3),
+            'cpu_ms': round(self.cpu_s * 1000, 3),
+            'peak_mem_mb': None if self.peak_mb is None else round(self.peak_mb, 3),
+            'rows': self.rows,
+        }
+
+
+def begin_run(enabled=False):
+    """
+    Démarre la collecte des spans d'un rerun Streamlit. Le pic mémoire n'est mesuré
+    que si CHURN_TRACE_MEMORY=1 : une session ne peut pas activer tracemalloc pour
+    tout le processus.
+
+    Args:
+        enabled: Active le traçage pour ce rerun (toujours actif si CHURN_TRACE=1)
+    """
+    enabled = enabled or TRACE_ENABLED
+    memory = enabled and TRACE_MEMORY
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _run.set(_Run(enabled, memory))
+    _current_span.set(None)
+
+
+def get_run_spans():
+    """Retourne les spans terminés du rerun courant, dans l'ordre de démarrage"""
+    run = _run.get()
+    return [] if run is None or run.spans is None else list(run.spans)
+
+
+def _is_active():
+    run = _run.get()
+    return TRACE_ENABLED if run is None else run.enabled
+
+
+def _write_span(run_id, span):
+    record = dict(span.to_dict(), run_id=run_id)
+    with _file_lock:
+        os.makedirs(os.path.dirname(TRACE_FILE), exist_ok=True)
+        with open(TRACE_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+@contextmanager
+def span(name, rows=None):
+    """
+    Mesure le bloc de code sous un span nommé, imbriqué dans le span courant.
+    Sans effet si le traçage est désactivé.
+
+    Args:
+        name: Nom de l'étape
+        rows: Nombre de lignes traitées (modifiable via le span retourné)
+
+    Yields:
+        Span, ou None si le traçage est désactivé
+    """
+    if not _is_active():
+        yield None
+        return
+
+    run = _run.get()
+    if run is None:
+        # Traçage activé par CHURN_TRACE hors d'un rerun (scripts, benchmarks, threads
+        # des jobs) : run implicite du thread, sans conserver ses spans en mémoire
+        # (un thread de longue durée en accumulerait sans limite)
+        if TRACE_MEMORY and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        run = _Run(True, TRACE_MEMORY, keep_spans=False)
+        _run.set(run)
+
+    current = Span(name, _current_span.get(), run.memory)
+    current.rows = rows
+    token = _current_span.set(current)
+    if run.spans is not None:
+        run.spans.append(current)
+    current._start()
+    try:
+        yield current
+    finally:
+        current._stop()
+        _current_span.reset(token)
+        _write_span(run.id, current)
+
+
+def _infer_rows(args, result):
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    for obj in (*args, result):
+        shape = getattr(obj, 'shape', None)
+        if shape:
+            return int(shape[0])
+    return None
+
+
+def traced(name=None):
+    """
+    Décorateur qui trace chaque appel de la fonction dans un span.
+    Le nombre de lignes est déduit du premier argument ou du résultat
+    ayant un attribut shape. Coût quasi nul quand le traçage est désactivé.
+
+    Args:
+        name: Nom du span (par défaut le nom de la fonction)
+    """
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _is_active():
+                return fn(*args, **kwargs)
+            with span(span_name) as current:
+                result = fn(*args, **kwargs)
+                current.rows = _infer_rows(args, result)
+                return result
+
+        # Conserve l'API des fonctions mises en cache par Streamlit (ex: load_data.clear())
+        if hasattr(fn, 'clear'):
+            wrapper.clear = fn.clear
+        return wrapper
+
+    return decorator